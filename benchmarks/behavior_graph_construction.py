@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the construction of behavior graphs on synthetic uncertain traces."""
+
+import argparse
+from datetime import datetime, timedelta
+from random import seed
+from timeit import default_timer
+
+from pm4py.objects.log.log import EventLog, Trace, Event
+from pm4py.objects.log.util.xes import DEFAULT_NAME_KEY, DEFAULT_TIMESTAMP_KEY
+
+from proved.artifacts.behavior_graph.behavior_graph import create_nodes_tuples, create_edges_list, create_edges_list_naive
+from proved.simulation.bewilderer.add_timestamps import add_uncertain_timestamp_to_log_montecarlo
+
+
+def synthetic_log(n_traces, trace_length, n_activities=10):
+    """
+    Returns a log of certain traces with equally spaced timestamps.
+
+    :param n_traces: the number of traces
+    :param trace_length: the number of events in each trace
+    :param n_activities: the number of distinct activity labels
+    :return: the synthetic event log
+    """
+
+    start = datetime(2020, 1, 1)
+    log = EventLog()
+    for _ in range(n_traces):
+        trace = Trace()
+        for i in range(trace_length):
+            trace.append(Event({DEFAULT_NAME_KEY: 'a' + str(i % n_activities), DEFAULT_TIMESTAMP_KEY: start + timedelta(seconds=i)}))
+        log.append(trace)
+    return log
+
+
+def benchmark(trace_lengths, n_traces, p, max_overlap):
+    print('events  overlap  naive (s)  sweep (s)  speedup')
+    for trace_length in trace_lengths:
+        log = synthetic_log(n_traces, trace_length)
+        add_uncertain_timestamp_to_log_montecarlo(log, p, p, max_overlap, max_overlap)
+        nodes_tuples_list = [create_nodes_tuples(trace) for trace in log]
+
+        start = default_timer()
+        naive_edges = [create_edges_list_naive(nodes_tuples) for nodes_tuples in nodes_tuples_list]
+        naive_time = default_timer() - start
+
+        start = default_timer()
+        sweep_edges = [create_edges_list(nodes_tuples) for nodes_tuples in nodes_tuples_list]
+        sweep_time = default_timer() - start
+
+        if any(set(edges1) != set(edges2) for edges1, edges2 in zip(naive_edges, sweep_edges)):
+            raise AssertionError('The two builders returned different edges for traces of length ' + str(trace_length))
+        print('{:>6}  {:>7}  {:>9.4f}  {:>9.4f}  {:>7.1f}'.format(trace_length, max_overlap, naive_time, sweep_time, naive_time / max(sweep_time, 1e-9)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares the quadratic and the sweep-line construction of behavior graphs.')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[10, 50, 100, 250, 500])
+    parser.add_argument('--traces', type=int, default=10)
+    parser.add_argument('--p', type=float, default=.5, help='probability of overlapping timestamps')
+    parser.add_argument('--max-overlap', type=int, default=10, help='maximum number of events that a timestamp can overlap')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    seed(args.seed)
+    benchmark(args.lengths, args.traces, args.p, args.max_overlap)
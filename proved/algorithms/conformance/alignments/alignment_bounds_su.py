@@ -1,42 +1,311 @@
+import hashlib
+import math
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from heapq import heapify, heappop, heappush
+from itertools import count
+
+from pm4py.algo.conformance.alignments.petri_net.variants.state_equation_a_star import Parameters
 from pm4py.algo.conformance.alignments.petri_net.variants.state_equation_a_star import apply
+from pm4py.algo.conformance.alignments.petri_net.variants.state_equation_a_star import apply_sync_prod
 from pm4py.algo.conformance.alignments.petri_net.variants.state_equation_a_star import apply_trace_net
+from pm4py.objects.petri_net import semantics
+from pm4py.objects.petri_net.obj import Marking, PetriNet
+from pm4py.objects.petri_net.utils.align_utils import SKIP, STD_MODEL_LOG_MOVE_COST, STD_SYNC_COST, STD_TAU_COST
+from pm4py.objects.petri_net.utils.petri_utils import add_arc_from_to
+from pm4py.util import exec_utils
 
-from proved.artifacts.behavior_graph import behavior_graph
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph
+from proved.artifacts.behavior_graph.utils import as_behavior_graph, behavior_graph_labels, realization_count, realization_iterator, realization_to_trace, sample_realizations, walk_realization_tree
 from proved.artifacts.behavior_net import behavior_net as behavior_net_builder
 from proved.artifacts.behavior_net.utils import acyclic_net_variants
+from proved.artifacts.uncertain_log.utils import log_variants
+from proved.artifacts.variant_cache.variant_cache import BEHAVIOR_NET, get_behavior_net, variant_hash
+
+# Reference model of the worker processes of alignment_bounds_su_log_parallel, with its hash and its PreparedModel, kept across the chunks of a run
+_worker_model = None
 
 
-def alignment_bounds_su_log(log, petri_net, initial_marking, final_marking, parameters=None):
+def alignment_bounds_su_log(log, petri_net, initial_marking, final_marking, parameters=None, cache=None):
     """
     Returns the lower and upper bounds for conformance of a strongly uncertain log against a reference Petri net.
+    Traces sharing the same uncertain variant have the same bounds, so each distinct variant is aligned only once and its results are shared by all its traces.
+    If the log is an UncertainLog, its variants and behavior graphs are reused. The reference Petri net is prepared once for all the lower bounds.
 
-    :param log: the strongly uncertain event log
+    :param log: the strongly uncertain event log, or an UncertainLog
     :param petri_net: the reference Petri net
     :param initial_marking: the initial marking of the reference Petri net
     :param final_marking: the final marking of the reference Petri net
     :param parameters: the optional parameters for alignments
+    :param cache: the optional variant cache for the behavior nets of the traces
     :return: a list of 2-tuples containing the alignment results for the upper and lower bounds for conformance of the traces in the log
     """
 
-    return [alignment_bounds_su_trace(trace, petri_net, initial_marking, final_marking, parameters) for trace in log]
+    prepared_model = PreparedModel(petri_net, initial_marking, final_marking, parameters)
+    variants_bounds = dict()
+    for nodes_tuple, (behavior_graph, traces_list) in log_variants(log).items():
+        bounds = alignment_bounds_su_variant(nodes_tuple, behavior_graph, petri_net, initial_marking, final_marking, parameters, cache, prepared_model)
+        for trace in traces_list:
+            variants_bounds[id(trace)] = bounds
+
+    return [variants_bounds[id(trace)] for trace in log]
+
+
+def _worker_prepared_model(model):
+    # Returns the PreparedModel of the reference model of a chunk, preparing it only for the first chunk of a run received by the worker process
+    global _worker_model
+    key, petri_net, initial_marking, final_marking, parameters = model
+    if _worker_model is None or _worker_model[0] != key:
+        _worker_model = (key, PreparedModel(petri_net, initial_marking, final_marking, parameters))
+    return _worker_model[1]
+
+
+def _alignment_bounds_su_chunk(model, variants_chunk):
+    """
+    Computes the bounds for conformance of a chunk of variants against a reference model, in a worker process.
+    The reference model is prepared once per worker process and reused by the following chunks of the same model.
+    Errors are returned in place of the results of the variants that raised them, so that they do not stop the other tasks.
+
+    :param model: a 5-tuple containing the model_hash of the reference model, the reference Petri net, its initial and final markings and the optional
+    parameters for alignments
+    :param variants_chunk: a list of 2-tuples containing the hash and the nodes tuple of a variant
+    :return: a list of 2-tuples containing the hash of each variant and its bounds (or the exception raised computing them)
+    """
+
+    _, petri_net, initial_marking, final_marking, parameters = model
+    prepared_model = _worker_prepared_model(model)
+    results = []
+    for key, nodes_tuple in variants_chunk:
+        try:
+            behavior_graph = BehaviorGraph(nodes_tuples=nodes_tuple)
+            behavior_net = behavior_net_builder.BehaviorNet(behavior_graph)
+            results.append((key, alignment_bounds_su_behavior_net(behavior_net, petri_net, initial_marking, final_marking, parameters, behavior_graph, prepared_model)))
+        except Exception as e:
+            results.append((key, e))
+    return results
+
+
+def _canonical_form(value):
+    # Returns a representation of a parameter value that is the same across interpreter runs: places and transitions are replaced by their names, and
+    # the items of dictionaries and sets are sorted
+    if isinstance(value, (PetriNet.Place, PetriNet.Transition)):
+        return repr(value.name)
+    if isinstance(value, dict):
+        return '{' + ', '.join(sorted(_canonical_form(key) + ': ' + _canonical_form(item) for key, item in value.items())) + '}'
+    if isinstance(value, (set, frozenset)):
+        return '{' + ', '.join(sorted(_canonical_form(item) for item in value)) + '}'
+    if isinstance(value, (list, tuple)):
+        return '(' + ', '.join(_canonical_form(item) for item in value) + ')'
+    return repr(value)
+
+
+def model_hash(petri_net, initial_marking, final_marking, parameters=None):
+    """
+    Returns a stable hash of a reference Petri net, its markings and the parameters for alignments; unlike hash(), the result is the same across
+    processes and interpreter runs.
+
+    :param petri_net: the reference Petri net
+    :param initial_marking: the initial marking of the reference Petri net
+    :param final_marking: the final marking of the reference Petri net
+    :param parameters: the optional parameters for alignments
+    :return: the hexadecimal SHA-256 digest of the model and the parameters
+    """
+
+    canonical_form = (sorted(repr(place.name) for place in petri_net.places), sorted(repr((transition.name, transition.label)) for transition in petri_net.transitions),
+                      sorted(repr((arc.source.name, arc.target.name, arc.weight)) for arc in petri_net.arcs), _canonical_form(dict(initial_marking)),
+                      _canonical_form(dict(final_marking)), _canonical_form(parameters if parameters is not None else {}))
+    return hashlib.sha256(repr(canonical_form).encode('utf-8')).hexdigest()
 
 
-def alignment_bounds_su_trace(trace, petri_net, initial_marking, final_marking, parameters=None):
+def _read_checkpoint(checkpoint_path, key):
+    # Reads the results stored by an interrupted run with the same model and parameters, ignoring the records of other runs and a possibly truncated
+    # last record
+    results = dict()
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, 'rb') as checkpoint_file:
+            while True:
+                try:
+                    record_key, record_results = pickle.load(checkpoint_file)
+                except (EOFError, pickle.UnpicklingError, TypeError, ValueError):
+                    break
+                if record_key == key:
+                    results.update(record_results)
+    return results
+
+
+def alignment_bounds_su_log_parallel(log, petri_net, initial_marking, final_marking, parameters=None, n_jobs=None, chunk_size=10, checkpoint_path=None):
+    """
+    Returns the lower and upper bounds for conformance of a strongly uncertain log against a reference Petri net, aligning its distinct variants
+    in parallel on a pool of worker processes.
+    Variants are sent to the workers in chunks, each one along with the reference Petri net, which each worker prepares once. If a checkpoint file is
+    given, results are appended to it as soon as each chunk is completed, and the variants already in it are not aligned again, so that an interrupted
+    run can be resumed. Records of the checkpoint file are tagged with the stable hash of the reference model and of the parameters, so results of runs
+    with another model are not reused.
+    An error in the alignment of a variant does not stop the run: the exception is returned in place of the bounds of the traces of that variant
+    (and the variant is retried when resuming).
+
+    :param log: the strongly uncertain event log, or an UncertainLog
+    :param petri_net: the reference Petri net
+    :param initial_marking: the initial marking of the reference Petri net
+    :param final_marking: the final marking of the reference Petri net
+    :param parameters: the optional parameters for alignments
+    :param n_jobs: the number of worker processes (all the available processors if None)
+    :param chunk_size: the number of variants sent to a worker process at a time
+    :param checkpoint_path: the optional path of the file storing partial results
+    :return: a list of 3-tuples containing the alignment results for the lower and upper bounds for conformance of the traces in the log and the sizes of
+    their realization sets, in the same order of the traces in the log
+    """
+
+    variants = log_variants(log)
+    variants_keys = {nodes_tuple: variant_hash(nodes_tuple) for nodes_tuple in variants}
+    run_key = model_hash(petri_net, initial_marking, final_marking, parameters)
+    variants_bounds = _read_checkpoint(checkpoint_path, run_key)
+
+    to_align = [(key, nodes_tuple) for nodes_tuple, key in variants_keys.items() if key not in variants_bounds]
+    chunks = [to_align[i:i + chunk_size] for i in range(0, len(to_align), chunk_size)]
+    if chunks:
+        model = (run_key, petri_net, initial_marking, final_marking, parameters)
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = {executor.submit(_alignment_bounds_su_chunk, model, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    chunk_results = future.result()
+                except Exception as e:
+                    chunk_results = [(key, e) for key, _ in futures[future]]
+                variants_bounds.update(chunk_results)
+                if checkpoint_path is not None:
+                    with open(checkpoint_path, 'ab') as checkpoint_file:
+                        pickle.dump((run_key, {key: bounds for key, bounds in chunk_results if not isinstance(bounds, Exception)}), checkpoint_file)
+
+    traces_bounds = dict()
+    for nodes_tuple, (_, traces_list) in variants.items():
+        for trace in traces_list:
+            traces_bounds[id(trace)] = variants_bounds[variants_keys[nodes_tuple]]
+
+    return [traces_bounds[id(trace)] for trace in log]
+
+
+def alignment_bounds_su_variant(nodes_tuple, behavior_graph, petri_net, initial_marking, final_marking, parameters=None, cache=None, prepared_model=None):
+    """
+    Returns the lower and upper bounds for conformance of a variant of a strongly uncertain log against a reference Petri net.
+
+    :param nodes_tuple: the nodes tuple of the variant
+    :param behavior_graph: the behavior graph of the variant
+    :param petri_net: the reference Petri net
+    :param initial_marking: the initial marking of the reference Petri net
+    :param final_marking: the final marking of the reference Petri net
+    :param parameters: the optional parameters for alignments
+    :param cache: the optional variant cache for the behavior net of the variant
+    :param prepared_model: the optional PreparedModel of the reference Petri net
+    :return: a 3-tuple containing the alignment results for the lower and upper bounds for conformance of the variant, and the size of its realization set
+    """
+
+    if cache is None:
+        behavior_net = behavior_net_builder.BehaviorNet(behavior_graph)
+    else:
+        behavior_net = cache.get_or_create(nodes_tuple, BEHAVIOR_NET, lambda: behavior_net_builder.BehaviorNet(behavior_graph))
+
+    return alignment_bounds_su_behavior_net(behavior_net, petri_net, initial_marking, final_marking, parameters, behavior_graph, prepared_model)
+
+
+def alignment_bounds_su_trace(trace, petri_net, initial_marking, final_marking, parameters=None, cache=None):
     """
     Returns the lower and upper bounds for conformance of a strongly uncertain trace against a reference Petri net by aligning all possible realizations.
 
-    :param trace: the strongly uncertain trace
+    :param trace: the strongly uncertain trace, or its behavior graph
     :param petri_net: the reference Petri net
     :param initial_marking: the initial marking of the reference Petri net
     :param final_marking: the final marking of the reference Petri net
     :param parameters: the optional parameters for alignments
+    :param cache: the optional variant cache for the behavior net of the trace
     :return: a 2-tuple containing the alignment results for the upper and lower bounds for conformance of the trace
     """
 
-    # Obtains the behavior net of the trace
-    behavior_net = behavior_net_builder.BehaviorNet(behavior_graph.BehaviorGraph(trace))
-    align_lower_bound = alignment_lower_bound_su_trace(behavior_net, behavior_net.initial_marking, behavior_net.final_marking, petri_net, initial_marking, final_marking, parameters)
-    align_upper_bound_real_size = alignment_upper_bound_su_trace_bruteforce(behavior_net, behavior_net.initial_marking, behavior_net.final_marking, petri_net, initial_marking, final_marking, parameters)
+    # Obtains the behavior graph and the behavior net of the trace
+    behavior_graph = as_behavior_graph(trace)
+    behavior_net = get_behavior_net(trace, cache)
+
+    return alignment_bounds_su_behavior_net(behavior_net, petri_net, initial_marking, final_marking, parameters, behavior_graph)
+
+
+def _normal_quantile(p):
+    # Inverse of the standard normal cumulative distribution function, by bisection
+    low, high = -10.0, 10.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if (1 + math.erf(middle / math.sqrt(2))) / 2 < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def alignment_approximation_su_trace(trace, petri_net, initial_marking, final_marking, parameters=None, n_samples=100, weights=None, seed=None, confidence=0.95):
+    """
+    Returns an approximation of the conformance of a strongly uncertain trace against a reference Petri net, for traces whose realization set is too
+    large for the exact bounds: only n_samples realizations, drawn at random from the behavior graph of the trace by sample_realizations, are aligned.
+    The minimum and maximum costs of the samples estimate the lower and upper bounds for conformance from the inside (the actual bounds can only be
+    lower and higher, respectively); the confidence interval of the mean cost over the realizations uses the normal approximation.
+    Realizations drawn more than once are aligned only once.
+
+    :param trace: the strongly uncertain trace, or its behavior graph
+    :param petri_net: the reference Petri net
+    :param initial_marking: the initial marking of the reference Petri net
+    :param final_marking: the final marking of the reference Petri net
+    :param parameters: the optional parameters for alignments
+    :param n_samples: the number of realizations to draw
+    :param weights: the optional function weighting the realizations, as in sample_realizations (realizations are drawn uniformly if None)
+    :param seed: the optional seed of the random number generator, for reproducible results
+    :param confidence: the confidence level of the interval of the mean cost
+    :return: a dictionary with the alignment results of the sampled realizations with minimum and maximum cost ('min_alignment', 'max_alignment'),
+    the minimum, maximum and mean costs ('min_cost', 'max_cost', 'mean_cost'), the standard deviation of the costs ('std_cost'), the confidence interval
+    of the mean cost ('mean_cost_interval'), the number of samples ('n_samples') and of distinct realizations aligned ('n_aligned')
+    """
+
+    if parameters is None:
+        parameters = {}
+    behavior_graph = as_behavior_graph(trace)
+    labels = behavior_graph_labels(behavior_graph)
+
+    alignments = dict()
+    costs = []
+    for realization in sample_realizations(behavior_graph, n_samples, weights, labels, seed):
+        if realization not in alignments:
+            alignments[realization] = apply(realization_to_trace(realization, labels), petri_net, initial_marking, final_marking, dict(parameters))
+        costs.append(alignments[realization]['cost'])
+
+    mean_cost = sum(costs) / len(costs)
+    std_cost = math.sqrt(sum((cost - mean_cost) ** 2 for cost in costs) / (len(costs) - 1)) if len(costs) > 1 else 0.0
+    half_width = _normal_quantile((1 + confidence) / 2) * std_cost / math.sqrt(len(costs))
+
+    return {'min_alignment': min(alignments.values(), key=lambda x: x['cost']), 'max_alignment': max(alignments.values(), key=lambda x: x['cost']),
+            'min_cost': min(costs), 'max_cost': max(costs), 'mean_cost': mean_cost, 'std_cost': std_cost,
+            'mean_cost_interval': (mean_cost - half_width, mean_cost + half_width), 'n_samples': len(costs), 'n_aligned': len(alignments)}
+
+
+def alignment_bounds_su_behavior_net(behavior_net, petri_net, initial_marking, final_marking, parameters=None, behavior_graph=None, prepared_model=None):
+    """
+    Returns the lower and upper bounds for conformance of a strongly uncertain trace, given its behavior net, against a reference Petri net.
+    If the behavior graph of the trace is also given, the upper bound is computed by branch and bound on its realizations instead of by brute force.
+
+    :param behavior_net: the behavior net of a strongly uncertain trace
+    :param petri_net: the reference Petri net
+    :param initial_marking: the initial marking of the reference Petri net
+    :param final_marking: the final marking of the reference Petri net
+    :param parameters: the optional parameters for alignments
+    :param behavior_graph: the optional behavior graph of the trace
+    :param prepared_model: the optional PreparedModel of the reference Petri net, used for the lower bound
+    :return: a 3-tuple containing the alignment results for the lower and upper bounds for conformance of the trace, and the size of its realization set
+    """
+
+    align_lower_bound = alignment_lower_bound_su_trace(behavior_net, behavior_net.initial_marking, behavior_net.final_marking, petri_net, initial_marking, final_marking, parameters, prepared_model)
+    if behavior_graph is None:
+        align_upper_bound_real_size = alignment_upper_bound_su_trace_bruteforce(behavior_net, behavior_net.initial_marking, behavior_net.final_marking, petri_net, initial_marking, final_marking, parameters)
+    else:
+        align_upper_bound_real_size = alignment_upper_bound_su_trace_bnb(behavior_graph, petri_net, initial_marking, final_marking, parameters)
 
     return align_lower_bound, align_upper_bound_real_size[0], align_upper_bound_real_size[1]
 
@@ -64,9 +333,436 @@ def alignment_upper_bound_su_trace_bruteforce(behavior_net, bn_i, bn_f, petri_ne
     return max(alignments, key=lambda x: x['cost']), len(r_s)
 
 
-def alignment_lower_bound_su_trace(behavior_net, bn_i, bn_f, petri_net, initial_marking, final_marking, parameters=None):
+class _ModelMoves(object):
+    """
+    Explores lazily the reachability graph of a reference Petri net, computing the cheapest alignments of the prefixes of a trace as maps from the markings
+    reachable by the model to the cost of reaching them.
+    """
+
+    def __init__(self, petri_net, model_cost_function, sync_cost_function, budget=None):
+        self.__petri_net = petri_net
+        self.__model_cost_function = model_cost_function
+        self.__sync_cost_function = sync_cost_function
+        self.__budget = budget
+        self.__successors = dict()
+
+    def successors(self, marking):
+        if marking not in self.__successors:
+            self.__successors[marking] = [(transition, semantics.execute(transition, self.__petri_net, marking)) for transition in semantics.enabled_transitions(self.__petri_net, marking)]
+        return self.__successors[marking]
+
+    def closure(self, costs):
+        # Dijkstra's algorithm over moves on model only, starting from all the markings in 'costs'
+        tie_breaker = count()
+        heap = [(cost, next(tie_breaker), marking) for marking, cost in costs.items()]
+        heapify(heap)
+        closed = dict()
+        while heap:
+            cost, _, marking = heappop(heap)
+            if marking in closed:
+                continue
+            closed[marking] = cost
+            if self.__budget is not None:
+                self.__budget.add_state()
+            for transition, next_marking in self.successors(marking):
+                if next_marking not in closed:
+                    heappush(heap, (cost + self.__model_cost_function[transition], next(tie_breaker), next_marking))
+        return closed
+
+    def extend(self, costs, activity_label, log_move_cost):
+        # Appends an event to the aligned prefix, either as a move on log or as a synchronous move
+        next_costs = dict()
+        for marking, cost in costs.items():
+            if next_costs.get(marking, cost + log_move_cost + 1) > cost + log_move_cost:
+                next_costs[marking] = cost + log_move_cost
+            for transition, next_marking in self.successors(marking):
+                if transition.label == activity_label and transition in self.__sync_cost_function:
+                    sync_cost = cost + self.__sync_cost_function[transition]
+                    if next_costs.get(next_marking, sync_cost + 1) > sync_cost:
+                        next_costs[next_marking] = sync_cost
+        return self.closure(next_costs)
+
+
+class _BudgetExhausted(Exception):
+    pass
+
+
+class _Budget(object):
+    """
+    Keeps track of the wall time, realizations and search states spent computing the bounds for conformance of a trace, raising _BudgetExhausted
+    as soon as one of the limits is exceeded.
+    """
+
+    def __init__(self, max_time=None, max_realizations=None, max_states=None):
+        self.__deadline = None if max_time is None else time.time() + max_time
+        self.__max_realizations = max_realizations
+        self.__max_states = max_states
+        self.__realizations = 0
+        self.__states = 0
+
+    def remaining_time(self):
+        if self.__deadline is None:
+            return None
+        return max(self.__deadline - time.time(), 0)
+
+    def check(self):
+        if self.__deadline is not None and time.time() > self.__deadline:
+            raise _BudgetExhausted()
+
+    def add_realization(self):
+        if self.__max_realizations is not None and self.__realizations >= self.__max_realizations:
+            raise _BudgetExhausted()
+        self.__realizations += 1
+        self.check()
+
+    def add_state(self):
+        self.__states += 1
+        if self.__max_states is not None and self.__states > self.__max_states:
+            raise _BudgetExhausted()
+        if self.__states & 0xff == 0:
+            self.check()
+
+
+def _search_realizations(behavior_graph, labels, petri_net, initial_marking, final_marking, parameters, budget=None, on_improvement=None):
+    """
+    Searches the realizations of a strongly uncertain trace with the worst and the best alignment costs, pruning the realizations that can not be worse
+    than the worst one found so far. If the budget is exhausted, the search stops and returns the realizations found so far.
+
+    :param behavior_graph: the behavior graph of a strongly uncertain trace
+    :param labels: the sequence of activity labels defining the label ids of the realizations
+    :param petri_net: the reference Petri net
+    :param initial_marking: the initial marking of the reference Petri net
+    :param final_marking: the final marking of the reference Petri net
+    :param parameters: the parameters for alignments
+    :param budget: the optional budget of the search
+    :param on_improvement: the optional function called with the cost of the worst realization every time a worse one is found
+    :return: a 3-tuple containing the [cost, realization] lists of the worst and of the best realizations found (None if none was found), and whether the search was completed
+    """
+
+    worst = [-1, None]
+    best = [float('inf'), None]
+
+    def visit(realization, cost):
+        if cost > worst[0]:
+            worst[:] = cost, realization
+            if on_improvement is not None:
+                on_improvement(cost)
+        if cost < best[0]:
+            best[:] = cost, realization
+
+    try:
+        if exec_utils.get_param_value(Parameters.PARAM_TRACE_COST_FUNCTION, parameters, None) is not None:
+            # Costs on the trace can not be computed on prefixes, so all the realizations are aligned
+            for realization in realization_iterator(behavior_graph, labels):
+                if budget is not None:
+                    budget.add_realization()
+                visit(realization, apply(realization_to_trace(realization, labels), petri_net, initial_marking, final_marking, dict(parameters))['cost'])
+        else:
+            model_cost_function = exec_utils.get_param_value(Parameters.PARAM_MODEL_COST_FUNCTION, parameters, None)
+            sync_cost_function = exec_utils.get_param_value(Parameters.PARAM_SYNC_COST_FUNCTION, parameters, None)
+            if model_cost_function is None or sync_cost_function is None:
+                model_cost_function = {transition: STD_MODEL_LOG_MOVE_COST if transition.label is not None else STD_TAU_COST for transition in petri_net.transitions}
+                sync_cost_function = {transition: STD_SYNC_COST for transition in petri_net.transitions if transition.label is not None}
+            model_moves = _ModelMoves(petri_net, model_cost_function, sync_cost_function, budget)
+
+            def extend(costs, label_id):
+                return model_moves.extend(costs, labels[label_id], STD_MODEL_LOG_MOVE_COST)
+
+            def prune(costs, max_remaining):
+                return costs.get(final_marking, float('inf')) + max_remaining * STD_MODEL_LOG_MOVE_COST <= worst[0]
+
+            for realization, costs in walk_realization_tree(behavior_graph, model_moves.closure({initial_marking: 0}), extend, prune, labels):
+                if budget is not None:
+                    budget.add_realization()
+                visit(realization, costs.get(final_marking, float('inf')))
+    except _BudgetExhausted:
+        return (worst if worst[1] is not None else None), (best if best[1] is not None else None), False
+
+    return worst, best, True
+
+
+def alignment_upper_bound_su_trace_bnb(behavior_graph, petri_net, initial_marking, final_marking, parameters=None):
+    """
+    Returns the upper bound for conformance of a strongly uncertain trace against a reference Petri net by branch and bound on the prefix tree of its realizations.
+    The costs of aligning a prefix, for every marking reachable in the reference Petri net, are computed once and shared by all the realizations starting
+    with that prefix; a subtree is pruned when aligning all its remaining events as moves on log cannot exceed the worst cost found so far.
+    The worst realization is then aligned with the same algorithm of alignment_upper_bound_su_trace_bruteforce, so the result has the same form and cost.
+    The reference Petri net must be bounded; costs on the trace can not be customized, and if a trace cost function is given in the parameters
+    all the realizations are aligned by brute force.
+
+    :param behavior_graph: the behavior graph of a strongly uncertain trace
+    :param petri_net: the reference Petri net
+    :param initial_marking: the initial marking of the reference Petri net
+    :param final_marking: the final marking of the reference Petri net
+    :param parameters: the optional parameters for alignments
+    :return: a 2-tuple containing the alignment results for the upper bound for conformance of the trace and the size of its realization set
+    """
+
+    if parameters is None:
+        parameters = {}
+    labels = behavior_graph_labels(behavior_graph)
+
+    worst, _, _ = _search_realizations(behavior_graph, labels, petri_net, initial_marking, final_marking, parameters)
+
+    return apply(realization_to_trace(worst[1], labels), petri_net, initial_marking, final_marking, dict(parameters)), realization_count(behavior_graph)
+
+
+def alignment_bounds_su_budgeted(behavior_net, behavior_graph, petri_net, initial_marking, final_marking, parameters=None, max_time=None, max_realizations=None, max_states=None, callback=None, prepared_model=None):
+    """
+    Returns the lower and upper bounds for conformance of a strongly uncertain trace against a reference Petri net within a budget of wall time,
+    realizations and search states, so that pathological traces do not block the computation.
+    The lower bound is computed on the product with the behavior net of the trace, limited to half of the time only; the upper bound by branch and bound
+    on the realizations, as in alignment_upper_bound_su_trace_bnb, limited by all the budgets. Search states are the markings of the reference Petri net
+    explored by the branch and bound, and the down-sets of the behavior graph visited counting its realizations.
+    If the budget is exhausted, the best-so-far bounds are returned and flagged as partial: the upper bound is then the worst realization found so far,
+    which can only underestimate the actual upper bound, and if the lower bound was not computed in time it is replaced by the best realization found,
+    which can only overestimate the actual lower bound. Bounds are None if no realization was found at all. The size of the realization set is None if
+    the budget is exhausted before it is counted.
+    The limits on realizations and search states do not apply to the A* search of the lower bound, which is only limited in time; the final alignments
+    of the worst and best realizations (two certain traces) are computed without limits.
+
+    :param behavior_net: the behavior net of a strongly uncertain trace
+    :param behavior_graph: the behavior graph of the trace
+    :param petri_net: the reference Petri net
+    :param initial_marking: the initial marking of the reference Petri net
+    :param final_marking: the final marking of the reference Petri net
+    :param parameters: the optional parameters for alignments
+    :param max_time: the optional maximum wall time in seconds
+    :param max_realizations: the optional maximum number of realizations reached by the branch and bound
+    :param max_states: the optional maximum number of search states of the branch and bound
+    :param callback: the optional function called as callback(lower_bound_cost, upper_bound_cost, exact) every time the bounds improve, with a lower
+    bound cost of None until it is known
+    :param prepared_model: the optional PreparedModel of the reference Petri net, used for the lower bound
+    :return: a 4-tuple containing the alignment results for the lower and upper bounds for conformance of the trace, the size of its realization set
+    (None if it was not counted within the budget), and whether the bounds are exact
+    """
+
+    if parameters is None:
+        parameters = {}
+    budget = _Budget(max_time, max_realizations, max_states)
+    labels = behavior_graph_labels(behavior_graph)
+
+    # Half of the time is left to the upper bound, whose search also provides a fallback for the lower bound
+    lower_parameters = dict(parameters)
+    if budget.remaining_time() is not None:
+        lower_parameters[Parameters.PARAM_MAX_ALIGN_TIME_TRACE] = budget.remaining_time() * 0.5
+    align_lower_bound = alignment_lower_bound_su_trace(behavior_net, behavior_net.initial_marking, behavior_net.final_marking, petri_net, initial_marking, final_marking, lower_parameters, prepared_model)
+    lower_bound_cost = align_lower_bound['cost'] if align_lower_bound is not None else None
+    if callback is not None and lower_bound_cost is not None:
+        callback(lower_bound_cost, None, False)
+
+    def on_improvement(upper_bound_cost):
+        if callback is not None:
+            callback(lower_bound_cost, upper_bound_cost, False)
+
+    worst, best, exact = _search_realizations(behavior_graph, labels, petri_net, initial_marking, final_marking, parameters, budget, on_improvement)
+
+    align_upper_bound = None
+    if worst is not None:
+        align_upper_bound = apply(realization_to_trace(worst[1], labels), petri_net, initial_marking, final_marking, dict(parameters))
+    if align_lower_bound is None:
+        exact = False
+        if best is not None:
+            align_lower_bound = apply(realization_to_trace(best[1], labels), petri_net, initial_marking, final_marking, dict(parameters))
+    if callback is not None:
+        callback(align_lower_bound['cost'] if align_lower_bound is not None else None, align_upper_bound['cost'] if align_upper_bound is not None else None, exact)
+
+    try:
+        n_realizations = realization_count(behavior_graph, budget.add_state)
+    except _BudgetExhausted:
+        n_realizations = None
+
+    return align_lower_bound, align_upper_bound, n_realizations, exact
+
+
+def alignment_bounds_su_trace_budgeted(trace, petri_net, initial_marking, final_marking, parameters=None, max_time=None, max_realizations=None, max_states=None, callback=None, cache=None):
+    """
+    Returns the lower and upper bounds for conformance of a strongly uncertain trace against a reference Petri net within a budget,
+    as in alignment_bounds_su_budgeted.
+
+    :param trace: the strongly uncertain trace, or its behavior graph
+    :param petri_net: the reference Petri net
+    :param initial_marking: the initial marking of the reference Petri net
+    :param final_marking: the final marking of the reference Petri net
+    :param parameters: the optional parameters for alignments
+    :param max_time: the optional maximum wall time in seconds
+    :param max_realizations: the optional maximum number of realizations reached by the branch and bound
+    :param max_states: the optional maximum number of search states of the branch and bound
+    :param callback: the optional function called as callback(lower_bound_cost, upper_bound_cost, exact) every time the bounds improve
+    :param cache: the optional variant cache for the behavior net of the trace
+    :return: a 4-tuple containing the alignment results for the lower and upper bounds for conformance of the trace, the size of its realization set
+    (None if it was not counted within the budget), and whether the bounds are exact
+    """
+
+    behavior_graph = as_behavior_graph(trace)
+    behavior_net = get_behavior_net(trace, cache)
+
+    return alignment_bounds_su_budgeted(behavior_net, behavior_graph, petri_net, initial_marking, final_marking, parameters, max_time, max_realizations, max_states, callback)
+
+
+def alignment_bounds_su_log_budgeted(log, petri_net, initial_marking, final_marking, parameters=None, max_time=None, max_realizations=None, max_states=None, callback=None, cache=None):
+    """
+    Returns the lower and upper bounds for conformance of a strongly uncertain log against a reference Petri net, with a budget for each distinct variant,
+    as in alignment_bounds_su_budgeted. Variants whose bounds are partial can be revisited later with a larger budget.
+    The reference Petri net is prepared once for all the lower bounds.
+
+    :param log: the strongly uncertain event log, or an UncertainLog
+    :param petri_net: the reference Petri net
+    :param initial_marking: the initial marking of the reference Petri net
+    :param final_marking: the final marking of the reference Petri net
+    :param parameters: the optional parameters for alignments
+    :param max_time: the optional maximum wall time in seconds for each variant
+    :param max_realizations: the optional maximum number of realizations reached by the branch and bound for each variant
+    :param max_states: the optional maximum number of search states of the branch and bound for each variant
+    :param callback: the optional function called as callback(traces, lower_bound_cost, upper_bound_cost, exact) every time the bounds of a variant
+    improve, where traces is the list of the traces of the variant
+    :param cache: the optional variant cache for the behavior nets of the traces
+    :return: a list of 4-tuples containing the alignment results for the lower and upper bounds for conformance of the traces in the log, the sizes of
+    their realization sets (None if not counted within the budget) and whether their bounds are exact
+    """
+
+    prepared_model = PreparedModel(petri_net, initial_marking, final_marking, parameters)
+    variants_bounds = dict()
+    for nodes_tuple, (behavior_graph, traces_list) in log_variants(log).items():
+        if cache is None:
+            behavior_net = behavior_net_builder.BehaviorNet(behavior_graph)
+        else:
+            behavior_net = cache.get_or_create(nodes_tuple, BEHAVIOR_NET, lambda: behavior_net_builder.BehaviorNet(behavior_graph))
+        variant_callback = None
+        if callback is not None:
+            variant_callback = lambda lower_bound_cost, upper_bound_cost, exact, traces_list=traces_list: callback(traces_list, lower_bound_cost, upper_bound_cost, exact)
+        bounds = alignment_bounds_su_budgeted(behavior_net, behavior_graph, petri_net, initial_marking, final_marking, parameters, max_time, max_realizations, max_states, variant_callback, prepared_model)
+        for trace in traces_list:
+            variants_bounds[id(trace)] = bounds
+
+    return [variants_bounds[id(trace)] for trace in log]
+
+
+class PreparedModel(object):
+    """
+    Class representing a reference Petri net prepared for the alignment of many behavior nets against it.
+    The model side of the synchronous product (the copies of the places of the reference net and the moves on model, with their costs), the markings
+    and the synchronous moves indexed by activity label are built once; every alignment only adds the places and the transitions of its behavior net.
+    The model side is shared by the synchronous products of all the alignments and restored after each of them, so a prepared model can not be used
+    by concurrent threads. Alignments have the same cost of the ones computed by apply_trace_net with the same parameters.
+    """
+
+    def __init__(self, petri_net, initial_marking, final_marking, parameters=None):
+        if parameters is None:
+            parameters = {}
+        self.__petri_net = petri_net
+        self.__parameters = parameters
+        self.__model_cost_function = exec_utils.get_param_value(Parameters.PARAM_MODEL_COST_FUNCTION, parameters, None)
+        self.__sync_cost_function = exec_utils.get_param_value(Parameters.PARAM_SYNC_COST_FUNCTION, parameters, None)
+
+        self.__model_side = PetriNet('model side of ' + str(petri_net.name))
+        self.__places = dict()
+        for place in petri_net.places:
+            self.__places[place] = PetriNet.Place((SKIP, place.name))
+            self.__model_side.places.add(self.__places[place])
+
+        # Moves on model, with their costs for the standard cost function and for the custom one (if the cost functions are given)
+        self.__standard_costs = dict()
+        self.__custom_costs = dict()
+        self.__transitions_by_label = dict()
+        for transition in petri_net.transitions:
+            model_move = PetriNet.Transition((SKIP, transition.name), (SKIP, transition.label))
+            self.__model_side.transitions.add(model_move)
+            for arc in transition.in_arcs:
+                add_arc_from_to(self.__places[arc.source], model_move, self.__model_side)
+            for arc in transition.out_arcs:
+                add_arc_from_to(model_move, self.__places[arc.target], self.__model_side)
+            self.__standard_costs[model_move] = STD_MODEL_LOG_MOVE_COST if transition.label is not None else STD_TAU_COST
+            if self.__model_cost_function is not None:
+                self.__custom_costs[model_move] = self.__model_cost_function[transition]
+            self.__transitions_by_label.setdefault(transition.label, []).append(transition)
+
+        self.__initial_marking = Marking({self.__places[place]: tokens for place, tokens in initial_marking.items()})
+        self.__final_marking = Marking({self.__places[place]: tokens for place, tokens in final_marking.items()})
+
+    def __get_petri_net(self):
+        return self.__petri_net
+
+    def align(self, trace_net, trace_im, trace_fm, parameters=None):
+        """
+        Aligns a trace net (e.g. a behavior net) against the prepared reference Petri net, as apply_trace_net does.
+        The parameters of the call are added to the ones of the prepared model; the standard cost function is used unless the trace, model and
+        sync cost functions are all given, in which case the costs of the trace net are read from the trace net costs parameter.
+
+        :param trace_net: the trace net
+        :param trace_im: the initial marking of the trace net
+        :param trace_fm: the final marking of the trace net
+        :param parameters: the optional parameters for alignments
+        :return: the alignment results, or None if the time limit for the trace is exceeded
+        """
+
+        all_parameters = dict(self.__parameters)
+        if parameters is not None:
+            all_parameters.update(parameters)
+        ret_tuple_as_trans_desc = exec_utils.get_param_value(Parameters.PARAM_ALIGNMENT_RESULT_IS_SYNC_PROD_AWARE, all_parameters, False)
+        max_align_time_trace = exec_utils.get_param_value(Parameters.PARAM_MAX_ALIGN_TIME_TRACE, all_parameters, sys.maxsize)
+        trace_net_costs = exec_utils.get_param_value(Parameters.PARAM_TRACE_NET_COSTS, all_parameters, None)
+        standard = exec_utils.get_param_value(Parameters.PARAM_TRACE_COST_FUNCTION, all_parameters, None) is None or self.__model_cost_function is None or self.__sync_cost_function is None
+
+        sync_net = PetriNet('synchronous_product_net of %s and %s' % (trace_net.name, self.__petri_net.name))
+        sync_net.places.update(self.__model_side.places)
+        sync_net.transitions.update(self.__model_side.transitions)
+        sync_net.arcs.update(self.__model_side.arcs)
+        cost_function = dict(self.__standard_costs if standard else self.__custom_costs)
+
+        trace_places = dict()
+        for place in trace_net.places:
+            trace_places[place] = PetriNet.Place((place.name, SKIP))
+            sync_net.places.add(trace_places[place])
+
+        # Arcs between the shared places of the model side and the synchronous moves, detached once the alignment is done
+        shared_arcs = []
+        try:
+            for transition in trace_net.transitions:
+                log_move = PetriNet.Transition((transition.name, SKIP), (transition.label, SKIP))
+                sync_net.transitions.add(log_move)
+                if standard:
+                    cost_function[log_move] = STD_MODEL_LOG_MOVE_COST if transition.label is not None else STD_SYNC_COST
+                else:
+                    cost_function[log_move] = trace_net_costs[transition]
+                for arc in transition.in_arcs:
+                    add_arc_from_to(trace_places[arc.source], log_move, sync_net)
+                for arc in transition.out_arcs:
+                    add_arc_from_to(log_move, trace_places[arc.target], sync_net)
+
+                for model_transition in self.__transitions_by_label.get(transition.label, ()):
+                    sync = PetriNet.Transition((transition.name, model_transition.name), (transition.label, model_transition.label))
+                    sync_net.transitions.add(sync)
+                    cost_function[sync] = STD_SYNC_COST if standard else self.__sync_cost_function[model_transition]
+                    for arc in transition.in_arcs:
+                        add_arc_from_to(trace_places[arc.source], sync, sync_net)
+                    for arc in model_transition.in_arcs:
+                        shared_arcs.append(add_arc_from_to(self.__places[arc.source], sync, sync_net))
+                    for arc in transition.out_arcs:
+                        add_arc_from_to(sync, trace_places[arc.target], sync_net)
+                    for arc in model_transition.out_arcs:
+                        shared_arcs.append(add_arc_from_to(sync, self.__places[arc.target], sync_net))
+
+            sync_im = Marking(self.__initial_marking)
+            sync_fm = Marking(self.__final_marking)
+            for place, tokens in trace_im.items():
+                sync_im[trace_places[place]] = tokens
+            for place, tokens in trace_fm.items():
+                sync_fm[trace_places[place]] = tokens
+
+            return apply_sync_prod(sync_net, sync_im, sync_fm, cost_function, SKIP, ret_tuple_as_trans_desc=ret_tuple_as_trans_desc, max_align_time_trace=max_align_time_trace)
+        finally:
+            for arc in shared_arcs:
+                arc.source.out_arcs.discard(arc)
+                arc.target.in_arcs.discard(arc)
+
+    petri_net = property(__get_petri_net)
+
+
+def alignment_lower_bound_su_trace(behavior_net, bn_i, bn_f, petri_net, initial_marking, final_marking, parameters=None, prepared_model=None):
     """
     Returns the lower bound for conformance of a strongly uncertain trace against a reference Petri net by aligning using the product between the reference Petri net and the behavior net of the trace.
+    If a prepared model of the reference Petri net is given, its synchronous product is built on top of it.
 
     :param behavior_net: the behavior net of a strongly uncertain trace
     :param bn_i: the initial marking of the behavior net
@@ -75,9 +771,13 @@ def alignment_lower_bound_su_trace(behavior_net, bn_i, bn_f, petri_net, initial_
     :param initial_marking: the initial marking of the reference Petri net
     :param final_marking: the final marking of the reference Petri net
     :param parameters: the optional parameters for alignments
+    :param prepared_model: the optional PreparedModel of the reference Petri net
     :return: the alignment results for the lower bound for conformance of the trace
     """
 
+    if prepared_model is not None:
+        return prepared_model.align(behavior_net, bn_i, bn_f, parameters)
+
     return apply_trace_net(petri_net, initial_marking, final_marking, behavior_net, bn_i, bn_f, parameters)
 
 
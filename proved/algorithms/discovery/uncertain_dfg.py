@@ -0,0 +1,114 @@
+from collections import Counter
+
+from proved.artifacts.behavior_graph.utils import as_behavior_graph, index_behavior_graph
+from proved.artifacts.uncertain_log.utils import log_variants
+
+
+def uncertain_dfg_behavior_graph(behavior_graph, multiplicity=1, certain_dfg=None, possible_dfg=None):
+    """
+    Adds the certain and possible directly-follows frequencies of the activities of a behavior graph to two directly-follows graphs, without enumerating
+    its realizations.
+    A pair of events is certainly in a directly-follows relation if they follow each other in every realization of the graph: both have a single activity
+    label and are not indeterminate, and every other event either precedes the first or follows the second, that is, no arc of the graph jumps over them,
+    no sink precedes them and no source follows them in topological order. An event y can directly follow an event x in some realization if y does not
+    precede x and all the events between x and y (following x and preceding y) are indeterminate, so that they can be skipped: in particular, any two
+    concurrent events can follow each other in both orders. The possible frequency of a pair of activities (a, b) counts the events that can be labeled a
+    and directly followed by an event that can be labeled b. The ancestors and descendants of the events are computed as bitsets, so the possible
+    frequencies take a time quadratic in the number of events, instead of the exponential size of the realization set.
+    For more information refer to:
+        Pegoraro, Marco, and Wil MP van der Aalst. "Mining uncertain event data in process mining." 2019 International Conference on Process Mining (ICPM). IEEE, 2019.
+
+    :param behavior_graph: the behavior graph (either a BehaviorGraph or a CompactBehaviorGraph)
+    :param multiplicity: the weight of the frequencies, e.g. the number of traces of the variant of the graph
+    :param certain_dfg: the directly-follows graph of the certain frequencies, as a Counter from pairs of activities (a new one is created if None)
+    :param possible_dfg: the directly-follows graph of the possible frequencies, as a Counter from pairs of activities (a new one is created if None)
+    :return: a 2-tuple containing the directly-follows graphs of the certain and of the possible frequencies
+    """
+
+    if certain_dfg is None:
+        certain_dfg = Counter()
+    if possible_dfg is None:
+        possible_dfg = Counter()
+    _, successors, _, labels, indeterminate = index_behavior_graph(behavior_graph)
+    n = len(successors)
+
+    # Bitsets of the ancestors and of the descendants of each node, and of the nodes that can not be skipped
+    ancestors = [0] * n
+    for i, node_successors in enumerate(successors):
+        for j in node_successors:
+            ancestors[j] |= ancestors[i] | 1 << i
+    descendants = [0] * n
+    for i in range(n - 1, -1, -1):
+        for j in successors[i]:
+            descendants[i] |= descendants[j] | 1 << j
+    determinate = 0
+    for i in range(n):
+        if not indeterminate[i]:
+            determinate |= 1 << i
+
+    for i in range(n):
+        node_next_labels = set()
+        for j in range(n):
+            if j == i or ancestors[i] >> j & 1:
+                continue
+            if descendants[i] >> j & 1 and descendants[i] & ancestors[j] & determinate:
+                continue
+            node_next_labels.update(labels[j])
+        for activity_from in labels[i]:
+            for activity_to in node_next_labels:
+                possible_dfg[(activity_from, activity_to)] += multiplicity
+
+    # Nodes comparable with all the others: no arc jumps over them, no sink precedes them and no source follows them
+    jumps = [0] * (n + 1)
+    has_predecessors = [False] * n
+    for i, node_successors in enumerate(successors):
+        for j in node_successors:
+            jumps[i + 1] += 1
+            jumps[j] -= 1
+            has_predecessors[j] = True
+    bottleneck = [True] * n
+    crossing_arcs = 0
+    sinks_before = 0
+    for i in range(n):
+        crossing_arcs += jumps[i]
+        bottleneck[i] = crossing_arcs == 0 and sinks_before == 0
+        sinks_before += not successors[i]
+    sources_after = 0
+    for i in range(n - 1, -1, -1):
+        bottleneck[i] = bottleneck[i] and sources_after == 0
+        sources_after += not has_predecessors[i]
+
+    for i in range(n - 1):
+        if bottleneck[i] and bottleneck[i + 1] and not indeterminate[i] and not indeterminate[i + 1] and len(labels[i]) == 1 and len(labels[i + 1]) == 1:
+            certain_dfg[(labels[i][0], labels[i + 1][0])] += multiplicity
+
+    return certain_dfg, possible_dfg
+
+
+def uncertain_dfg_trace(trace):
+    """
+    Returns the certain and possible directly-follows frequencies of the activities of a strongly uncertain trace.
+
+    :param trace: the strongly uncertain trace, or its behavior graph
+    :return: a 2-tuple containing the directly-follows graphs of the certain and of the possible frequencies, as Counters from pairs of activities
+    """
+
+    return uncertain_dfg_behavior_graph(as_behavior_graph(trace))
+
+
+def uncertain_dfg_log(log):
+    """
+    Returns the uncertain directly-follows graph of a strongly uncertain log, with certain (minimum) and possible (maximum) frequencies for each pair of
+    activities. The frequencies are computed once on the behavior graph of each variant and weighted by the number of its traces, in a single pass over the
+    variants of the log, without enumerating any realization.
+    If the log is an UncertainLog, its variants and behavior graphs are reused.
+
+    :param log: the strongly uncertain event log, or an UncertainLog
+    :return: a 2-tuple containing the directly-follows graphs of the certain and of the possible frequencies, as Counters from pairs of activities
+    """
+
+    certain_dfg = Counter()
+    possible_dfg = Counter()
+    for behavior_graph, traces_list in log_variants(log).values():
+        uncertain_dfg_behavior_graph(behavior_graph, len(traces_list), certain_dfg, possible_dfg)
+    return certain_dfg, possible_dfg
@@ -1,4 +1,5 @@
 import operator
+from bisect import bisect_left, bisect_right
 
 from networkx import DiGraph
 from pm4py.objects.log.util import xes
@@ -10,24 +11,11 @@ def create_nodes_tuples(trace, activity_key=xes.DEFAULT_NAME_KEY, timestamp_key=
     # Timestamp type: False is 'minimum', True is 'maximum'
     nodes_tuples = []
     for i, event in enumerate(trace):
-        if u_activity_key not in event:
-            if u_missing_key not in event:
-                new_node = (i, frozenset((event[activity_key],)))
-            else:
-                new_node = (i, frozenset((event[activity_key], None)))
-        else:
-            if u_missing_key not in event:
-                new_node = (i, frozenset(event[u_activity_key]['children']))
-            else:
-                new_node = (i, frozenset(tuple(event[u_activity_key]['children']) + (None,)))
+        new_node, timestamp_min, timestamp_max = _event_node(i, event, activity_key, timestamp_key, u_timestamp_min_key, u_timestamp_max_key, u_missing_key, u_activity_key)
 
         # Fill in the timestamps list
-        if u_timestamp_min_key not in event:
-            nodes_tuples.append((event[timestamp_key], new_node, False))
-            nodes_tuples.append((event[timestamp_key], new_node, True))
-        else:
-            nodes_tuples.append((event[u_timestamp_min_key], new_node, False))
-            nodes_tuples.append((event[u_timestamp_max_key], new_node, True))
+        nodes_tuples.append((timestamp_min, new_node, False))
+        nodes_tuples.append((timestamp_max, new_node, True))
 
     # Sort nodes_tuples by first term of its elements and by type of timestamp
     nodes_tuples.sort(key=operator.itemgetter(0, 2))
@@ -36,6 +24,89 @@ def create_nodes_tuples(trace, activity_key=xes.DEFAULT_NAME_KEY, timestamp_key=
     return tuple((node, timestamp_type) for _, node, timestamp_type in nodes_tuples)
 
 
+def _event_node(i, event, activity_key, timestamp_key, u_timestamp_min_key, u_timestamp_max_key, u_missing_key, u_activity_key):
+    # Returns the node of the i-th event of a trace, and the minimum and maximum values of its timestamp
+    if u_activity_key not in event:
+        if u_missing_key not in event:
+            new_node = (i, frozenset((event[activity_key],)))
+        else:
+            new_node = (i, frozenset((event[activity_key], None)))
+    else:
+        if u_missing_key not in event:
+            new_node = (i, frozenset(event[u_activity_key]['children']))
+        else:
+            new_node = (i, frozenset(tuple(event[u_activity_key]['children']) + (None,)))
+
+    if u_timestamp_min_key not in event:
+        return new_node, event[timestamp_key], event[timestamp_key]
+    return new_node, event[u_timestamp_min_key], event[u_timestamp_max_key]
+
+
+def create_edges_list(nodes_tuples):
+    """
+    Returns the edges of the behavior graph of a trace, in the form of the transitive reduction of the precedence relation between its events.
+    Sweeps the timestamp-sorted tuples of the trace: a node precedes all the nodes starting after it ends, and its successors in the transitive reduction
+    are the ones starting before the earliest end among those nodes. Runs in O(n log n + |E|).
+
+    :param nodes_tuples: The nodes and timestamp types of a trace sorted by timestamp, as returned by create_nodes_tuples
+    :type nodes_tuples:
+    :return: The list of edges of the behavior graph
+    :rtype: list
+    """
+
+    # Positions of the minimum timestamps in the sorted tuples, and positions of the maximum timestamps for each node
+    start_positions = []
+    start_nodes = []
+    end_positions = {}
+    for position, (node, timestamp_type) in enumerate(nodes_tuples):
+        if timestamp_type is False:
+            start_positions.append(position)
+            start_nodes.append(node)
+        else:
+            end_positions[node] = position
+
+    # earliest_end[k] is the earliest end among the nodes starting at or after the k-th minimum timestamp
+    earliest_end = [len(nodes_tuples)] * (len(start_nodes) + 1)
+    for k in range(len(start_nodes) - 1, -1, -1):
+        earliest_end[k] = min(earliest_end[k + 1], end_positions[start_nodes[k]])
+
+    edges_list = []
+    for position, (node1, timestamp_type) in enumerate(nodes_tuples):
+        if timestamp_type is True:
+            first_successor = bisect_right(start_positions, position)
+            last_successor = bisect_left(start_positions, earliest_end[first_successor])
+            edges_list.extend((node1, node2) for node2 in start_nodes[first_successor:last_successor])
+
+    return edges_list
+
+
+def create_edges_list_naive(nodes_tuples):
+    """
+    Returns the edges of the behavior graph of a trace, in the form of the transitive reduction of the precedence relation between its events.
+    Quadratic-time reference implementation of create_edges_list, returning the same list of edges.
+
+    :param nodes_tuples: The nodes and timestamp types of a trace sorted by timestamp, as returned by create_nodes_tuples
+    :type nodes_tuples:
+    :return: The list of edges of the behavior graph
+    :rtype: list
+    """
+
+    edges_list = []
+
+    # Applies the sweeping algorithm to the sorted list
+    for i, node_tuple1 in enumerate(nodes_tuples):
+        node1, type1 = node_tuple1
+        if type1 is True:
+            for node_tuple2 in nodes_tuples[i + 1:]:
+                node2, type2 = node_tuple2
+                if type2 is False:
+                    edges_list.append((node1, node2))
+                elif (node1, node2) in edges_list:
+                    break
+
+    return edges_list
+
+
 class BehaviorGraph(DiGraph):
     """
     Class representing a behavior graph, a directed acyclic graph showing the precedence relationship between uncertain events.
@@ -43,25 +114,86 @@ class BehaviorGraph(DiGraph):
         Pegoraro, Marco, and Wil MP van der Aalst. "Mining uncertain event data in process mining." 2019 International Conference on Process Mining (ICPM). IEEE, 2019.
     """
 
-    def __init__(self, trace, activity_key=xes.DEFAULT_NAME_KEY, timestamp_key=xes.DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=xes_keys.DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=xes_keys.DEFAULT_U_TIMESTAMP_MAX_KEY, u_missing_key=xes_keys.DEFAULT_U_MISSING_KEY, u_activity_key=xes_keys.DEFAULT_U_NAME_KEY):
+    def __init__(self, trace=None, activity_key=xes.DEFAULT_NAME_KEY, timestamp_key=xes.DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=xes_keys.DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=xes_keys.DEFAULT_U_TIMESTAMP_MAX_KEY, u_missing_key=xes_keys.DEFAULT_U_MISSING_KEY, u_activity_key=xes_keys.DEFAULT_U_NAME_KEY, nodes_tuples=None):
         super().__init__(self)
 
-        node_tuples = create_nodes_tuples(trace, activity_key, timestamp_key, u_timestamp_min_key, u_timestamp_max_key, u_missing_key, u_activity_key)
-        edges_list = []
+        # The nodes tuples of the trace can be passed directly, if already computed; with neither a trace nor nodes tuples the graph is empty
+        if nodes_tuples is None:
+            if trace is None:
+                return
+            nodes_tuples = create_nodes_tuples(trace, activity_key, timestamp_key, u_timestamp_min_key, u_timestamp_max_key, u_missing_key, u_activity_key)
 
         # Adding the nodes to the graph object
-        self.add_nodes_from([node for node, _ in node_tuples])
-
-        # Applies the sweeping algorithm to the sorted list
-        for i, node_tuple1 in enumerate(node_tuples):
-            node1, type1 = node_tuple1
-            if type1 is True:
-                for node_tuple2 in node_tuples[i + 1:]:
-                    node2, type2 = node_tuple2
-                    if type2 is False:
-                        edges_list.append((node1, node2))
-                    elif (node1, node2) in edges_list:
-                        break
+        self.add_nodes_from([node for node, _ in nodes_tuples])
 
         # Adding the edges to the graph object
-        self.add_edges_from(edges_list)
+        self.add_edges_from(create_edges_list(nodes_tuples))
+
+
+class IncrementalBehaviorGraph(BehaviorGraph):
+    """
+    Class representing the behavior graph of a trace that grows one event at a time, e.g. an open case in an event stream.
+    The timestamp-sorted nodes tuple of the trace is kept up to date by insertion, and appending an event only updates the arcs around the interval of the
+    new node: its predecessors are the nodes ending between the latest start of a node ending before it and its own start, its successors the nodes
+    starting between its own end and the earliest end of a node starting after it, and the arcs from its predecessors to its successors are removed.
+    The result is always equal to the BehaviorGraph of the whole trace.
+    """
+
+    def __init__(self, activity_key=xes.DEFAULT_NAME_KEY, timestamp_key=xes.DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=xes_keys.DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=xes_keys.DEFAULT_U_TIMESTAMP_MAX_KEY, u_missing_key=xes_keys.DEFAULT_U_MISSING_KEY, u_activity_key=xes_keys.DEFAULT_U_NAME_KEY):
+        super().__init__()
+        self.__keys = (activity_key, timestamp_key, u_timestamp_min_key, u_timestamp_max_key, u_missing_key, u_activity_key)
+        # Sorted (timestamp, timestamp type) pairs and the corresponding (node, timestamp type) pairs of the nodes tuple
+        self.__sort_keys = []
+        self.__nodes_tuples = []
+        self.__n_events = 0
+
+    def append_event(self, event):
+        """
+        Adds the next event of the trace to the graph.
+
+        :param event: The event
+        :type event:
+        :return: The node of the event
+        :rtype: tuple
+        """
+
+        new_node, timestamp_min, timestamp_max = _event_node(self.__n_events, event, *self.__keys)
+        self.__n_events += 1
+
+        # The new endpoints follow the equal ones, as the endpoints of the last event of the trace in the stable sort of create_nodes_tuples
+        start_position = bisect_right(self.__sort_keys, (timestamp_min, False))
+        self.__sort_keys.insert(start_position, (timestamp_min, False))
+        self.__nodes_tuples.insert(start_position, (new_node, False))
+        end_position = bisect_right(self.__sort_keys, (timestamp_max, True))
+        self.__sort_keys.insert(end_position, (timestamp_max, True))
+        self.__nodes_tuples.insert(end_position, (new_node, True))
+
+        # Backwards from the start of the new node, up to the start of the first node ending in between
+        predecessors = set()
+        for position in range(start_position - 1, -1, -1):
+            node, timestamp_type = self.__nodes_tuples[position]
+            if timestamp_type is True:
+                predecessors.add(node)
+            elif node in predecessors:
+                break
+
+        # Forwards from the end of the new node, up to the end of the first node starting in between
+        successors = set()
+        for position in range(end_position + 1, len(self.__nodes_tuples)):
+            node, timestamp_type = self.__nodes_tuples[position]
+            if timestamp_type is False:
+                successors.add(node)
+            elif node in successors:
+                break
+
+        self.add_node(new_node)
+        if successors:
+            self.remove_edges_from([(node_from, node_to) for node_from in predecessors for node_to in self.successors(node_from) if node_to in successors])
+        self.add_edges_from((node_from, new_node) for node_from in predecessors)
+        self.add_edges_from((new_node, node_to) for node_to in successors)
+        return new_node
+
+    def __get_nodes_tuple(self):
+        return tuple(self.__nodes_tuples)
+
+    nodes_tuple = property(__get_nodes_tuple)
@@ -0,0 +1,227 @@
+import heapq
+from array import array
+
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph, create_edges_list
+
+
+class LabelTable(object):
+    """
+    Class that interns activity labels into integer label ids, so that the graphs of a whole log can share a single copy of each label.
+    """
+
+    def __init__(self, labels=()):
+        self.__labels = []
+        self.__label_ids = dict()
+        for activity_label in labels:
+            self.intern(activity_label)
+
+    def intern(self, activity_label):
+        """
+        Returns the label id of an activity label, assigning a new one if the label has never been seen before.
+
+        :param activity_label: An activity label
+        :type activity_label:
+        :return: The label id of the activity label
+        :rtype: int
+        """
+
+        label_id = self.__label_ids.get(activity_label)
+        if label_id is None:
+            label_id = len(self.__labels)
+            self.__labels.append(activity_label)
+            self.__label_ids[activity_label] = label_id
+        return label_id
+
+    def label_id(self, activity_label):
+        return self.__label_ids[activity_label]
+
+    def __getitem__(self, label_id):
+        return self.__labels[label_id]
+
+    def __len__(self):
+        return len(self.__labels)
+
+    def __iter__(self):
+        return iter(self.__labels)
+
+
+def _csr(lists, typecode='i'):
+    # Returns the offsets and the concatenated values of a list of lists of integers
+    offsets = array(typecode, [0])
+    values = array(typecode)
+    for values_list in lists:
+        values.extend(values_list)
+        offsets.append(len(values))
+    return offsets, values
+
+
+def _topological_order(behavior_graph):
+    # Returns the nodes of a behavior graph in topological order, keeping their order in the graph whenever it allows it (Kahn's algorithm on a heap of
+    # positions): graphs built from the nodes tuples are already in topological order, while e.g. an IncrementalBehaviorGraph has its nodes in arrival order
+    nodes = list(behavior_graph.nodes)
+    positions = {node: position for position, node in enumerate(nodes)}
+    in_degrees = [0] * len(nodes)
+    for _, node_to in behavior_graph.edges:
+        in_degrees[positions[node_to]] += 1
+    ready = [position for position, in_degree in enumerate(in_degrees) if in_degree == 0]
+    heapq.heapify(ready)
+    topological_order = []
+    while ready:
+        node = nodes[heapq.heappop(ready)]
+        topological_order.append(node)
+        for node_to in behavior_graph.successors(node):
+            position = positions[node_to]
+            in_degrees[position] -= 1
+            if in_degrees[position] == 0:
+                heapq.heappush(ready, position)
+    return topological_order
+
+
+class CompactBehaviorGraph(object):
+    """
+    Class representing a behavior graph with integer node ids and array-backed storage, as a memory-efficient alternative to BehaviorGraph.
+    Node ids follow a topological order; the adjacency of the graph is stored in CSR form (offsets and concatenated neighbor ids), the activity labels of each
+    node as interned label ids in CSR form, and the indeterminate events in a bitmap.
+    Nodes are exposed as the same (index, frozenset of activity labels) tuples of BehaviorGraph, through the same nodes, edges, successors and predecessors
+    interface, so that the two classes can be used interchangeably.
+    """
+
+    __slots__ = ('__label_table', '__event_indices', '__node_ids', '__label_offsets', '__label_ids', '__indeterminate', '__successor_offsets',
+                 '__successor_ids', '__predecessor_offsets', '__predecessor_ids')
+
+    def __init__(self, nodes=(), edges=(), label_table=None):
+        """
+        :param nodes: The nodes of the graph, as (index, frozenset of activity labels) tuples in topological order
+        :param edges: The edges of the graph, as pairs of nodes
+        :param label_table: The label table interning the activity labels (a new one is created if None)
+        """
+
+        if label_table is None:
+            label_table = LabelTable()
+        self.__label_table = label_table
+
+        nodes = list(nodes)
+        self.__event_indices = array('i', (node[0] for node in nodes))
+        self.__node_ids = array('i', [0] * (max(self.__event_indices) + 1 if nodes else 0))
+        for node_id, event_index in enumerate(self.__event_indices):
+            self.__node_ids[event_index] = node_id
+
+        self.__label_offsets, self.__label_ids = _csr(sorted(label_table.intern(activity_label) for activity_label in node[1] if activity_label is not None) for node in nodes)
+        indeterminate = bytearray((len(nodes) + 7) // 8)
+        for node_id, node in enumerate(nodes):
+            if None in node[1]:
+                indeterminate[node_id >> 3] |= 1 << (node_id & 7)
+        self.__indeterminate = bytes(indeterminate)
+
+        successors = [[] for _ in nodes]
+        predecessors = [[] for _ in nodes]
+        for node_from, node_to in edges:
+            node_id_from, node_id_to = self.__node_ids[node_from[0]], self.__node_ids[node_to[0]]
+            successors[node_id_from].append(node_id_to)
+            predecessors[node_id_to].append(node_id_from)
+        self.__successor_offsets, self.__successor_ids = _csr(successors)
+        self.__predecessor_offsets, self.__predecessor_ids = _csr(predecessors)
+
+    @classmethod
+    def from_behavior_graph(cls, behavior_graph, label_table=None):
+        """
+        Returns the compact form of a behavior graph. Nodes are numbered in topological order, regardless of the order of the nodes in the graph (e.g. the
+        arrival order of the events in an IncrementalBehaviorGraph).
+
+        :param behavior_graph: A behavior graph
+        :type behavior_graph:
+        :param label_table: The label table interning the activity labels (a new one is created if None)
+        :type label_table:
+        :return: The compact behavior graph
+        :rtype:
+        """
+
+        return cls(_topological_order(behavior_graph), behavior_graph.edges, label_table)
+
+    @classmethod
+    def from_nodes_tuples(cls, nodes_tuples, label_table=None):
+        """
+        Returns the compact behavior graph of a trace straight from its nodes tuples, without building a BehaviorGraph.
+
+        :param nodes_tuples: The nodes and timestamp types of a trace sorted by timestamp, as returned by create_nodes_tuples
+        :type nodes_tuples:
+        :param label_table: The label table interning the activity labels (a new one is created if None)
+        :type label_table:
+        :return: The compact behavior graph
+        :rtype:
+        """
+
+        return cls([node for node, timestamp_type in nodes_tuples if timestamp_type is False], create_edges_list(nodes_tuples), label_table)
+
+    def to_behavior_graph(self):
+        """
+        Returns the networkx-based form of the graph, e.g. for visualization.
+
+        :return: The behavior graph
+        :rtype:
+        """
+
+        behavior_graph = BehaviorGraph()
+        behavior_graph.add_nodes_from(self.nodes)
+        behavior_graph.add_edges_from(self.edges)
+        return behavior_graph
+
+    # Integer-level interface
+
+    def number_of_nodes(self):
+        return len(self.__event_indices)
+
+    def number_of_edges(self):
+        return len(self.__successor_ids)
+
+    def successor_ids(self, node_id):
+        return self.__successor_ids[self.__successor_offsets[node_id]:self.__successor_offsets[node_id + 1]]
+
+    def predecessor_ids(self, node_id):
+        return self.__predecessor_ids[self.__predecessor_offsets[node_id]:self.__predecessor_offsets[node_id + 1]]
+
+    def node_label_ids(self, node_id):
+        return self.__label_ids[self.__label_offsets[node_id]:self.__label_offsets[node_id + 1]]
+
+    def is_indeterminate(self, node_id):
+        return bool(self.__indeterminate[node_id >> 3] >> (node_id & 7) & 1)
+
+    def event_index(self, node_id):
+        return self.__event_indices[node_id]
+
+    def node_id(self, node):
+        return self.__node_ids[node[0]]
+
+    def node(self, node_id):
+        activity_labels = [self.__label_table[label_id] for label_id in self.node_label_ids(node_id)]
+        if self.is_indeterminate(node_id):
+            activity_labels.append(None)
+        return self.__event_indices[node_id], frozenset(activity_labels)
+
+    # Same interface as BehaviorGraph
+
+    def successors(self, node):
+        return iter([self.node(node_id) for node_id in self.successor_ids(self.node_id(node))])
+
+    def predecessors(self, node):
+        return iter([self.node(node_id) for node_id in self.predecessor_ids(self.node_id(node))])
+
+    def __get_label_table(self):
+        return self.__label_table
+
+    def __get_nodes(self):
+        return tuple(self.node(node_id) for node_id in range(len(self.__event_indices)))
+
+    def __get_edges(self):
+        nodes = self.__get_nodes()
+        return tuple((nodes[node_id_from], nodes[node_id_to]) for node_id_from in range(len(nodes)) for node_id_to in self.successor_ids(node_id_from))
+
+    def __len__(self):
+        return len(self.__event_indices)
+
+    def __iter__(self):
+        return iter(self.__get_nodes())
+
+    label_table = property(__get_label_table)
+    nodes = property(__get_nodes)
+    edges = property(__get_edges)
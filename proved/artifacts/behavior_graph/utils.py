@@ -0,0 +1,618 @@
+import math
+import random
+from heapq import heappop, heappush
+from itertools import count
+
+from pm4py.objects.log.log import Trace, Event
+from pm4py.objects.log.util import xes
+from pm4py.util.xes_constants import DEFAULT_NAME_KEY
+
+import proved.xes_keys as xes_keys
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph, create_nodes_tuples
+from proved.artifacts.behavior_graph.compact_behavior_graph import CompactBehaviorGraph
+
+
+def is_behavior_graph(obj):
+    """
+    Returns whether an object is a behavior graph (either a BehaviorGraph or a CompactBehaviorGraph) rather than an uncertain trace.
+
+    :param obj: An uncertain trace or a behavior graph
+    :type obj:
+    :return: True if the object is a behavior graph
+    :rtype: bool
+    """
+
+    return isinstance(obj, (BehaviorGraph, CompactBehaviorGraph))
+
+
+def as_behavior_graph(trace):
+    """
+    Returns the behavior graph of an uncertain trace; behavior graphs (either a BehaviorGraph or a CompactBehaviorGraph) are returned as they are.
+
+    :param trace: An uncertain trace or a behavior graph
+    :type trace:
+    :return: The behavior graph of the trace
+    :rtype:
+    """
+
+    if is_behavior_graph(trace):
+        return trace
+    return BehaviorGraph(trace)
+
+
+def _popcount(bitmask):
+    return bin(bitmask).count('1')
+
+
+def index_behavior_graph(behavior_graph):
+    """
+    Returns an integer-indexed view of a behavior graph, with nodes numbered in topological order.
+    The view is a 5-tuple containing the list of nodes, the tuple of successor indices of each node, the bitmask of the predecessors of each node,
+    the tuple of (not None) activity labels of each node and the indeterminate flag of each node.
+
+    :param behavior_graph: A behavior graph
+    :type behavior_graph:
+    :return: The integer-indexed view of the behavior graph
+    :rtype:
+    """
+
+    # Compact behavior graphs already number their nodes in topological order
+    if isinstance(behavior_graph, CompactBehaviorGraph):
+        nodes = list(behavior_graph.nodes)
+        successors = [tuple(behavior_graph.successor_ids(i)) for i in range(len(nodes))]
+        return _indexed_view(nodes, successors)
+
+    # Kahn's algorithm, preserving the insertion order of the nodes (that already is a topological order for behavior graphs)
+    in_degree = {node: 0 for node in behavior_graph.nodes}
+    for _, node_to in behavior_graph.edges:
+        in_degree[node_to] += 1
+    ready = [node for node, degree in in_degree.items() if degree == 0]
+    nodes = []
+    while ready:
+        new_ready = []
+        for node in ready:
+            nodes.append(node)
+            for node_to in behavior_graph.successors(node):
+                in_degree[node_to] -= 1
+                if in_degree[node_to] == 0:
+                    new_ready.append(node_to)
+        ready = new_ready
+
+    node_ids = {node: i for i, node in enumerate(nodes)}
+    successors = [tuple(node_ids[node_to] for node_to in behavior_graph.successors(node)) for node in nodes]
+    return _indexed_view(nodes, successors)
+
+
+def _indexed_view(nodes, successors):
+    pred_masks = [0] * len(nodes)
+    for i, node_successors in enumerate(successors):
+        for j in node_successors:
+            pred_masks[j] |= 1 << i
+    labels = [tuple(sorted((activity_label for activity_label in node[1] if activity_label is not None), key=str)) for node in nodes]
+    indeterminate = [None in node[1] for node in nodes]
+
+    return nodes, successors, pred_masks, labels, indeterminate
+
+
+def _newly_enabled(indexed, mask, node):
+    # Returns the successors of 'node' that become enabled once all the nodes in 'mask' have been processed
+    _, successors, pred_masks, _, _ = indexed
+    return tuple(node_to for node_to in successors[node] if pred_masks[node_to] & ~mask == 0)
+
+
+def _enabled(indexed, mask):
+    # Returns the nodes that are not processed yet and whose predecessors all are
+    _, _, pred_masks, _, _ = indexed
+    return [i for i, pred_mask in enumerate(pred_masks) if not mask >> i & 1 and pred_mask & ~mask == 0]
+
+
+def _expansions(indexed, mask, pending, skip_weights):
+    """
+    Decides, for each pending indeterminate node, whether it is skipped or included in the realization.
+    Skipped nodes are processed as soon as they become enabled, so that every realization corresponds to exactly one sequence of decisions.
+
+    :param indexed: the integer-indexed view of a behavior graph
+    :param mask: the bitmask of the processed nodes
+    :param pending: the indeterminate nodes waiting for a decision
+    :param skip_weights: the weight of skipping each indeterminate node
+    :return: a list of 3-tuples containing the weight of the decisions, the bitmask of the resulting state and the tuple of skipped nodes
+    """
+
+    outcomes = []
+    stack = [(mask, tuple(pending), 1, ())]
+    while stack:
+        mask, pending, weight, skipped = stack.pop()
+        if not pending:
+            outcomes.append((weight, mask, skipped))
+            continue
+        node, rest = pending[0], pending[1:]
+        skip_mask = mask | 1 << node
+        stack.append((skip_mask, rest + tuple(node_to for node_to in _newly_enabled(indexed, skip_mask, node) if indexed[4][node_to]), weight * skip_weights[node], skipped + (node,)))
+        stack.append((mask, rest, weight, skipped))
+    return outcomes
+
+
+def _initial_expansions(indexed, skip_weights):
+    # The indeterminate nodes without predecessors need a decision before anything else happens
+    return _expansions(indexed, 0, tuple(i for i in _enabled(indexed, 0) if indexed[4][i]), skip_weights)
+
+
+def _transitions(indexed, mask, label_weights, skip_weights):
+    # Returns the states reachable from 'mask' by executing one enabled node, together with the weight of each step
+    transitions = []
+    for node in _enabled(indexed, mask):
+        node_mask = mask | 1 << node
+        pending = tuple(node_to for node_to in _newly_enabled(indexed, node_mask, node) if indexed[4][node_to])
+        node_weight = sum(label_weights[node])
+        for weight, next_mask, skipped in _expansions(indexed, node_mask, pending, skip_weights):
+            transitions.append((node_weight * weight, next_mask, node, skipped))
+    return transitions
+
+
+def _state_weights(indexed, label_weights, skip_weights, on_state=None):
+    """
+    Computes, for every reachable state, the total weight of the ways of completing a realization from it.
+    States are down-sets of the behavior graph (equivalently, antichains of nodes), encoded as bitmasks of the processed nodes.
+
+    :param indexed: the integer-indexed view of a behavior graph
+    :param label_weights: the weight of each activity label of each node
+    :param skip_weights: the weight of skipping each indeterminate node
+    :param on_state: the optional function called every time a state is expanded
+    :return: a dictionary from states to their completion weight
+    """
+
+    memo = {(1 << len(indexed[0])) - 1: 1}
+    expanded = {}
+    stack = [mask for _, mask, _ in _initial_expansions(indexed, skip_weights)]
+    while stack:
+        mask = stack[-1]
+        if mask in memo:
+            stack.pop()
+            continue
+        if mask not in expanded:
+            if on_state is not None:
+                on_state()
+            expanded[mask] = _transitions(indexed, mask, label_weights, skip_weights)
+        missing = [next_mask for _, next_mask, _, _ in expanded[mask] if next_mask not in memo]
+        if missing:
+            stack.extend(missing)
+        else:
+            memo[mask] = sum(weight * memo[next_mask] for weight, next_mask, _, _ in expanded.pop(mask))
+            stack.pop()
+    return memo
+
+
+def _unit_weights(indexed):
+    return [[1] * len(node_labels) for node_labels in indexed[3]], [1 if node_indeterminate else 0 for node_indeterminate in indexed[4]]
+
+
+def realization_count(behavior_graph, on_state=None):
+    """
+    Returns the number of realizations of an uncertain trace, counted directly on its behavior graph without enumerating them.
+    Linear extensions are counted with a dynamic program over the down-sets of the graph, multiplied by the label choices of each node;
+    indeterminate nodes can be either skipped or included.
+    The result is equal to the size of the realization set obtained executing the behavior net of the trace.
+    The number of down-sets can grow exponentially with the width of the graph: on_state is called for each of them, and can stop the count by raising
+    an exception.
+
+    :param behavior_graph: A behavior graph
+    :type behavior_graph:
+    :param on_state: The optional function called for every down-set visited by the dynamic program
+    :type on_state:
+    :return: The number of realizations of the behavior graph
+    :rtype: int
+    """
+
+    indexed = index_behavior_graph(behavior_graph)
+    label_weights, skip_weights = _unit_weights(indexed)
+    memo = _state_weights(indexed, label_weights, skip_weights, on_state)
+
+    return sum(weight * memo[mask] for weight, mask, _ in _initial_expansions(indexed, skip_weights))
+
+
+def realization_count_upper_bound(behavior_graph):
+    """
+    Returns a cheap upper bound for the number of realizations of an uncertain trace, computed in a single pass over its behavior graph.
+    Every node can be inserted in a linear extension of the nodes preceding it in topological order in at most one position more than the number of
+    those nodes it is concurrent with, and can then take one of its activity labels (or be skipped, if indeterminate).
+    Useful to decide whether the realization set is small enough to be enumerated.
+
+    :param behavior_graph: A behavior graph
+    :type behavior_graph:
+    :return: An upper bound for the number of realizations of the behavior graph
+    :rtype: int
+    """
+
+    _, successors, _, labels, indeterminate = index_behavior_graph(behavior_graph)
+    ancestors = [0] * len(successors)
+    upper_bound = 1
+    for i, node_successors in enumerate(successors):
+        for j in node_successors:
+            ancestors[j] |= ancestors[i] | 1 << i
+        upper_bound *= (1 + _popcount(((1 << i) - 1) & ~ancestors[i])) * (len(labels[i]) + indeterminate[i])
+
+    return upper_bound
+
+
+def behavior_graph_labels(behavior_graph):
+    """
+    Returns the activity labels appearing in a behavior graph, sorted; the position of a label in the tuple is its label id.
+
+    :param behavior_graph: A behavior graph
+    :type behavior_graph:
+    :return: The sorted tuple of activity labels of the behavior graph
+    :rtype: tuple
+    """
+
+    return tuple(sorted({activity_label for node in behavior_graph.nodes for activity_label in node[1] if activity_label is not None}, key=str))
+
+
+# Pseudo label ids for the decisions on pending indeterminate nodes
+_SKIP = -1
+_INCLUDE = -2
+
+
+def _choices(indexed, mask, pending, node_label_ids):
+    # A pending indeterminate node is either skipped or included, otherwise any enabled node can be executed with any of its labels
+    if pending:
+        return [(pending[0], _SKIP), (pending[0], _INCLUDE)]
+    return [(node, label_id) for node in _enabled(indexed, mask) for label_id in node_label_ids[node]]
+
+
+def walk_realization_tree(behavior_graph, root_state, extend, prune=None, labels=None):
+    """
+    Walks depth-first the prefix tree of the realizations of an uncertain trace, built with backtracking over the topological orders of its behavior graph.
+    A state is threaded along each branch: extend(state, label_id) returns the state of a prefix extended with an activity label, so that realizations
+    sharing a prefix share the computation of its state. If prune(state, max_remaining) returns True, the subtree of the current prefix is not explored;
+    max_remaining is the number of events that can still be appended to the prefix.
+    Only the current path of the search is kept in memory.
+
+    :param behavior_graph: A behavior graph
+    :type behavior_graph:
+    :param root_state: The state of the empty prefix
+    :type root_state:
+    :param extend: The function computing the state of a prefix extended with a label id
+    :type extend:
+    :param prune: The optional function deciding whether the subtree of a prefix can be skipped
+    :type prune:
+    :param labels: The sequence of activity labels defining the label ids (defaults to behavior_graph_labels(behavior_graph))
+    :type labels:
+    :return: A generator of 2-tuples containing a realization, as a tuple of label ids, and its state
+    :rtype:
+    """
+
+    indexed = index_behavior_graph(behavior_graph)
+    if labels is None:
+        labels = behavior_graph_labels(behavior_graph)
+    label_ids = {activity_label: i for i, activity_label in enumerate(labels)}
+    node_label_ids = [tuple(label_ids[activity_label] for activity_label in node_labels) for node_labels in indexed[3]]
+    n_nodes = len(indexed[0])
+    full = (1 << n_nodes) - 1
+
+    if prune is not None and prune(root_state, n_nodes):
+        return
+    realization = []
+    pending = tuple(i for i in _enabled(indexed, 0) if indexed[4][i])
+    # Each frame of the stack holds a state of the search, its choices, the next choice to try, the length of the realization when entering it,
+    # the number of processed nodes and the state of the prefix
+    stack = [[0, pending, _choices(indexed, 0, pending, node_label_ids), 0, 0, 0, root_state]]
+    while stack:
+        frame = stack[-1]
+        mask, pending, choices, next_choice, length, processed, state = frame
+        del realization[length:]
+        if mask == full and not pending:
+            stack.pop()
+            yield tuple(realization), state
+            continue
+        if next_choice == len(choices):
+            stack.pop()
+            continue
+        frame[3] += 1
+        node, label_id = choices[next_choice]
+        if label_id == _SKIP:
+            mask |= 1 << node
+            processed += 1
+            pending = pending[1:] + tuple(node_to for node_to in _newly_enabled(indexed, mask, node) if indexed[4][node_to])
+        elif label_id == _INCLUDE:
+            # The pending indeterminate node will be executed later on, like any other node
+            pending = pending[1:]
+        else:
+            realization.append(label_id)
+            mask |= 1 << node
+            processed += 1
+            pending = tuple(node_to for node_to in _newly_enabled(indexed, mask, node) if indexed[4][node_to])
+            state = extend(state, label_id)
+            if prune is not None and prune(state, n_nodes - processed):
+                continue
+        stack.append([mask, pending, _choices(indexed, mask, pending, node_label_ids), 0, len(realization), processed, state])
+
+
+def _no_state(state, label_id):
+    return None
+
+
+def realization_iterator(behavior_graph, labels=None):
+    """
+    Lazily yields the realizations of an uncertain trace one at a time, walking its behavior graph with backtracking over topological orders.
+    Realizations are tuples of label ids, i.e. positions in 'labels'. Every realization of the realization set is yielded exactly once,
+    and only the current path of the search is kept in memory, so callers can stop early or consume the realizations as a stream.
+
+    :param behavior_graph: A behavior graph
+    :type behavior_graph:
+    :param labels: The sequence of activity labels defining the label ids (defaults to behavior_graph_labels(behavior_graph))
+    :type labels:
+    :return: A generator of realizations as tuples of label ids
+    :rtype:
+    """
+
+    for realization, _ in walk_realization_tree(behavior_graph, None, _no_state, labels=labels):
+        yield realization
+
+
+def _weighted_choice(rng, items):
+    # Picks one of the (weight, value) pairs with probability proportional to its weight; integer weights are drawn exactly, however large
+    total = sum(weight for weight, _ in items)
+    if total <= 0:
+        raise ValueError('The realizations of the behavior graph have zero total weight.')
+    if all(isinstance(weight, int) for weight, _ in items):
+        threshold = rng.randrange(total)
+    else:
+        threshold = rng.random() * total
+    for weight, value in items:
+        if threshold < weight:
+            return value
+        threshold -= weight
+    return items[-1][1]
+
+
+def sample_realizations(behavior_graph, n_samples, weights=None, labels=None, seed=None):
+    """
+    Lazily yields realizations of an uncertain trace drawn independently at random, directly from its behavior graph.
+    Without weights, realizations are drawn uniformly from the realization set: every step is chosen with probability proportional to the number of
+    completions it leads to, counted with the same dynamic program of realization_count. With weights, weights(node, activity_label) gives the weight
+    of executing a node with an activity label, or of skipping an indeterminate node when activity_label is None, and every realization is drawn with
+    probability proportional to the product of the weights of its choices (orders of the nodes are weighted uniformly).
+    The dynamic program visits all the down-sets of the behavior graph once, before the first sample.
+
+    :param behavior_graph: A behavior graph
+    :type behavior_graph:
+    :param n_samples: The number of realizations to draw
+    :type n_samples: int
+    :param weights: The optional function giving the weights of the choices of activity labels and skips
+    :type weights:
+    :param labels: The sequence of activity labels defining the label ids (defaults to behavior_graph_labels(behavior_graph))
+    :type labels:
+    :param seed: The optional seed of the random number generator, for reproducible samples
+    :type seed:
+    :return: A generator of realizations as tuples of label ids
+    :rtype:
+    """
+
+    indexed = index_behavior_graph(behavior_graph)
+    if labels is None:
+        labels = behavior_graph_labels(behavior_graph)
+    label_ids = {activity_label: i for i, activity_label in enumerate(labels)}
+    if weights is None:
+        label_weights, skip_weights = _unit_weights(indexed)
+    else:
+        label_weights = [[weights(node, activity_label) for activity_label in node_labels] for node, node_labels in zip(indexed[0], indexed[3])]
+        skip_weights = [weights(node, None) if node_indeterminate else 0 for node, node_indeterminate in zip(indexed[0], indexed[4])]
+    memo = _state_weights(indexed, label_weights, skip_weights)
+    rng = random.Random(seed)
+    full = (1 << len(indexed[0])) - 1
+
+    initial_choices = [(weight * memo[mask], mask) for weight, mask, _ in _initial_expansions(indexed, skip_weights)]
+    choices = dict()
+    for _ in range(n_samples):
+        mask = _weighted_choice(rng, initial_choices)
+        realization = []
+        while mask != full:
+            if mask not in choices:
+                choices[mask] = [(weight * memo[next_mask], (next_mask, node)) for weight, next_mask, node, _ in _transitions(indexed, mask, label_weights, skip_weights)]
+            mask, node = _weighted_choice(rng, choices[mask])
+            activity_label = _weighted_choice(rng, list(zip(label_weights[node], indexed[3][node])))
+            realization.append(label_ids[activity_label])
+        yield tuple(realization)
+
+
+def uncertainty_probabilities(trace, activity_key=xes.DEFAULT_NAME_KEY, timestamp_key=xes.DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=xes_keys.DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=xes_keys.DEFAULT_U_TIMESTAMP_MAX_KEY, u_missing_key=xes_keys.DEFAULT_U_MISSING_KEY, u_activity_key=xes_keys.DEFAULT_U_NAME_KEY):
+    """
+    Returns the probabilistic uncertainty of the events of a trace, for each node of its behavior graph.
+    The probabilities of the activity labels of an event are the values of the children of its uncertain activity, normalized; if they are all 0 (as
+    written by the bewilderer), the labels are equally likely. The value of the indeterminate event key is the probability that the event did not happen
+    if it is strictly between 0 and 1; any other value (such as the flag 1 written by the bewilderer) makes the two outcomes equally likely.
+    Uncertain timestamps are uniformly distributed between their minimum and maximum, and are returned as intervals in seconds from the earliest
+    timestamp of the trace (certain timestamps as intervals of width 0).
+
+    :param trace: An uncertain trace
+    :type trace:
+    :return: A dictionary from the nodes of the behavior graph of the trace to 3-tuples containing the dictionary of the probabilities of the (not None)
+    activity labels of the node, the probability that the node is skipped and the interval of its timestamp
+    :rtype: dict
+    """
+
+    nodes = {node[0]: node for node, timestamp_type in create_nodes_tuples(trace, activity_key, timestamp_key, u_timestamp_min_key, u_timestamp_max_key, u_missing_key, u_activity_key) if timestamp_type is False}
+    start = min(event[u_timestamp_min_key] if u_timestamp_min_key in event else event[timestamp_key] for event in trace) if len(trace) > 0 else None
+
+    probabilities = dict()
+    for i, event in enumerate(trace):
+        node = nodes[i]
+        activity_labels = [activity_label for activity_label in node[1] if activity_label is not None]
+        weights = [event[u_activity_key]['children'].get(activity_label, 0) if u_activity_key in event else 1 for activity_label in activity_labels]
+        if sum(weights) <= 0:
+            weights = [1] * len(activity_labels)
+        label_probabilities = {activity_label: weight / sum(weights) for activity_label, weight in zip(activity_labels, weights)}
+
+        skip_probability = 0.0
+        if None in node[1]:
+            skip_probability = event[u_missing_key] if 0 < event[u_missing_key] < 1 else 0.5
+
+        if u_timestamp_min_key in event:
+            interval = ((event[u_timestamp_min_key] - start).total_seconds(), (event[u_timestamp_max_key] - start).total_seconds())
+        else:
+            interval = ((event[timestamp_key] - start).total_seconds(),) * 2
+        probabilities[node] = (label_probabilities, skip_probability, interval)
+
+    return probabilities
+
+
+def behavior_graph_probabilities(behavior_graph):
+    """
+    Returns the probabilistic uncertainty of the nodes of a behavior graph, in the same form of uncertainty_probabilities, for when the attributes of the
+    events are not available: the activity labels of a node are equally likely, an indeterminate node is skipped with probability 0.5, and timestamps
+    are all uniformly distributed over the same interval, so that each of the enabled nodes is equally likely to be executed next.
+
+    :param behavior_graph: A behavior graph
+    :type behavior_graph:
+    :return: A dictionary from the nodes of the behavior graph to 3-tuples containing the dictionary of the probabilities of the (not None) activity
+    labels of the node, the probability that the node is skipped and the interval of its timestamp
+    :rtype: dict
+    """
+
+    probabilities = dict()
+    for node in behavior_graph.nodes:
+        activity_labels = [activity_label for activity_label in node[1] if activity_label is not None]
+        probabilities[node] = ({activity_label: 1 / len(activity_labels) for activity_label in activity_labels}, 0.5 if None in node[1] else 0.0, (0.0, 1.0))
+    return probabilities
+
+
+def _polynomial_product(p, q):
+    product = [0.0] * (len(p) + len(q) - 1)
+    for i, a in enumerate(p):
+        for j, b in enumerate(q):
+            product[i + j] += a * b
+    return product
+
+
+def _survival(interval, start):
+    # Returns the probability that a timestamp uniform in 'interval' is larger than start + s, as a polynomial in s valid until the next breakpoint
+    low, high = interval
+    if start < low:
+        return [1.0]
+    if start >= high:
+        return [0.0]
+    return [(high - start) / (high - low), -1.0 / (high - low)]
+
+
+def _first_probabilities(intervals):
+    """
+    Returns, for each of a set of independent timestamps uniformly distributed in the given intervals (or certain, if an interval has width 0),
+    the probability that it is the smallest; certain timestamps that are equal share their probability evenly.
+
+    :param intervals: a list of (minimum, maximum) intervals
+    :return: the list of the probabilities
+    """
+
+    points = [low for low, high in intervals if low == high]
+    first_point = min(points) if points else float('inf')
+    probabilities = []
+    for v, (low, high) in enumerate(intervals):
+        others = [interval for u, interval in enumerate(intervals) if u != v and interval[0] != interval[1]]
+        if low == high:
+            probability = 0.0
+            if low == first_point:
+                probability = 1.0 / points.count(low)
+                for other in others:
+                    probability *= _survival(other, low)[0]
+            probabilities.append(probability)
+            continue
+        # Integrates the density of the timestamp times the survival functions of the others, piecewise between their breakpoints
+        end = min(high, first_point)
+        if end <= low:
+            probabilities.append(0.0)
+            continue
+        breakpoints = sorted({low, end} | {bound for other in others for bound in other if low < bound < end})
+        probability = 0.0
+        for segment_start, segment_end in zip(breakpoints, breakpoints[1:]):
+            polynomial = [1.0 / (high - low)]
+            for other in others:
+                polynomial = _polynomial_product(polynomial, _survival(other, segment_start))
+            width = segment_end - segment_start
+            probability += sum(coefficient * width ** (i + 1) / (i + 1) for i, coefficient in enumerate(polynomial))
+        probabilities.append(probability)
+
+    total = sum(probabilities)
+    if total <= 0:
+        return [1.0 / len(intervals)] * len(intervals)
+    return [probability / total for probability in probabilities]
+
+
+def top_k_realizations(behavior_graph, k, probabilities, labels=None):
+    """
+    Lazily yields the k most probable realizations of an uncertain trace, in decreasing order of probability, with a best-first search on the prefix
+    tree of its realizations: only the prefixes more probable than the k-th realization are expanded.
+    A realization is a sequence of choices: each indeterminate node is skipped or not when it becomes enabled, the next node is the one whose timestamp
+    is the smallest among the enabled nodes (considered independently at every step) and it takes one of its activity labels. Its probability is the
+    product of the probabilities of its choices. As in realization_iterator, different orders of nodes with the same labels are different realizations.
+
+    :param behavior_graph: A behavior graph
+    :type behavior_graph:
+    :param k: The number of realizations to yield
+    :type k: int
+    :param probabilities: The probabilistic uncertainty of each node, as returned by uncertainty_probabilities or behavior_graph_probabilities
+    :type probabilities: dict
+    :param labels: The sequence of activity labels defining the label ids (defaults to behavior_graph_labels(behavior_graph))
+    :type labels:
+    :return: A generator of 2-tuples containing a realization, as a tuple of label ids, and its probability
+    :rtype:
+    """
+
+    indexed = index_behavior_graph(behavior_graph)
+    if labels is None:
+        labels = behavior_graph_labels(behavior_graph)
+    label_ids = {activity_label: i for i, activity_label in enumerate(labels)}
+    node_probabilities = [probabilities[node] for node in indexed[0]]
+    full = (1 << len(indexed[0])) - 1
+    first_probabilities = dict()
+
+    # Prefixes are ordered by the negated logarithm of their probability, which never decreases when a prefix is extended
+    tie_breaker = count()
+    heap = [(0.0, next(tie_breaker), 0, tuple(i for i in _enabled(indexed, 0) if indexed[4][i]), ())]
+    found = 0
+    while heap and found < k:
+        cost, _, mask, pending, realization = heappop(heap)
+        if mask == full and not pending:
+            found += 1
+            yield realization, math.exp(-cost)
+            continue
+        if pending:
+            node = pending[0]
+            skip_probability = node_probabilities[node][1]
+            if skip_probability > 0:
+                skip_mask = mask | 1 << node
+                skip_pending = pending[1:] + tuple(node_to for node_to in _newly_enabled(indexed, skip_mask, node) if indexed[4][node_to])
+                heappush(heap, (cost - math.log(skip_probability), next(tie_breaker), skip_mask, skip_pending, realization))
+            if skip_probability < 1:
+                heappush(heap, (cost - math.log(1 - skip_probability), next(tie_breaker), mask, pending[1:], realization))
+            continue
+        enabled = tuple(_enabled(indexed, mask))
+        if enabled not in first_probabilities:
+            first_probabilities[enabled] = _first_probabilities([node_probabilities[node][2] for node in enabled])
+        for node, first_probability in zip(enabled, first_probabilities[enabled]):
+            if first_probability <= 0:
+                continue
+            node_mask = mask | 1 << node
+            node_pending = tuple(node_to for node_to in _newly_enabled(indexed, node_mask, node) if indexed[4][node_to])
+            for activity_label, label_probability in node_probabilities[node][0].items():
+                if label_probability > 0:
+                    heappush(heap, (cost - math.log(first_probability) - math.log(label_probability), next(tie_breaker), node_mask, node_pending, realization + (label_ids[activity_label],)))
+
+
+def realization_to_trace(realization, labels, activity_key=DEFAULT_NAME_KEY):
+    """
+    Converts a realization of label ids, as yielded by realization_iterator, into a trace.
+
+    :param realization: A tuple of label ids
+    :type realization:
+    :param labels: The sequence of activity labels defining the label ids
+    :type labels:
+    :param activity_key: The xes key for the activity labels
+    :type activity_key:
+    :return: The realization as a trace
+    :rtype:
+    """
+
+    trace = Trace()
+    for label_id in realization:
+        trace.append(Event({activity_key: labels[label_id]}))
+    return trace
@@ -1,10 +1,10 @@
 from pm4py.objects.petri_net.obj import PetriNet, Marking
-from pm4py.objects.petri_net.utils import petri_utils
 
 
 class BehaviorNet(PetriNet):
     """
     Class that represents a behavior net, a sound workflow Petri net that can replay all realizations of an uncertain trace.
+    It is built from a behavior graph, either a BehaviorGraph or a CompactBehaviorGraph.
     For more information refer to:
         Pegoraro, Marco, and Wil MP van der Aalst. "Mining uncertain event data in process mining." 2019 International Conference on Process Mining (ICPM). IEEE, 2019.
     """
@@ -12,53 +12,49 @@ class BehaviorNet(PetriNet):
     def __init__(self, behavior_graph):
         PetriNet.__init__(self)
 
-        # Creating sink and source place, and invisible transitions connecting them to the rest of the net
-        source_place = PetriNet.Place('source')
-        self.places.add(source_place)
+        # Invisible transitions connecting source and sink to the rest of the net, and a transition for each activity label of each node in the graph
         source_trans = PetriNet.Transition('t_source', None)
-        self.transitions.add(source_trans)
-        petri_utils.add_arc_from_to(source_place, source_trans, self)
-
-        sink_place = PetriNet.Place('sink')
-        self.places.add(sink_place)
         sink_trans = PetriNet.Transition('t_sink', None)
+        nodes = list(behavior_graph.nodes)
+        node_trans = {node: [PetriNet.Transition('t' + str(i) + '_' + str(activity_label), activity_label) for activity_label in node[1]] for i, node in enumerate(nodes)}
+        self.transitions.add(source_trans)
         self.transitions.add(sink_trans)
-        petri_utils.add_arc_from_to(sink_trans, sink_place, self)
+        for transitions in node_trans.values():
+            self.transitions.update(transitions)
 
-        # Creating transitions for each node in the graph
-        node_trans = {}
-        for i, node in enumerate(behavior_graph.nodes):
-            transition_set = {PetriNet.Transition('t' + str(i) + '_' + str(activity_label), activity_label) for activity_label in node[1]}
-            node_trans[id(node)] = transition_set
-            for transition in transition_set:
-                self.transitions.add(transition)
-
-        for i, node_from in enumerate(behavior_graph.nodes):
+        # Every place is listed with the transitions producing and consuming its token, so that the net is built in a single pass
+        source_place = PetriNet.Place('source')
+        sink_place = PetriNet.Place('sink')
+        places = [(source_place, (), (source_trans,)), (sink_place, (sink_trans,), ())]
+        for node_from in nodes:
             # Each activity that can start the trace have to be connected through an AND-split to the starting invisible transition
             if not next(behavior_graph.predecessors(node_from), None):
-                place_from_source = PetriNet.Place('source_to_' + str(id(node_from)))
-                for transition in node_trans[id(node_from)]:
-                    self.places.add(place_from_source)
-                    petri_utils.add_arc_from_to(place_from_source, transition, self)
-                petri_utils.add_arc_from_to(source_trans, place_from_source, self)
+                places.append((PetriNet.Place('source_to_' + str(node_from[0])), (source_trans,), node_trans[node_from]))
 
             # Every arc in the behavior graph is translated to a place in the behavior net, describing the precedence relationship between nodes
-            # For each successor of the current node, all the transitions of the current node are connected to all the transitions in the successor through a place
+            # All the transitions of the current node are connected to all the transitions of each successor through a place
             for node_to in behavior_graph.successors(node_from):
-                place = PetriNet.Place(str(id(node_from)) + str(id(node_to)))
-                self.places.add(place)
-                for transition in node_trans[id(node_from)]:
-                    petri_utils.add_arc_from_to(transition, place, self)
-                for transition in node_trans[id(node_to)]:
-                    petri_utils.add_arc_from_to(place, transition, self)
+                places.append((PetriNet.Place(str(node_from[0]) + '_to_' + str(node_to[0])), node_trans[node_from], node_trans[node_to]))
 
             # Each activity that can end the trace have to be connected through an AND-join to the ending invisible transition
             if not next(behavior_graph.successors(node_from), None):
-                place_to_sink = PetriNet.Place(str(id(node_from)) + '_to_sink')
-                for transition in node_trans[id(node_from)]:
-                    self.places.add(place_to_sink)
-                    petri_utils.add_arc_from_to(transition, place_to_sink, self)
-                petri_utils.add_arc_from_to(place_to_sink, sink_trans, self)
+                places.append((PetriNet.Place(str(node_from[0]) + '_to_sink'), node_trans[node_from], (sink_trans,)))
+
+        # Arcs are attached to their endpoints directly, without going through petri_utils.add_arc_from_to
+        arcs = []
+        for place, producers, consumers in places:
+            self.places.add(place)
+            for transition in producers:
+                arc = PetriNet.Arc(transition, place)
+                transition.out_arcs.add(arc)
+                place.in_arcs.add(arc)
+                arcs.append(arc)
+            for transition in consumers:
+                arc = PetriNet.Arc(place, transition)
+                place.out_arcs.add(arc)
+                transition.in_arcs.add(arc)
+                arcs.append(arc)
+        self.arcs.update(arcs)
 
         # Initial and final markings are just one token in the source place and one token in the sink place, respectively
         self.initial_marking = Marking({source_place: 1})
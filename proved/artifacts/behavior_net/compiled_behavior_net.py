@@ -0,0 +1,157 @@
+from pm4py.objects.petri_net.obj import Marking
+
+
+class CompiledBehaviorNet(object):
+    """
+    Class representing a behavior net compiled for fast replay, with places and transitions numbered by dense integer ids.
+    Behavior nets are 1-safe, so markings are encoded as bitsets (integers whose i-th bit is set if place i holds a token), and every transition as the
+    bitsets of its input and output places: firing a transition and checking whether it is enabled are a few integer operations, with no Marking objects
+    allocated and hashed along the way.
+    """
+
+    __slots__ = ('__places', '__place_ids', '__transitions', '__transition_labels', '__pre', '__post', '__consumers', '__initial_marking', '__final_marking')
+
+    def __init__(self, net, initial_marking=None, final_marking=None):
+        """
+        :param net: A 1-safe Petri net, e.g. a BehaviorNet
+        :param initial_marking: The initial marking of the net (defaults to net.initial_marking)
+        :param final_marking: The final marking of the net (defaults to net.final_marking)
+        """
+
+        if initial_marking is None:
+            initial_marking = net.initial_marking
+        if final_marking is None:
+            final_marking = net.final_marking
+
+        # Places and transitions are sorted by name, so that the ids do not depend on the iteration order of the sets of the net
+        places = sorted(net.places, key=lambda place: str(place.name))
+        transitions = sorted(net.transitions, key=lambda transition: str(transition.name))
+        self.__places = tuple(places)
+        self.__place_ids = {place: place_id for place_id, place in enumerate(places)}
+        self.__transitions = tuple(transitions)
+        self.__transition_labels = tuple(transition.label for transition in transitions)
+
+        self.__pre = []
+        self.__post = []
+        consumers = [[] for _ in places]
+        for transition_id, transition in enumerate(transitions):
+            pre = 0
+            for arc in transition.in_arcs:
+                if arc.weight != 1:
+                    raise ValueError('Only 1-safe nets with arcs of weight 1 can be compiled.')
+                pre |= 1 << self.__place_ids[arc.source]
+                consumers[self.__place_ids[arc.source]].append(transition_id)
+            post = 0
+            for arc in transition.out_arcs:
+                if arc.weight != 1:
+                    raise ValueError('Only 1-safe nets with arcs of weight 1 can be compiled.')
+                post |= 1 << self.__place_ids[arc.target]
+            self.__pre.append(pre)
+            self.__post.append(post)
+        self.__pre = tuple(self.__pre)
+        self.__post = tuple(self.__post)
+        self.__consumers = tuple(tuple(place_consumers) for place_consumers in consumers)
+        # Transitions without input places are always enabled
+        self.__consumers += (tuple(transition_id for transition_id, pre in enumerate(self.__pre) if pre == 0),)
+
+        self.__initial_marking = self.encode_marking(initial_marking)
+        self.__final_marking = self.encode_marking(final_marking)
+
+    def encode_marking(self, marking):
+        """
+        Returns the bitset of a marking of the net.
+
+        :param marking: A marking of the net, with at most one token in each place
+        :type marking:
+        :return: The bitset of the marking
+        :rtype: int
+        """
+
+        bitset = 0
+        for place, tokens in marking.items():
+            if tokens > 1:
+                raise ValueError('Only 1-safe markings can be encoded as bitsets.')
+            if tokens == 1:
+                bitset |= 1 << self.__place_ids[place]
+        return bitset
+
+    def decode_marking(self, bitset):
+        """
+        Returns the marking of the net encoded by a bitset.
+
+        :param bitset: The bitset of a marking
+        :type bitset: int
+        :return: The marking
+        :rtype:
+        """
+
+        return Marking({self.__places[place_id]: 1 for place_id in _set_bits(bitset)})
+
+    def enabled_transitions(self, marking):
+        """
+        Returns the ids of the transitions enabled in a marking, in increasing order.
+        Only the transitions consuming from the marked places are checked.
+
+        :param marking: The bitset of a marking
+        :type marking: int
+        :return: The list of enabled transition ids
+        :rtype: list
+        """
+
+        candidates = set(self.__consumers[-1])
+        for place_id in _set_bits(marking):
+            candidates.update(self.__consumers[place_id])
+        return sorted(transition_id for transition_id in candidates if self.__pre[transition_id] & ~marking == 0)
+
+    def is_enabled(self, marking, transition_id):
+        return self.__pre[transition_id] & ~marking == 0
+
+    def fire(self, marking, transition_id):
+        """
+        Returns the marking reached by firing an enabled transition; enabledness is not checked.
+
+        :param marking: The bitset of a marking
+        :type marking: int
+        :param transition_id: The id of a transition enabled in the marking
+        :type transition_id: int
+        :return: The bitset of the reached marking
+        :rtype: int
+        """
+
+        return marking & ~self.__pre[transition_id] | self.__post[transition_id]
+
+    def transition_label(self, transition_id):
+        return self.__transition_labels[transition_id]
+
+    def place(self, place_id):
+        return self.__places[place_id]
+
+    def transition(self, transition_id):
+        return self.__transitions[transition_id]
+
+    def number_of_places(self):
+        return len(self.__places)
+
+    def number_of_transitions(self):
+        return len(self.__transitions)
+
+    def __get_transition_labels(self):
+        return self.__transition_labels
+
+    def __get_initial_marking(self):
+        return self.__initial_marking
+
+    def __get_final_marking(self):
+        return self.__final_marking
+
+    transition_labels = property(__get_transition_labels)
+    initial_marking = property(__get_initial_marking)
+    final_marking = property(__get_final_marking)
+
+
+def _set_bits(bitset):
+    # Yields the positions of the set bits of an integer, from the lowest
+    while bitset:
+        low_bit = bitset & -bitset
+        yield low_bit.bit_length() - 1
+        bitset ^= low_bit
@@ -2,6 +2,9 @@ from pm4py.objects import petri
 from pm4py.objects.log.log import Trace, Event
 from pm4py.util.xes_constants import DEFAULT_NAME_KEY
 
+from proved.artifacts.behavior_net.behavior_net import BehaviorNet
+from proved.artifacts.behavior_net.compiled_behavior_net import CompiledBehaviorNet
+
 
 def acyclic_net_variants(net, initial_marking, final_marking, activity_key=DEFAULT_NAME_KEY):
     """
@@ -9,6 +12,7 @@ def acyclic_net_variants(net, initial_marking, final_marking, activity_key=DEFAU
     replayable on the net.
     Warning: this function is based on a marking exploration. If the accepting Petri net contains loops, the method
     will not work properly as it stops the search if a specific marking has already been encountered.
+    Behavior nets, and compiled behavior nets, are explored on bitset markings by compiled_net_variants.
 
     Parameters
     ----------
@@ -21,6 +25,11 @@ def acyclic_net_variants(net, initial_marking, final_marking, activity_key=DEFAU
     :return: variants: :class:`list` Set of variants - in the form of Trace objects - obtainable executing the net
 
     """
+    if isinstance(net, CompiledBehaviorNet):
+        return compiled_net_variants(net, initial_marking, final_marking, activity_key)
+    if isinstance(net, BehaviorNet):
+        return compiled_net_variants(CompiledBehaviorNet(net, initial_marking, final_marking), activity_key=activity_key)
+
     active = {(initial_marking, ())}
     visited = set()
     variants = set()
@@ -31,7 +40,7 @@ def acyclic_net_variants(net, initial_marking, final_marking, activity_key=DEFAU
         enabled_transitions = petri.semantics.enabled_transitions(net, curr_marking)
         for transition in enabled_transitions:
             if transition.label is not None:
-                next_partial_trace = curr_partial_trace + (repr(transition),)
+                next_partial_trace = curr_partial_trace + (transition,)
             else:
                 next_partial_trace = curr_partial_trace
             next_marking = petri.semantics.execute(transition, net, curr_marking)
@@ -47,7 +56,60 @@ def acyclic_net_variants(net, initial_marking, final_marking, activity_key=DEFAU
     trace_variants = []
     for variant in variants:
         trace = Trace()
-        for activity_label in variant:
-            trace.append(Event({activity_key: activity_label}))
+        for transition in variant:
+            trace.append(Event({activity_key: transition.label}))
+        trace_variants.append(trace)
+    return trace_variants
+
+
+def compiled_net_variants(compiled_net, initial_marking=None, final_marking=None, activity_key=DEFAULT_NAME_KEY):
+    """
+    Extracts the variants replayable on an acyclic compiled behavior net, as acyclic_net_variants does, playing the token game on bitset markings.
+
+    :param compiled_net: A compiled behavior net
+    :type compiled_net:
+    :param initial_marking: The initial marking, as a bitset or as a Marking (defaults to the initial marking of the net)
+    :type initial_marking:
+    :param final_marking: The final marking, as a bitset or as a Marking (defaults to the final marking of the net)
+    :type final_marking:
+    :param activity_key: The xes key for the activity labels
+    :type activity_key:
+    :return: The list of variants, as Trace objects
+    :rtype: list
+    """
+
+    initial_marking = _as_bitset(compiled_net, initial_marking, compiled_net.initial_marking)
+    final_marking = _as_bitset(compiled_net, final_marking, compiled_net.final_marking)
+
+    # Partial traces are tuples of the ids of the visible transitions fired so far
+    active = {(initial_marking, ())}
+    visited = set()
+    variants = set()
+    while active:
+        curr_marking, curr_partial_trace = active.pop()
+        visited.add((curr_marking, curr_partial_trace))
+        for transition_id in compiled_net.enabled_transitions(curr_marking):
+            if compiled_net.transition_label(transition_id) is not None:
+                next_partial_trace = curr_partial_trace + (transition_id,)
+            else:
+                next_partial_trace = curr_partial_trace
+            next_marking = compiled_net.fire(curr_marking, transition_id)
+            if next_marking == final_marking:
+                variants.add(next_partial_trace)
+            elif (next_marking, next_partial_trace) not in visited:
+                active.add((next_marking, next_partial_trace))
+    trace_variants = []
+    for variant in variants:
+        trace = Trace()
+        for transition_id in variant:
+            trace.append(Event({activity_key: compiled_net.transition_label(transition_id)}))
         trace_variants.append(trace)
     return trace_variants
+
+
+def _as_bitset(compiled_net, marking, default):
+    if marking is None:
+        return default
+    if isinstance(marking, int):
+        return marking
+    return compiled_net.encode_marking(marking)
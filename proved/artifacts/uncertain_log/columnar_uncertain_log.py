@@ -0,0 +1,306 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from pm4py.objects.log.log import EventLog, Trace, Event
+from pm4py.objects.log.util import xes
+
+import proved.xes_keys as xes_keys
+from proved.artifacts.behavior_graph.compact_behavior_graph import LabelTable
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_epoch_microseconds(timestamp):
+    delta = timestamp - (_EPOCH if timestamp.tzinfo is None else _EPOCH_UTC)
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _from_epoch_microseconds(microseconds, tz_aware):
+    return (_EPOCH_UTC if tz_aware else _EPOCH) + timedelta(microseconds=microseconds)
+
+
+def _segment_ids(offsets):
+    # Returns, for each element of a CSR column, the index of the segment containing it
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+class ColumnarUncertainLog(object):
+    """
+    Class representing an uncertain event log in columnar form, with one NumPy array per attribute instead of one dictionary per event.
+    Events are numbered in order across the whole log, and the global index of the first event of each trace is kept in a trace offsets array. Timestamps are
+    int64 microseconds since the epoch (UTC for timezone-aware logs), activity labels are interned in a LabelTable, the sets of possible activity labels are
+    a CSR column of label ids with a parallel column of their weights, and indeterminate events are flagged in a bitmap with a column of their
+    probabilities, so that uncertainty_probabilities reads the same values on the round-tripped log.
+    Variant keys and behavior graph edges are computed for all the traces at once by vectorized operations on the columns, with the same results of
+    create_nodes_tuples and create_edges_list.
+    """
+
+    def __init__(self, trace_offsets, activity_ids, label_offsets, label_ids, missing, timestamps, timestamp_min, timestamp_max, label_table, tz_aware=False, label_weights=None, missing_probabilities=None):
+        """
+        :param trace_offsets: The global index of the first event of each trace, followed by the number of events
+        :param activity_ids: The label id of the activity label of each event
+        :param label_offsets: The offsets of the possible activity labels of each event in label_ids
+        :param label_ids: The label ids of the possible activity labels of the events
+        :param missing: The bitmap of the indeterminate events, as packed by numpy.packbits with little bit order
+        :param timestamps: The timestamp of each event
+        :param timestamp_min: The minimum value of the timestamp of each event
+        :param timestamp_max: The maximum value of the timestamp of each event
+        :param label_table: The label table interning the activity labels
+        :param tz_aware: True if the timestamps of the log are timezone-aware
+        :param label_weights: The weights of the possible activity labels in label_ids, i.e. the values of the children of the uncertain activities (all 0
+        if None)
+        :param missing_probabilities: The value of the indeterminate event key of each event, 0 for the events that are not indeterminate (all 0 if None)
+        """
+
+        self.__trace_offsets = np.asarray(trace_offsets, dtype=np.int64)
+        self.__activity_ids = np.asarray(activity_ids, dtype=np.int64)
+        self.__label_offsets = np.asarray(label_offsets, dtype=np.int64)
+        self.__label_ids = np.asarray(label_ids, dtype=np.int64)
+        self.__label_weights = np.zeros(len(self.__label_ids)) if label_weights is None else np.asarray(label_weights, dtype=np.float64)
+        self.__missing = np.asarray(missing, dtype=np.uint8)
+        self.__missing_probabilities = np.zeros(len(self.__activity_ids)) if missing_probabilities is None else np.asarray(missing_probabilities, dtype=np.float64)
+        self.__timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.__timestamp_min = np.asarray(timestamp_min, dtype=np.int64)
+        self.__timestamp_max = np.asarray(timestamp_max, dtype=np.int64)
+        self.__label_table = label_table
+        self.__tz_aware = tz_aware
+
+    @classmethod
+    def from_event_log(cls, log, label_table=None, activity_key=xes.DEFAULT_NAME_KEY, timestamp_key=xes.DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=xes_keys.DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=xes_keys.DEFAULT_U_TIMESTAMP_MAX_KEY, u_missing_key=xes_keys.DEFAULT_U_MISSING_KEY, u_activity_key=xes_keys.DEFAULT_U_NAME_KEY):
+        """
+        Returns the columnar form of an event log, e.g. an EventLog or an UncertainLog, reading the attributes of each event once.
+
+        :param log: The event log
+        :type log:
+        :param label_table: The label table interning the activity labels (a new one is created if None)
+        :type label_table:
+        :return: The columnar uncertain log
+        :rtype:
+        """
+
+        if label_table is None:
+            label_table = LabelTable()
+        trace_offsets = [0]
+        activity_ids = []
+        label_offsets = [0]
+        label_ids = []
+        label_weights = []
+        missing = []
+        missing_probabilities = []
+        timestamps = []
+        timestamp_min = []
+        timestamp_max = []
+        tz_aware = None
+        for trace in log:
+            for event in trace:
+                activity_ids.append(label_table.intern(event[activity_key]))
+                if u_activity_key in event:
+                    children = sorted((label_table.intern(activity_label), weight) for activity_label, weight in event[u_activity_key]['children'].items())
+                    label_ids.extend(label_id for label_id, _ in children)
+                    label_weights.extend(weight for _, weight in children)
+                else:
+                    label_ids.append(activity_ids[-1])
+                    label_weights.append(0)
+                label_offsets.append(len(label_ids))
+                missing.append(u_missing_key in event)
+                missing_probabilities.append(event[u_missing_key] if u_missing_key in event else 0)
+                if tz_aware is None:
+                    tz_aware = event[timestamp_key].tzinfo is not None
+                timestamps.append(_to_epoch_microseconds(event[timestamp_key]))
+                if u_timestamp_min_key in event:
+                    timestamp_min.append(_to_epoch_microseconds(event[u_timestamp_min_key]))
+                    timestamp_max.append(_to_epoch_microseconds(event[u_timestamp_max_key]))
+                else:
+                    timestamp_min.append(timestamps[-1])
+                    timestamp_max.append(timestamps[-1])
+            trace_offsets.append(len(activity_ids))
+        return cls(trace_offsets, activity_ids, label_offsets, label_ids, np.packbits(np.array(missing, dtype=bool), bitorder='little'), timestamps, timestamp_min, timestamp_max, label_table, bool(tz_aware), label_weights, missing_probabilities)
+
+    def to_event_log(self, activity_key=xes.DEFAULT_NAME_KEY, timestamp_key=xes.DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=xes_keys.DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=xes_keys.DEFAULT_U_TIMESTAMP_MAX_KEY, u_missing_key=xes_keys.DEFAULT_U_MISSING_KEY, u_activity_key=xes_keys.DEFAULT_U_NAME_KEY):
+        """
+        Returns the event log in pm4py form. Uncertain activity labels and timestamps are only written for the events where they differ from the certain ones,
+        or where the weights of the labels are not 0; the weights are written as the values of the children of the uncertain activities, and the
+        probabilities of the indeterminate events as the values of their indeterminate event key.
+
+        :return: The event log
+        :rtype:
+        """
+
+        log = EventLog()
+        missing = self.missing.tolist()
+        activity_ids = self.__activity_ids.tolist()
+        label_offsets = self.__label_offsets.tolist()
+        label_ids = self.__label_ids.tolist()
+        label_weights = self.__label_weights.tolist()
+        missing_probabilities = self.__missing_probabilities.tolist()
+        timestamps = self.__timestamps.tolist()
+        timestamp_min = self.__timestamp_min.tolist()
+        timestamp_max = self.__timestamp_max.tolist()
+        trace_offsets = self.__trace_offsets.tolist()
+        for trace_index in range(len(trace_offsets) - 1):
+            trace = Trace()
+            for i in range(trace_offsets[trace_index], trace_offsets[trace_index + 1]):
+                event = Event({activity_key: self.__label_table[activity_ids[i]], timestamp_key: _from_epoch_microseconds(timestamps[i], self.__tz_aware)})
+                first, last = label_offsets[i], label_offsets[i + 1]
+                if label_ids[first:last] != [activity_ids[i]] or any(label_weights[first:last]):
+                    event[u_activity_key] = {'children': {self.__label_table[label_id]: weight for label_id, weight in zip(label_ids[first:last], label_weights[first:last])}}
+                if timestamp_min[i] != timestamps[i] or timestamp_max[i] != timestamps[i]:
+                    event[u_timestamp_min_key] = _from_epoch_microseconds(timestamp_min[i], self.__tz_aware)
+                    event[u_timestamp_max_key] = _from_epoch_microseconds(timestamp_max[i], self.__tz_aware)
+                if missing[i]:
+                    event[u_missing_key] = missing_probabilities[i]
+                trace.append(event)
+            log.append(trace)
+        return log
+
+    def to_uncertain_log(self, compact=False, n_jobs=1, chunk_size=1000, cache=None):
+        return UncertainLog(self.to_event_log(), compact=compact, n_jobs=n_jobs, chunk_size=chunk_size, cache=cache)
+
+    def sorted_endpoints(self):
+        """
+        Returns the endpoints of the timestamp intervals of all the events, sorted within each trace as in create_nodes_tuples: by timestamp, then minimum
+        before maximum, then by position of the event.
+
+        :return: A 2-tuple containing the array of the global event indices and the array of the timestamp types (False is 'minimum', True is 'maximum')
+        :rtype: tuple
+        """
+
+        n_events = len(self.__activity_ids)
+        event_indices = np.repeat(np.arange(n_events), 2)
+        timestamp_types = np.tile(np.array([False, True]), n_events)
+        times = np.empty(2 * n_events, dtype=np.int64)
+        times[0::2] = self.__timestamp_min
+        times[1::2] = self.__timestamp_max
+        order = np.lexsort((np.arange(2 * n_events), timestamp_types, times, _segment_ids(self.__trace_offsets)[event_indices]))
+        return event_indices[order], timestamp_types[order]
+
+    def label_set_ids(self):
+        """
+        Returns an id for the set of possible activity labels of each event, indeterminacy included: events have the same id if and only if their nodes in
+        the behavior graph have the same set of labels.
+
+        :return: A 2-tuple containing the array of the label set ids of the events and the list of the label sets, as frozensets
+        :rtype: tuple
+        """
+
+        label_sets = dict()
+        label_offsets = self.__label_offsets.tolist()
+        label_ids = self.__label_ids.tolist()
+        missing = self.missing.tolist()
+        ids = np.fromiter((label_sets.setdefault((tuple(label_ids[label_offsets[i]:label_offsets[i + 1]]), missing[i]), len(label_sets)) for i in range(len(missing))), dtype=np.int64, count=len(missing))
+        return ids, [frozenset([self.__label_table[label_id] for label_id in labels] + ([None] if is_missing else [])) for labels, is_missing in label_sets]
+
+    def variants(self):
+        """
+        Groups the traces by variant, as UncertainLog does with the nodes tuples of the traces.
+        The variant key of a trace encodes its sorted interval endpoints (event position, timestamp type and label set id) in an int64 array, and is
+        compared as a byte string.
+
+        :return: A 3-tuple containing the array of the variant ids of the traces, the array of the index of the first trace of each variant and the array
+        of the number of traces of each variant; variant ids follow the order of first appearance in the log
+        :rtype: tuple
+        """
+
+        event_indices, timestamp_types = self.sorted_endpoints()
+        set_ids, _ = self.label_set_ids()
+        positions = event_indices - self.__trace_offsets[_segment_ids(self.__trace_offsets)[event_indices]]
+        codes = (set_ids[event_indices] << 33) | (positions << 1) | timestamp_types
+        codes_bytes = codes.tobytes()
+        endpoint_offsets = (2 * self.__trace_offsets * codes.itemsize).tolist()
+        variant_ids = dict()
+        trace_variants = np.fromiter((variant_ids.setdefault(codes_bytes[endpoint_offsets[t]:endpoint_offsets[t + 1]], len(variant_ids)) for t in range(len(self))), dtype=np.int64, count=len(self))
+        first_traces = np.full(len(variant_ids), len(self), dtype=np.int64)
+        np.minimum.at(first_traces, trace_variants, np.arange(len(self)))
+        return trace_variants, first_traces, np.bincount(trace_variants, minlength=len(variant_ids))
+
+    def behavior_graph_edges(self):
+        """
+        Returns the edges of the behavior graphs of all the traces, with the sweep of create_edges_list run on all the traces at once.
+        Within each trace, the edges are in the same order of create_edges_list.
+
+        :return: A 2-tuple containing the arrays of the global event indices of the sources and of the targets of the edges
+        :rtype: tuple
+        """
+
+        event_indices, timestamp_types = self.sorted_endpoints()
+        trace_of_endpoint = _segment_ids(self.__trace_offsets)[event_indices]
+        trace_end = 2 * self.__trace_offsets[trace_of_endpoint + 1]
+
+        start_positions = np.nonzero(~timestamp_types)[0]
+        start_events = event_indices[start_positions]
+        end_positions = np.empty(len(self.__activity_ids), dtype=np.int64)
+        end_positions[event_indices[timestamp_types]] = np.nonzero(timestamp_types)[0]
+
+        # earliest_end[k] is the earliest end among the nodes starting at or after the k-th minimum timestamp of the same trace; the positions of the
+        # following traces are all after the end of the trace, so a suffix minimum over the whole log is capped at the end of each trace
+        earliest_end = np.minimum.accumulate(end_positions[start_events][::-1])[::-1]
+        earliest_end = np.append(np.minimum(earliest_end, trace_end[start_positions]), len(event_indices))
+
+        end_endpoints = np.nonzero(timestamp_types)[0]
+        first_successors = np.searchsorted(start_positions, end_endpoints, side='right')
+        last_successors = np.searchsorted(start_positions, np.minimum(earliest_end[first_successors], trace_end[end_endpoints]), side='left')
+        counts = np.maximum(last_successors - first_successors, 0)
+        sources = np.repeat(event_indices[end_endpoints], counts)
+        targets = start_events[np.repeat(first_successors - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+        return sources, targets
+
+    def trace_of_events(self, event_indices):
+        return np.searchsorted(self.__trace_offsets, event_indices, side='right') - 1
+
+    def __get_trace_offsets(self):
+        return self.__trace_offsets
+
+    def __get_activity_ids(self):
+        return self.__activity_ids
+
+    def __get_label_offsets(self):
+        return self.__label_offsets
+
+    def __get_label_ids(self):
+        return self.__label_ids
+
+    def __get_label_weights(self):
+        return self.__label_weights
+
+    def __get_missing_bitmap(self):
+        return self.__missing
+
+    def __get_missing(self):
+        return np.unpackbits(self.__missing, count=len(self.__activity_ids), bitorder='little').astype(bool)
+
+    def __get_missing_probabilities(self):
+        return self.__missing_probabilities
+
+    def __get_timestamps(self):
+        return self.__timestamps
+
+    def __get_timestamp_min(self):
+        return self.__timestamp_min
+
+    def __get_timestamp_max(self):
+        return self.__timestamp_max
+
+    def __get_label_table(self):
+        return self.__label_table
+
+    def __get_tz_aware(self):
+        return self.__tz_aware
+
+    def __len__(self):
+        return len(self.__trace_offsets) - 1
+
+    trace_offsets = property(__get_trace_offsets)
+    activity_ids = property(__get_activity_ids)
+    label_offsets = property(__get_label_offsets)
+    label_ids = property(__get_label_ids)
+    label_weights = property(__get_label_weights)
+    missing_bitmap = property(__get_missing_bitmap)
+    missing = property(__get_missing)
+    missing_probabilities = property(__get_missing_probabilities)
+    timestamps = property(__get_timestamps)
+    timestamp_min = property(__get_timestamp_min)
+    timestamp_max = property(__get_timestamp_max)
+    label_table = property(__get_label_table)
+    tz_aware = property(__get_tz_aware)
@@ -0,0 +1,250 @@
+import json
+import mmap
+
+import numpy as np
+
+from proved.artifacts.behavior_graph.compact_behavior_graph import CompactBehaviorGraph, LabelTable
+from proved.artifacts.uncertain_log.columnar_uncertain_log import ColumnarUncertainLog
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+
+_MAGIC = b'PROVEDUL'
+_VERSION = 1
+# Alignment of the arrays in the file, in bytes
+_ALIGNMENT = 64
+# Arrays of the columnar form of the traces, in the order of the arguments of ColumnarUncertainLog
+_COLUMNAR_ARRAYS = ('trace_offsets', 'activity_ids', 'label_offsets', 'label_ids', 'missing', 'timestamps', 'timestamp_min', 'timestamp_max')
+# Arrays of the label weights and missing probabilities of the events, passed to ColumnarUncertainLog by name
+_COLUMNAR_PROBABILITY_ARRAYS = ('label_weights', 'missing_probabilities')
+
+
+def save_uncertain_log(uncertain_log, path, include_traces=True):
+    """
+    Writes an UncertainLog to a binary file that can be opened through memory mapping with MappedUncertainLog.
+    The file contains a JSON header, with the interned activity labels and the position of each array, followed by little-endian NumPy arrays aligned to
+    64 bytes: for each variant, in the order of the ranking in variants, its number of traces and the nodes, label sets, indeterminate flags, sorted
+    interval endpoints and successors (in CSR form) of its behavior graph; for each trace, its variant. With include_traces, the events of the traces are
+    stored as well, as the columns of a ColumnarUncertainLog.
+    Activity labels must be serializable to JSON, e.g. strings.
+
+    :param uncertain_log: the uncertain log
+    :param path: the path of the file
+    :param include_traces: if True, store the events of the traces
+    :return:
+    """
+
+    label_table = LabelTable(uncertain_log.label_table) if uncertain_log.label_table is not None else LabelTable()
+    multiplicities = []
+    node_offsets = [0]
+    node_event_indices = []
+    node_label_offsets = [0]
+    node_label_ids = []
+    node_indeterminate = []
+    endpoints = []
+    successor_offsets = [0]
+    successor_ids = []
+    trace_variant_ids = dict()
+    for variant_id in range(len(uncertain_log.variants)):
+        variant_length, nodes_tuple = uncertain_log.variants[variant_id]
+        variant_behavior_graph, traces_list = uncertain_log.behavior_graphs_map[nodes_tuple]
+        multiplicities.append(variant_length)
+        for trace in traces_list:
+            trace_variant_ids[id(trace)] = variant_id
+
+        # Nodes are numbered in order of their minimum timestamp, which is a topological order
+        nodes = [node for node, timestamp_type in nodes_tuple if timestamp_type is False]
+        node_ids = {node: node_id for node_id, node in enumerate(nodes)}
+        for node in nodes:
+            node_event_indices.append(node[0])
+            node_label_ids.extend(sorted(label_table.intern(activity_label) for activity_label in node[1] if activity_label is not None))
+            node_label_offsets.append(len(node_label_ids))
+            node_indeterminate.append(None in node[1])
+            successor_ids.extend(sorted(node_ids[node_to] for node_to in variant_behavior_graph.successors(node)))
+            successor_offsets.append(len(successor_ids))
+        endpoints.extend(node_ids[node] << 1 | timestamp_type for node, timestamp_type in nodes_tuple)
+        node_offsets.append(node_offsets[-1] + len(nodes))
+
+    arrays = {'multiplicities': np.array(multiplicities, dtype='<i8'), 'node_offsets': np.array(node_offsets, dtype='<i8'),
+              'node_event_indices': np.array(node_event_indices, dtype='<i4'), 'node_label_offsets': np.array(node_label_offsets, dtype='<i8'),
+              'node_label_ids': np.array(node_label_ids, dtype='<i4'), 'node_indeterminate': np.packbits(np.array(node_indeterminate, dtype=bool), bitorder='little'),
+              'endpoints': np.array(endpoints, dtype='<i4'), 'successor_offsets': np.array(successor_offsets, dtype='<i8'),
+              'successor_ids': np.array(successor_ids, dtype='<i4'), 'trace_variants': np.array([trace_variant_ids[id(trace)] for trace in uncertain_log], dtype='<i4')}
+    tz_aware = False
+    if include_traces:
+        columnar_log = ColumnarUncertainLog.from_event_log(uncertain_log, label_table)
+        tz_aware = columnar_log.tz_aware
+        arrays.update({name: array for name, array in zip(_COLUMNAR_ARRAYS, (columnar_log.trace_offsets, columnar_log.activity_ids, columnar_log.label_offsets,
+                       columnar_log.label_ids, columnar_log.missing_bitmap, columnar_log.timestamps, columnar_log.timestamp_min, columnar_log.timestamp_max))})
+        arrays.update({name: array for name, array in zip(_COLUMNAR_PROBABILITY_ARRAYS, (columnar_log.label_weights, columnar_log.missing_probabilities))})
+
+    # Offsets of the arrays are relative to the end of the header
+    descriptors = dict()
+    offset = 0
+    for name, array in arrays.items():
+        array = arrays[name] = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+        descriptors[name] = {'dtype': array.dtype.str, 'length': len(array), 'offset': offset}
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+    header = json.dumps({'version': _VERSION, 'labels': list(label_table), 'tz_aware': tz_aware, 'include_traces': include_traces, 'arrays': descriptors}).encode('utf-8')
+    data_start = -(-(len(_MAGIC) + 8 + len(header)) // _ALIGNMENT) * _ALIGNMENT
+
+    with open(path, 'wb') as binary_file:
+        binary_file.write(_MAGIC)
+        binary_file.write(np.array([len(header)], dtype='<u8').tobytes())
+        binary_file.write(header)
+        for name, array in arrays.items():
+            binary_file.write(b'\0' * (data_start + descriptors[name]['offset'] - binary_file.tell()))
+            binary_file.write(array.tobytes())
+
+
+class MappedUncertainLog(object):
+    """
+    Class representing an uncertain log written by save_uncertain_log, opened through memory mapping: arrays are read-only views of the mapped file, so
+    opening the log takes a time independent of its size, and worker processes opening the same file share its pages. Pickling a MappedUncertainLog only
+    pickles the path of the file, which is mapped again when unpickled.
+    Behavior graphs and nodes tuples of the variants are built on demand from the arrays.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The path of the file
+        """
+
+        self.__path = path
+        with open(path, 'rb') as binary_file:
+            self.__mmap = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__mmap[:len(_MAGIC)] != _MAGIC:
+            raise ValueError('File ' + str(path) + ' is not a serialized uncertain log.')
+        header_length = int(np.frombuffer(self.__mmap, dtype='<u8', count=1, offset=len(_MAGIC))[0])
+        header = json.loads(self.__mmap[len(_MAGIC) + 8:len(_MAGIC) + 8 + header_length].decode('utf-8'))
+        if header['version'] != _VERSION:
+            raise ValueError('Unsupported version ' + str(header['version']) + ' of the serialized uncertain log.')
+        data_start = -(-(len(_MAGIC) + 8 + header_length) // _ALIGNMENT) * _ALIGNMENT
+
+        self.__label_table = LabelTable(header['labels'])
+        self.__arrays = {name: np.frombuffer(self.__mmap, dtype=descriptor['dtype'], count=descriptor['length'], offset=data_start + descriptor['offset'])
+                         for name, descriptor in header['arrays'].items()}
+        self.__columnar_log = None
+        if header['include_traces']:
+            self.__columnar_log = ColumnarUncertainLog(*(self.__arrays[name] for name in _COLUMNAR_ARRAYS), self.__label_table, header['tz_aware'],
+                                                       **{name: self.__arrays[name] for name in _COLUMNAR_PROBABILITY_ARRAYS})
+        self.__variants = None
+
+    def __reduce__(self):
+        return MappedUncertainLog, (self.__path,)
+
+    def number_of_variants(self):
+        return len(self.__arrays['multiplicities'])
+
+    def variant_multiplicity(self, variant_id):
+        return int(self.__arrays['multiplicities'][variant_id])
+
+    def __variant_nodes(self, variant_id):
+        node_offsets = self.__arrays['node_offsets']
+        first_node, last_node = int(node_offsets[variant_id]), int(node_offsets[variant_id + 1])
+        label_offsets = self.__arrays['node_label_offsets'][first_node:last_node + 1].tolist()
+        label_ids = self.__arrays['node_label_ids'][label_offsets[0]:label_offsets[-1]].tolist()
+        indeterminate = np.unpackbits(self.__arrays['node_indeterminate'], count=last_node, bitorder='little')[first_node:].tolist()
+        nodes = []
+        for k, event_index in enumerate(self.__arrays['node_event_indices'][first_node:last_node].tolist()):
+            activity_labels = [self.__label_table[label_id] for label_id in label_ids[label_offsets[k] - label_offsets[0]:label_offsets[k + 1] - label_offsets[0]]]
+            if indeterminate[k]:
+                activity_labels.append(None)
+            nodes.append((event_index, frozenset(activity_labels)))
+        return first_node, last_node, nodes
+
+    def nodes_tuple(self, variant_id):
+        """
+        Returns the nodes tuple of a variant, as returned by create_nodes_tuples for its traces.
+
+        :param variant_id: The id of the variant, that is its rank in variants
+        :type variant_id: int
+        :return: The nodes tuple of the variant
+        :rtype: tuple
+        """
+
+        first_node, _, nodes = self.__variant_nodes(variant_id)
+        endpoints = self.__arrays['endpoints'][2 * first_node:2 * (first_node + len(nodes))].tolist()
+        return tuple((nodes[endpoint >> 1], bool(endpoint & 1)) for endpoint in endpoints)
+
+    def behavior_graph(self, variant_id):
+        """
+        Returns the behavior graph of a variant, sharing the label table of the log.
+
+        :param variant_id: The id of the variant, that is its rank in variants
+        :type variant_id: int
+        :return: The behavior graph of the variant
+        :rtype: CompactBehaviorGraph
+        """
+
+        first_node, last_node, nodes = self.__variant_nodes(variant_id)
+        successor_offsets = self.__arrays['successor_offsets'][first_node:last_node + 1].tolist()
+        successor_ids = self.__arrays['successor_ids'][successor_offsets[0]:successor_offsets[-1]].tolist()
+        edges = [(nodes[k], nodes[successor_ids[position - successor_offsets[0]]]) for k in range(len(nodes)) for position in range(successor_offsets[k], successor_offsets[k + 1])]
+        return CompactBehaviorGraph(nodes, edges, self.__label_table)
+
+    def to_uncertain_log(self, compact=True):
+        """
+        Returns the log as an UncertainLog, with the behavior graphs and the ranking of the variants read from the file rather than computed again.
+        The events only have the attributes stored in the columnar form of the traces.
+
+        :param compact: if True, behavior graphs are stored as CompactBehaviorGraph objects
+        :return: the uncertain log
+        """
+
+        if self.__columnar_log is None:
+            raise ValueError('The traces of the log were not stored in the file.')
+        uncertain_log = UncertainLog(compact=compact)
+        traces = self.__columnar_log.to_event_log()
+        if compact:
+            for activity_label in self.__label_table:
+                uncertain_log.label_table.intern(activity_label)
+        traces_lists = [[] for _ in range(self.number_of_variants())]
+        for trace, variant_id in zip(traces, self.trace_variants.tolist()):
+            uncertain_log.append(trace)
+            traces_lists[variant_id].append(trace)
+        for variant_id, traces_list in enumerate(traces_lists):
+            variant_behavior_graph = self.behavior_graph(variant_id)
+            if compact:
+                variant_behavior_graph = CompactBehaviorGraph(variant_behavior_graph.nodes, variant_behavior_graph.edges, uncertain_log.label_table)
+            else:
+                variant_behavior_graph = variant_behavior_graph.to_behavior_graph()
+            # Logs keeping only the representative traces of the variants reference them once for each trace
+            traces_list.extend(traces_list[:1] * (self.variant_multiplicity(variant_id) - len(traces_list)))
+            uncertain_log.behavior_graphs_map[self.nodes_tuple(variant_id)] = (variant_behavior_graph, traces_list)
+        uncertain_log.rank_variants()
+        return uncertain_log
+
+    def close(self):
+        self.__columnar_log = None
+        self.__arrays = None
+        self.__mmap.close()
+
+    def __get_variants(self):
+        # Built on first access, as for variants of UncertainLog: a dictionary from the rank of each variant to its number of traces and nodes tuple
+        if self.__variants is None:
+            self.__variants = {variant_id: (self.variant_multiplicity(variant_id), self.nodes_tuple(variant_id)) for variant_id in range(self.number_of_variants())}
+        return self.__variants
+
+    def __get_label_table(self):
+        return self.__label_table
+
+    def __get_trace_variants(self):
+        return self.__arrays['trace_variants']
+
+    def __get_multiplicities(self):
+        return self.__arrays['multiplicities']
+
+    def __get_columnar_log(self):
+        return self.__columnar_log
+
+    def __get_path(self):
+        return self.__path
+
+    def __len__(self):
+        return len(self.__arrays['trace_variants'])
+
+    variants = property(__get_variants)
+    label_table = property(__get_label_table)
+    trace_variants = property(__get_trace_variants)
+    multiplicities = property(__get_multiplicities)
+    columnar_log = property(__get_columnar_log)
+    path = property(__get_path)
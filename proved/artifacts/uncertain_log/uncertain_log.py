@@ -1,16 +1,53 @@
-from pm4py.objects.log.log import EventLog
+from concurrent.futures import ProcessPoolExecutor
+
+from pm4py.objects.log.log import EventLog, Trace
+from pm4py.objects.log.util import xes
 
 from proved.artifacts.behavior_graph import behavior_graph
+from proved.artifacts.behavior_graph.compact_behavior_graph import CompactBehaviorGraph, LabelTable
+from proved.artifacts.variant_cache.variant_cache import BEHAVIOR_GRAPH_EDGES
+
+
+def _variants_chunk(traces):
+    """
+    Computes the nodes tuples of a chunk of traces, and the edges of the behavior graph of each distinct nodes tuple in the chunk.
+    Executed by the worker processes when building an uncertain log in parallel.
+
+    :param traces: a list of traces
+    :return: a 2-tuple containing the list of nodes tuples of the traces and a dictionary from each distinct nodes tuple to its list of edges
+    """
+
+    nodes_tuples_list = []
+    edges_map = dict()
+    canonical_nodes_tuples = dict()
+    for trace in traces:
+        nodes_tuple = behavior_graph.create_nodes_tuples(trace)
+        if nodes_tuple not in edges_map:
+            edges_map[nodes_tuple] = behavior_graph.create_edges_list(nodes_tuple)
+            canonical_nodes_tuples[nodes_tuple] = nodes_tuple
+        else:
+            # Equal nodes tuples are replaced by the same object, so that they are pickled only once when sent back
+            nodes_tuple = canonical_nodes_tuples[nodes_tuple]
+        nodes_tuples_list.append(nodes_tuple)
+    return nodes_tuples_list, edges_map
 
 
 class UncertainLog(EventLog):
 
-    def __init__(self, log=None):
+    def __init__(self, log=None, compact=False, n_jobs=1, chunk_size=1000, cache=None):
         self.__variants = dict()
         self.__behavior_graphs_map = dict()
+        # If compact is True, behavior graphs are stored as CompactBehaviorGraph objects sharing a single label table
+        self.__label_table = LabelTable() if compact else None
+        # If a variant cache is given, the edges of the behavior graphs of known variants are read from it instead of being computed
+        self.__cache = cache
+        # Online mode state, created by the first call to append_event: the open cases, the positions of the traces in the lists of their variants, the
+        # ranks of the variants and the first and last ranks of the variants with each number of traces
+        self.__cases = dict()
+        self.__online = None
         if log is not None:
             EventLog.__init__(self, log)
-            self.create_behavior_graphs()
+            self.create_behavior_graphs(n_jobs, chunk_size)
         else:
             EventLog.__init__(self)
 
@@ -20,19 +57,198 @@ class UncertainLog(EventLog):
     def __get_behavior_graphs_map(self):
         return self.__behavior_graphs_map
 
-    def create_behavior_graphs(self):
-        for trace in self:
-            nodes_tuple = behavior_graph.create_nodes_tuples(trace)
-            if nodes_tuple not in self.behavior_graphs_map:
-                self.behavior_graphs_map[nodes_tuple] = (behavior_graph.BehaviorGraph(trace), [])
-            self.behavior_graphs_map[nodes_tuple][1].append(trace)
+    def __get_label_table(self):
+        return self.__label_table
+
+    def __new_behavior_graph(self, nodes_tuple, edges_list=None):
+        if self.__cache is not None:
+            if edges_list is None:
+                edges_list = self.__cache.get_or_create(nodes_tuple, BEHAVIOR_GRAPH_EDGES, lambda: behavior_graph.create_edges_list(nodes_tuple))
+            elif self.__cache.get(nodes_tuple, BEHAVIOR_GRAPH_EDGES) is None:
+                self.__cache.put(nodes_tuple, BEHAVIOR_GRAPH_EDGES, edges_list)
+        elif edges_list is None:
+            edges_list = behavior_graph.create_edges_list(nodes_tuple)
+        nodes = [node for node, timestamp_type in nodes_tuple if timestamp_type is False]
+        if self.label_table is None:
+            new_behavior_graph = behavior_graph.BehaviorGraph()
+            new_behavior_graph.add_nodes_from(nodes)
+            new_behavior_graph.add_edges_from(edges_list)
+            return new_behavior_graph
+        return CompactBehaviorGraph(nodes, edges_list, self.label_table)
+
+    def create_behavior_graphs(self, n_jobs=1, chunk_size=1000):
+        """
+        Groups the traces of the log by variant, building the behavior graph of each variant.
+        With n_jobs different from 1, nodes tuples and behavior graphs are computed by a pool of worker processes on chunks of traces;
+        the result is identical to the sequential computation.
+
+        :param n_jobs: the number of worker processes (all the available processors if None)
+        :param chunk_size: the number of traces sent to a worker process at a time
+        :return:
+        """
+
+        if n_jobs == 1:
+            for trace in self:
+                self.__group_trace(trace)
+        else:
+            traces = list(self)
+            chunks = [traces[i:i + chunk_size] for i in range(0, len(traces), chunk_size)]
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                # Chunks are merged in order, so that variants are inserted in the same order of the sequential computation
+                for chunk, (nodes_tuples_list, edges_map) in zip(chunks, executor.map(_variants_chunk, chunks)):
+                    for trace, nodes_tuple in zip(chunk, nodes_tuples_list):
+                        if nodes_tuple not in self.behavior_graphs_map:
+                            self.behavior_graphs_map[nodes_tuple] = (self.__new_behavior_graph(nodes_tuple, edges_map[nodes_tuple]), [])
+                        self.behavior_graphs_map[nodes_tuple][1].append(trace)
+        self.rank_variants()
+
+    def __group_trace(self, trace, variants_only=False):
+        # Adds a trace to the list of its variant; with variants_only, the list only references the first trace of the variant, once for each trace
+        nodes_tuple = behavior_graph.create_nodes_tuples(trace)
+        if nodes_tuple not in self.behavior_graphs_map:
+            self.behavior_graphs_map[nodes_tuple] = (self.__new_behavior_graph(nodes_tuple), [])
+        elif variants_only:
+            trace = self.behavior_graphs_map[nodes_tuple][1][0]
+        self.behavior_graphs_map[nodes_tuple][1].append(trace)
+        return trace
+
+    def rank_variants(self):
+        """
+        Ranks the variants in behavior_graphs_map by number of traces into variants, e.g. after adding variants to behavior_graphs_map directly.
+
+        :return:
+        """
+
+        self.__online = None
         if self.behavior_graphs_map is not {}:
             variant_list = [(len(traces_list), nodes_list) for nodes_list, (_, traces_list) in self.behavior_graphs_map.items()]
             variant_list.sort(reverse=True)
             self.__variants = {i: (variant_length, nodes_tuple) for i, (variant_length, nodes_tuple) in enumerate(variant_list)}
 
+    def add_traces(self, traces, variants_only=False):
+        """
+        Adds traces to the log one at a time, e.g. from a generator, grouping them by variant as they arrive; the ranking of the variants is updated once
+        all the traces are added.
+        With variants_only, only the first trace of each variant is kept in the log, and the list of traces of the variant references it once for each
+        trace of the variant, so that the number of traces of each variant is preserved while the other traces can be freed.
+
+        :param traces: an iterable of traces
+        :param variants_only: if True, keep only a representative trace for each variant
+        :return:
+        """
+
+        for trace in traces:
+            if self.__group_trace(trace, variants_only) is trace:
+                self.append(trace)
+        self.rank_variants()
+
     def get_behavior_graph(self, trace):
         return self.behavior_graphs_map[behavior_graph.create_nodes_tuples(trace)]
 
+    def __init_online(self):
+        trace_positions = dict()
+        for _, traces_list in self.behavior_graphs_map.values():
+            for position, trace in enumerate(traces_list):
+                trace_positions[id(trace)] = position
+        ranks = dict()
+        first_ranks = dict()
+        last_ranks = dict()
+        for rank, (variant_length, nodes_tuple) in self.__variants.items():
+            ranks[nodes_tuple] = rank
+            first_ranks.setdefault(variant_length, rank)
+            last_ranks[variant_length] = rank
+        self.__online = (trace_positions, ranks, first_ranks, last_ranks)
+
+    def __swap_ranks(self, rank1, rank2):
+        ranks = self.__online[1]
+        self.__variants[rank1], self.__variants[rank2] = self.__variants[rank2], self.__variants[rank1]
+        ranks[self.__variants[rank1][1]] = rank1
+        ranks[self.__variants[rank2][1]] = rank2
+
+    def __add_trace_to_variant(self, trace, nodes_tuple, case_behavior_graph):
+        trace_positions, ranks, first_ranks, last_ranks = self.__online
+        if nodes_tuple not in self.behavior_graphs_map:
+            self.behavior_graphs_map[nodes_tuple] = (self.__new_behavior_graph(nodes_tuple, list(case_behavior_graph.edges)), [])
+            # A new variant has a single trace, and goes to the bottom of the ranking
+            rank = len(self.__variants)
+            self.__variants[rank] = (1, nodes_tuple)
+            ranks[nodes_tuple] = rank
+            first_ranks.setdefault(1, rank)
+            last_ranks[1] = rank
+        else:
+            # The variant is swapped with the first variant with as many traces, and joins the variants with one more trace
+            rank = ranks[nodes_tuple]
+            variant_length = self.__variants[rank][0]
+            first_rank = first_ranks[variant_length]
+            self.__swap_ranks(rank, first_rank)
+            if last_ranks[variant_length] == first_rank:
+                del first_ranks[variant_length], last_ranks[variant_length]
+            else:
+                first_ranks[variant_length] = first_rank + 1
+            first_ranks.setdefault(variant_length + 1, first_rank)
+            last_ranks[variant_length + 1] = first_rank
+            self.__variants[first_rank] = (variant_length + 1, nodes_tuple)
+        traces_list = self.behavior_graphs_map[nodes_tuple][1]
+        trace_positions[id(trace)] = len(traces_list)
+        traces_list.append(trace)
+
+    def __remove_trace_from_variant(self, trace, nodes_tuple):
+        trace_positions, ranks, first_ranks, last_ranks = self.__online
+        # The trace is swapped with the last one of the variant, and popped
+        traces_list = self.behavior_graphs_map[nodes_tuple][1]
+        position = trace_positions.pop(id(trace))
+        if position != len(traces_list) - 1:
+            traces_list[position] = traces_list[-1]
+            trace_positions[id(traces_list[position])] = position
+        traces_list.pop()
+        # The variant is swapped with the last variant with as many traces, and joins the variants with one less trace
+        rank = ranks[nodes_tuple]
+        variant_length = self.__variants[rank][0]
+        last_rank = last_ranks[variant_length]
+        self.__swap_ranks(rank, last_rank)
+        if first_ranks[variant_length] == last_rank:
+            del first_ranks[variant_length], last_ranks[variant_length]
+        else:
+            last_ranks[variant_length] = last_rank - 1
+        if variant_length == 1:
+            # Variants without traces are at the bottom of the ranking
+            del self.__variants[last_rank], ranks[nodes_tuple], self.behavior_graphs_map[nodes_tuple]
+        else:
+            first_ranks[variant_length - 1] = last_rank
+            last_ranks.setdefault(variant_length - 1, last_rank)
+            self.__variants[last_rank] = (variant_length - 1, nodes_tuple)
+
+    def append_event(self, case_id, event):
+        """
+        Appends an event to an open case of the log, e.g. from an event stream, starting a new case (and trace) if the case id is new.
+        The behavior graph of the case is updated incrementally, the trace moves to the list of its new variant in constant time, and the ranking of the
+        variants by number of traces in variants is updated by swapping the variant with the first or last variant with the same number of traces: the
+        ranking stays sorted by number of traces, but variants with the same number of traces are not sorted by nodes tuple as in create_behavior_graphs.
+
+        :param case_id: the id of the case, used as concept:name of a new trace
+        :param event: the event
+        :return: the nodes tuple of the new variant of the case
+        """
+
+        if self.__online is None:
+            self.__init_online()
+        if case_id not in self.__cases:
+            trace = Trace(attributes={xes.DEFAULT_TRACEID_KEY: case_id})
+            self.append(trace)
+            self.__cases[case_id] = (trace, behavior_graph.IncrementalBehaviorGraph(), None)
+        trace, case_behavior_graph, nodes_tuple = self.__cases[case_id]
+        if nodes_tuple is not None:
+            self.__remove_trace_from_variant(trace, nodes_tuple)
+        trace.append(event)
+        case_behavior_graph.append_event(event)
+        nodes_tuple = case_behavior_graph.nodes_tuple
+        self.__add_trace_to_variant(trace, nodes_tuple, case_behavior_graph)
+        self.__cases[case_id] = (trace, case_behavior_graph, nodes_tuple)
+        return nodes_tuple
+
+    def case_behavior_graph(self, case_id):
+        return self.__cases[case_id][1]
+
     variants = property(__get_variants)
     behavior_graphs_map = property(__get_behavior_graphs_map)
+    label_table = property(__get_label_table)
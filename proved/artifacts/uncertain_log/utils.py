@@ -1,20 +1,70 @@
-from proved.artifacts.behavior_graph import behavior_graph
-from proved.artifacts.behavior_net import behavior_net as behavior_net_builder
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph, create_nodes_tuples
+from proved.artifacts.behavior_graph.utils import as_behavior_graph, behavior_graph_labels, behavior_graph_probabilities, is_behavior_graph, realization_to_trace, top_k_realizations, \
+    uncertainty_probabilities
 from proved.artifacts.behavior_net.utils import acyclic_net_variants
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+from proved.artifacts.variant_cache.variant_cache import get_behavior_net
 
 
-def realization_set(trace):
+def realization_set(trace, cache=None):
     """
     Returns the realization set of an uncertain trace.
 
-    :param trace: An uncertain trace.
+    :param trace: An uncertain trace, or its behavior graph.
     :type trace:
+    :param cache: A variant cache for the behavior net of the trace.
+    :type cache:
     :return: The realization set of the trace in input.
     :rtype:
     """
 
-    behavior_net = behavior_net_builder.BehaviorNet(behavior_graph.BehaviorGraph(trace))
+    behavior_net = get_behavior_net(trace, cache)
     bn_i = behavior_net.initial_marking
     bn_f = behavior_net.final_marking
     
     return acyclic_net_variants(behavior_net, bn_i, bn_f)
+
+
+def most_likely_realizations(trace, k):
+    """
+    Returns the k most probable realizations of an uncertain trace, according to the probabilities of its uncertain attributes, without enumerating
+    the rest of the realization set.
+    Behavior graphs do not keep the probabilities of the events: if a behavior graph is given, all the choices are equally likely, as in
+    behavior_graph_probabilities.
+
+    :param trace: An uncertain trace, or its behavior graph.
+    :type trace:
+    :param k: The number of realizations.
+    :type k: int
+    :return: A list of 2-tuples containing a realization, as a trace, and its probability, in decreasing order of probability.
+    :rtype: list
+    """
+
+    behavior_graph = as_behavior_graph(trace)
+    labels = behavior_graph_labels(behavior_graph)
+    if is_behavior_graph(trace):
+        probabilities = behavior_graph_probabilities(behavior_graph)
+    else:
+        probabilities = uncertainty_probabilities(trace)
+
+    return [(realization_to_trace(realization, labels), probability) for realization, probability in top_k_realizations(behavior_graph, k, probabilities, labels)]
+
+
+def log_variants(log):
+    """
+    Groups the traces of a strongly uncertain log by variant.
+
+    :param log: the strongly uncertain event log, or an UncertainLog
+    :return: a dictionary from the nodes tuple of each variant to a 2-tuple containing its behavior graph and the list of its traces
+    """
+
+    if isinstance(log, UncertainLog):
+        return log.behavior_graphs_map
+
+    variants = dict()
+    for trace in log:
+        nodes_tuple = create_nodes_tuples(trace)
+        if nodes_tuple not in variants:
+            variants[nodes_tuple] = (BehaviorGraph(nodes_tuples=nodes_tuple), [])
+        variants[nodes_tuple][1].append(trace)
+    return variants
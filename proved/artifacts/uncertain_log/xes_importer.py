@@ -0,0 +1,117 @@
+import gzip
+
+from lxml import etree
+from pm4py.objects.log.log import Trace, Event
+from pm4py.objects.log.util import xes
+from pm4py.util.dt_parsing import parser as dt_parser
+
+import proved.xes_keys as xes_keys
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+
+# Tags of the XES attributes
+_ATTRIBUTE_TAGS = frozenset(('string', 'date', 'int', 'float', 'boolean', 'id', 'list', 'container'))
+
+
+def _local_tag(elem):
+    return elem.tag.rsplit('}', 1)[-1]
+
+
+def _parse_attribute(elem, date_parser):
+    """
+    Returns the key and the value of an XES attribute element, with nested attributes in the same form of the pm4py importers: a dictionary with the value of
+    the attribute and its children, e.g. the possible activity labels of an uncertain activity.
+
+    :param elem: the attribute element
+    :param date_parser: the pm4py date parser
+    :return: a 2-tuple containing the key and the value of the attribute
+    """
+
+    tag = _local_tag(elem)
+    value = elem.get('value')
+    if tag == 'date':
+        value = date_parser.apply(value)
+    elif tag == 'int':
+        value = int(value)
+    elif tag == 'float':
+        value = float(value)
+    elif tag == 'boolean':
+        value = str(value).lower() == 'true'
+    elif tag == 'list':
+        value = None
+    children = [child for child in elem if _local_tag(child) in _ATTRIBUTE_TAGS or _local_tag(child) == 'values']
+    if not children:
+        return elem.get('key'), value
+    if _local_tag(children[0]) == 'values':
+        return elem.get('key'), {'value': value, 'children': [_parse_attribute(child, date_parser) for child in children[0] if _local_tag(child) in _ATTRIBUTE_TAGS]}
+    return elem.get('key'), {'value': value, 'children': dict(_parse_attribute(child, date_parser) for child in children)}
+
+
+def iterparse_traces(path, minimal=False, log=None, activity_key=xes.DEFAULT_NAME_KEY, timestamp_key=xes.DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=xes_keys.DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=xes_keys.DEFAULT_U_TIMESTAMP_MAX_KEY, u_missing_key=xes_keys.DEFAULT_U_MISSING_KEY, u_activity_key=xes_keys.DEFAULT_U_NAME_KEY):
+    """
+    Parses an XES file (gzip-compressed if its name ends with .gz) incrementally, yielding its traces one at a time; the elements of each trace are freed as
+    soon as the trace is yielded, so that the memory used does not grow with the size of the file.
+
+    :param path: the path of the XES file
+    :param minimal: if True, events only keep the activity label, the timestamp and the uncertain attributes read by create_nodes_tuples
+    :param log: an optional event log, to which the attributes and extensions of the log in the file are added
+    :param activity_key: the xes key for the activity labels
+    :param timestamp_key: the xes key for the timestamp
+    :param u_timestamp_min_key: the xes key for the minimum value of an uncertain timestamp
+    :param u_timestamp_max_key: the xes key for the maximum value of an uncertain timestamp
+    :param u_missing_key: the xes key for indeterminate events
+    :param u_activity_key: the xes key for uncertain activity labels
+    :return: a generator of the traces of the file
+    """
+
+    kept_keys = {activity_key, timestamp_key, u_timestamp_min_key, u_timestamp_max_key, u_missing_key, u_activity_key} if minimal else None
+    date_parser = dt_parser.get()
+    events = []
+    trace_attributes = dict()
+    with (gzip.open(path, 'rb') if path.lower().endswith('.gz') else open(path, 'rb')) as xes_file:
+        for _, elem in etree.iterparse(xes_file, events=('end',)):
+            tag = _local_tag(elem)
+            parent = elem.getparent()
+            parent_tag = _local_tag(parent) if parent is not None else None
+            if tag == 'event':
+                event = Event()
+                for child in elem:
+                    if _local_tag(child) in _ATTRIBUTE_TAGS and (kept_keys is None or child.get('key') in kept_keys):
+                        key, value = _parse_attribute(child, date_parser)
+                        event[key] = value
+                events.append(event)
+                elem.clear()
+            elif tag in _ATTRIBUTE_TAGS and parent_tag == 'trace':
+                key, value = _parse_attribute(elem, date_parser)
+                trace_attributes[key] = value
+            elif tag == 'trace':
+                trace = Trace(events, attributes=trace_attributes)
+                events = []
+                trace_attributes = dict()
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+                yield trace
+            elif log is not None and tag in _ATTRIBUTE_TAGS and parent_tag == 'log':
+                key, value = _parse_attribute(elem, date_parser)
+                log.attributes[key] = value
+            elif log is not None and tag == 'extension' and parent_tag == 'log':
+                log.extensions[elem.get('name')] = {'prefix': elem.get('prefix'), 'uri': elem.get('uri')}
+
+
+def import_uncertain_log(path, variants_only=False, minimal=False, compact=False, cache=None):
+    """
+    Imports an uncertain XES file straight into an UncertainLog, parsing it incrementally and grouping its traces by variant as they are read, without
+    building an intermediate pm4py event log.
+    With variants_only, only a representative trace of each variant is kept, along with the number of traces of the variant.
+
+    :param path: the path of the XES file
+    :param variants_only: if True, keep only a representative trace for each variant
+    :param minimal: if True, events only keep the activity label, the timestamp and the uncertain attributes
+    :param compact: if True, behavior graphs are stored as CompactBehaviorGraph objects
+    :param cache: the optional variant cache for the behavior graphs
+    :return: the uncertain log
+    """
+
+    uncertain_log = UncertainLog(compact=compact, cache=cache)
+    uncertain_log.add_traces(iterparse_traces(path, minimal, uncertain_log), variants_only)
+    return uncertain_log
@@ -0,0 +1,172 @@
+import copy
+from collections.abc import MutableMapping, Sequence
+
+
+class UncertaintyOverlay(object):
+    """
+    Class representing a sparse layer of event attributes over an event log, which is never modified.
+    The attributes written through the overlay are stored in a dictionary keyed by (trace index, event index), and read before the ones of the underlying
+    events: many overlays, e.g. the uncertainty levels of a parameter sweep, can share a single log, each taking memory proportional to the events it alters.
+    Iterating over an overlay yields OverlayTrace views of the traces of the log, which can be passed wherever traces are read or altered: to the bewilderer
+    functions (as the log), to create_nodes_tuples and BehaviorGraph (as a trace), and to UncertainLog (as the log).
+    """
+
+    def __init__(self, log):
+        """
+        :param log: The underlying event log
+        """
+
+        self.__log = log
+        self.__layers = dict()
+
+    def trace(self, trace_index):
+        """
+        Returns a view of a trace of the log, reading and writing its events through the overlay.
+
+        :param trace_index: The position of the trace in the log
+        :type trace_index: int
+        :return: The view of the trace
+        :rtype: OverlayTrace
+        """
+
+        return OverlayTrace(self, trace_index)
+
+    def event_attributes(self, trace_index, event_index):
+        """
+        Returns the attributes written through the overlay for an event of the log.
+
+        :param trace_index: The position of the trace in the log
+        :type trace_index: int
+        :param event_index: The position of the event in the trace
+        :type event_index: int
+        :return: A dictionary of the attributes of the event in the overlay, empty if the event is not altered
+        :rtype: dict
+        """
+
+        return dict(self.__layers.get((trace_index, event_index), ()))
+
+    def altered_events(self):
+        """
+        Returns the events of the log altered through the overlay, in the order they were first altered.
+
+        :return: A list of (trace index, event index) pairs
+        :rtype: list
+        """
+
+        return list(self.__layers)
+
+    def clear(self):
+        """
+        Discards all the attributes written through the overlay, so that its events read as the ones of the underlying log again.
+        """
+
+        self.__layers.clear()
+
+    def _event_layer(self, trace_index, event_index, create=False):
+        # Returns the attributes dictionary of an event in the overlay; if not altered, an empty one is added if create is True, otherwise None is returned
+        layer = self.__layers.get((trace_index, event_index))
+        if layer is None and create:
+            layer = self.__layers[(trace_index, event_index)] = dict()
+        return layer
+
+    def _drop_event_layer(self, trace_index, event_index):
+        self.__layers.pop((trace_index, event_index), None)
+
+    def __get_log(self):
+        return self.__log
+
+    def __getitem__(self, trace_index):
+        return OverlayTrace(self, range(len(self.__log))[trace_index])
+
+    def __iter__(self):
+        for trace_index in range(len(self.__log)):
+            yield OverlayTrace(self, trace_index)
+
+    def __len__(self):
+        return len(self.__log)
+
+    log = property(__get_log)
+
+
+class OverlayTrace(Sequence):
+    """
+    Class representing a view of a trace of the log of an UncertaintyOverlay, whose events are OverlayEvent views.
+    """
+
+    __slots__ = ('__overlay', '__trace_index', '__trace')
+
+    def __init__(self, overlay, trace_index):
+        self.__overlay = overlay
+        self.__trace_index = trace_index
+        self.__trace = overlay.log[trace_index]
+
+    def __getitem__(self, event_index):
+        if isinstance(event_index, slice):
+            return [self[i] for i in range(len(self.__trace))[event_index]]
+        event_index = range(len(self.__trace))[event_index]
+        return OverlayEvent(self.__overlay, self.__trace_index, event_index, self.__trace[event_index])
+
+    def __len__(self):
+        return len(self.__trace)
+
+    def __get_attributes(self):
+        return self.__trace.attributes
+
+    def __get_trace_index(self):
+        return self.__trace_index
+
+    attributes = property(__get_attributes)
+    trace_index = property(__get_trace_index)
+
+
+class OverlayEvent(MutableMapping):
+    """
+    Class representing a view of an event of the log of an UncertaintyOverlay.
+    Attributes are read from the overlay first and from the event next; attributes are always written to the overlay, and only the ones in the overlay can be
+    deleted. Mutable attribute values of the event (dictionaries, lists and sets, e.g. the children of an uncertain activity) are copied to the overlay the
+    first time they are read, so that modifying them in place does not alter the underlying event; the event is then listed among the altered events.
+    """
+
+    __slots__ = ('__overlay', '__trace_index', '__event_index', '__event')
+
+    def __init__(self, overlay, trace_index, event_index, event):
+        self.__overlay = overlay
+        self.__trace_index = trace_index
+        self.__event_index = event_index
+        self.__event = event
+
+    def __getitem__(self, key):
+        layer = self.__overlay._event_layer(self.__trace_index, self.__event_index)
+        if layer is not None and key in layer:
+            return layer[key]
+        value = self.__event[key]
+        if isinstance(value, (dict, list, set)):
+            value = self.__overlay._event_layer(self.__trace_index, self.__event_index, create=True)[key] = copy.deepcopy(value)
+        return value
+
+    def __contains__(self, key):
+        layer = self.__overlay._event_layer(self.__trace_index, self.__event_index)
+        return (layer is not None and key in layer) or key in self.__event
+
+    def __setitem__(self, key, value):
+        self.__overlay._event_layer(self.__trace_index, self.__event_index, create=True)[key] = value
+
+    def __delitem__(self, key):
+        layer = self.__overlay._event_layer(self.__trace_index, self.__event_index)
+        if layer is None or key not in layer:
+            raise KeyError(key)
+        del layer[key]
+        if not layer:
+            self.__overlay._drop_event_layer(self.__trace_index, self.__event_index)
+
+    def __iter__(self):
+        layer = self.__overlay._event_layer(self.__trace_index, self.__event_index)
+        yield from self.__event
+        if layer is not None:
+            yield from (key for key in layer if key not in self.__event)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return str(dict(self))
@@ -0,0 +1,251 @@
+import hashlib
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph, create_nodes_tuples
+from proved.artifacts.behavior_graph.utils import as_behavior_graph, is_behavior_graph, realization_count
+from proved.artifacts.behavior_net.behavior_net import BehaviorNet
+
+# Kinds of objects stored in the cache for each variant
+BEHAVIOR_GRAPH_EDGES = 'behavior_graph_edges'
+BEHAVIOR_NET = 'behavior_net'
+REALIZATION_COUNT = 'realization_count'
+
+
+def variant_hash(nodes_tuple):
+    """
+    Returns a stable hash of a variant, identified by its nodes tuple; unlike hash(), the result is the same across processes and interpreter runs.
+
+    :param nodes_tuple: The nodes tuple of a variant, as returned by create_nodes_tuples
+    :type nodes_tuple:
+    :return: The hexadecimal SHA-256 digest of the variant
+    :rtype: str
+    """
+
+    canonical_form = tuple((node[0], tuple(sorted(repr(activity_label) for activity_label in node[1])), timestamp_type) for node, timestamp_type in nodes_tuple)
+    return hashlib.sha256(repr(canonical_form).encode('utf-8')).hexdigest()
+
+
+class VariantCache(object):
+    """
+    Class representing a persistent, content-addressed cache of objects derived from the variants of uncertain logs (behavior graphs, behavior nets,
+    realization counts...), stored pickled in a SQLite file and keyed by the stable hash of the nodes tuple of the variant.
+    When the total size of the stored objects exceeds max_size bytes, the least recently used entries are evicted.
+    Access times of the entries read from the cache are kept in memory and written in a single transaction every max_pending_accesses reads (and before
+    evicting entries, or when the cache is closed), so that a read does not cost a write to disk.
+    """
+
+    def __init__(self, path, max_size=1 << 30, max_pending_accesses=1024):
+        self.__max_size = max_size
+        self.__max_pending_accesses = max_pending_accesses
+        self.__pending_accesses = dict()
+        self.__connection = sqlite3.connect(path, isolation_level=None)
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS entries (variant TEXT, kind TEXT, value BLOB, size INTEGER, last_access REAL, PRIMARY KEY (variant, kind))')
+        self.__connection.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self.__size = self.__read_size()
+
+    def get(self, nodes_tuple, kind, default=None):
+        """
+        Returns an object of a given kind stored for a variant.
+
+        :param nodes_tuple: The nodes tuple of the variant
+        :type nodes_tuple:
+        :param kind: The kind of the object
+        :type kind: str
+        :param default: The value returned if the object is not in the cache
+        :type default:
+        :return: The cached object, or default
+        :rtype:
+        """
+
+        key = variant_hash(nodes_tuple)
+        row = self.__connection.execute('SELECT value FROM entries WHERE variant = ? AND kind = ?', (key, kind)).fetchone()
+        if row is None:
+            return default
+        self.__pending_accesses[(key, kind)] = time.time()
+        if len(self.__pending_accesses) >= self.__max_pending_accesses:
+            self.flush()
+        return pickle.loads(row[0])
+
+    def flush(self):
+        """
+        Writes the pending access times of the entries read from the cache.
+
+        :return:
+        """
+
+        if not self.__pending_accesses:
+            return
+        self.__connection.execute('BEGIN')
+        self.__connection.executemany('UPDATE entries SET last_access = ? WHERE variant = ? AND kind = ?',
+                                      [(last_access, key, kind) for (key, kind), last_access in self.__pending_accesses.items()])
+        self.__connection.execute('COMMIT')
+        self.__pending_accesses.clear()
+
+    def __read_size(self):
+        return self.__connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def put(self, nodes_tuple, kind, value):
+        """
+        Stores an object of a given kind for a variant, evicting the least recently used entries if the cache grows over its maximum size.
+
+        :param nodes_tuple: The nodes tuple of the variant
+        :type nodes_tuple:
+        :param kind: The kind of the object
+        :type kind: str
+        :param value: The object to store
+        :type value:
+        :return:
+        """
+
+        key = variant_hash(nodes_tuple)
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        old_row = self.__connection.execute('SELECT size FROM entries WHERE variant = ? AND kind = ?', (key, kind)).fetchone()
+        self.__connection.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)', (key, kind, sqlite3.Binary(blob), len(blob), time.time()))
+        self.__size += len(blob) - (old_row[0] if old_row is not None else 0)
+        if self.__size <= self.__max_size:
+            return
+
+        # Other processes sharing the file may have added or evicted entries: the size is read again before evicting
+        self.flush()
+        self.__size = self.__read_size()
+        while self.__size > self.__max_size:
+            row = self.__connection.execute('SELECT variant, kind, size FROM entries ORDER BY last_access LIMIT 1').fetchone()
+            if row is None:
+                self.__size = self.__read_size()
+                break
+            variant, evicted_kind, size = row
+            self.__connection.execute('DELETE FROM entries WHERE variant = ? AND kind = ?', (variant, evicted_kind))
+            self.__size -= size
+
+    def get_or_create(self, nodes_tuple, kind, factory):
+        """
+        Returns an object of a given kind stored for a variant, creating it with factory() and storing it if it is not in the cache.
+
+        :param nodes_tuple: The nodes tuple of the variant
+        :type nodes_tuple:
+        :param kind: The kind of the object
+        :type kind: str
+        :param factory: A function with no arguments creating the object
+        :type factory:
+        :return: The cached or newly created object
+        :rtype:
+        """
+
+        value = self.get(nodes_tuple, kind)
+        if value is None:
+            value = factory()
+            self.put(nodes_tuple, kind, value)
+        return value
+
+    def clear(self):
+        self.__connection.execute('DELETE FROM entries')
+        self.__pending_accesses.clear()
+        self.__size = 0
+
+    def close(self):
+        self.flush()
+        self.__connection.close()
+
+    def __get_size(self):
+        return self.__size
+
+    def __len__(self):
+        return self.__connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    size = property(__get_size)
+
+
+class MemoryVariantCache(object):
+    """
+    Class representing a bounded in-process cache of objects derived from the variants of uncertain logs, keyed by the nodes tuple of the variant and
+    evicting the least recently used entries beyond max_entries. It has the same interface of VariantCache, but stores the objects themselves instead
+    of pickled copies: the objects returned are shared by all the callers, and must not be modified.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.__max_entries = max_entries
+        self.__entries = OrderedDict()
+
+    def get(self, nodes_tuple, kind, default=None):
+        key = (nodes_tuple, kind)
+        if key not in self.__entries:
+            return default
+        self.__entries.move_to_end(key)
+        return self.__entries[key]
+
+    def put(self, nodes_tuple, kind, value):
+        key = (nodes_tuple, kind)
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.__max_entries:
+            self.__entries.popitem(last=False)
+
+    def get_or_create(self, nodes_tuple, kind, factory):
+        value = self.get(nodes_tuple, kind)
+        if value is None:
+            value = factory()
+            self.put(nodes_tuple, kind, value)
+        return value
+
+    def flush(self):
+        pass
+
+    def clear(self):
+        self.__entries.clear()
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+# In-process cache of the behavior nets of the most recently seen variants, used when no variant cache is given
+behavior_net_lru = MemoryVariantCache(max_entries=1024)
+
+
+def get_behavior_net(trace, cache=None):
+    """
+    Returns the behavior net of an uncertain trace, reading it from the cache if present.
+    Without a cache, behavior nets are reused from behavior_net_lru, an in-process cache of the most recent variants, so the returned net can be
+    shared with other traces of the same variant and must not be modified.
+    Behavior graphs passed in place of a trace have no variant key, and their behavior net is always built.
+
+    :param trace: An uncertain trace, or its behavior graph
+    :type trace:
+    :param cache: A variant cache (None uses behavior_net_lru)
+    :type cache:
+    :return: The behavior net of the trace
+    :rtype:
+    """
+
+    if is_behavior_graph(trace):
+        return BehaviorNet(trace)
+    if cache is None:
+        cache = behavior_net_lru
+    nodes_tuple = create_nodes_tuples(trace)
+    return cache.get_or_create(nodes_tuple, BEHAVIOR_NET, lambda: BehaviorNet(BehaviorGraph(nodes_tuples=nodes_tuple)))
+
+
+def get_realization_count(trace, cache=None):
+    """
+    Returns the number of realizations of an uncertain trace, reading it from the cache if present.
+
+    :param trace: An uncertain trace, or its behavior graph
+    :type trace:
+    :param cache: A variant cache (None disables caching)
+    :type cache:
+    :return: The number of realizations of the trace
+    :rtype: int
+    """
+
+    if cache is None or is_behavior_graph(trace):
+        return realization_count(as_behavior_graph(trace))
+    nodes_tuple = create_nodes_tuples(trace)
+    return cache.get_or_create(nodes_tuple, REALIZATION_COUNT, lambda: realization_count(BehaviorGraph(nodes_tuples=nodes_tuple)))
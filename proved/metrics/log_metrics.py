@@ -0,0 +1,112 @@
+import math
+
+import numpy as np
+
+import proved.xes_keys as xes_keys
+from proved.artifacts.behavior_graph.utils import index_behavior_graph, realization_count, realization_count_upper_bound
+from proved.artifacts.uncertain_log.utils import log_variants
+
+# Columns of the table of log_metrics, in order
+METRICS_COLUMNS = ('multiplicity', 'n_events', 'width', 'depth', 'uncertain_activities', 'uncertain_timestamps', 'indeterminate_events', 'min_length', 'max_length',
+                   'realization_count', 'log10_realization_count', 'realization_count_exact')
+
+
+def nodes_tuple_width(nodes_tuple):
+    """
+    Returns the width of the behavior graph of a variant, that is the largest number of pairwise concurrent events, as the largest number of timestamp
+    intervals open at the same time in a sweep over the sorted nodes tuple.
+
+    :param nodes_tuple: the nodes and timestamp types of a trace sorted by timestamp, as returned by create_nodes_tuples
+    :return: the width of the behavior graph
+    """
+
+    width = 0
+    open_intervals = 0
+    for _, timestamp_type in nodes_tuple:
+        if timestamp_type is False:
+            open_intervals += 1
+            width = max(width, open_intervals)
+        else:
+            open_intervals -= 1
+    return width
+
+
+def behavior_graph_depth(behavior_graph):
+    """
+    Returns the depth of a behavior graph, that is the number of nodes in its longest chain.
+
+    :param behavior_graph: the behavior graph (either a BehaviorGraph or a CompactBehaviorGraph)
+    :return: the depth of the behavior graph
+    """
+
+    successors = index_behavior_graph(behavior_graph)[1]
+    chain_lengths = [1] * len(successors)
+    for i, node_successors in enumerate(successors):
+        for j in node_successors:
+            chain_lengths[j] = max(chain_lengths[j], chain_lengths[i] + 1)
+    return max(chain_lengths, default=0)
+
+
+def variant_metrics(nodes_tuple, behavior_graph, trace, exact_limit=10000, u_timestamp_min_key=xes_keys.DEFAULT_U_TIMESTAMP_MIN_KEY):
+    """
+    Returns the structural uncertainty metrics of a variant, as a tuple following METRICS_COLUMNS from n_events on.
+    The number of realizations is counted exactly if its upper bound does not exceed exact_limit, and estimated by the upper bound otherwise. It is returned
+    as an int, which can exceed the range of floats for wide variants, together with its base 10 logarithm.
+
+    :param nodes_tuple: the nodes tuple of the variant
+    :param behavior_graph: the behavior graph of the variant
+    :param trace: a trace of the variant, from which the uncertain timestamps are read
+    :param exact_limit: the largest upper bound for which the number of realizations is counted exactly
+    :param u_timestamp_min_key: the xes key for the minimum value of an uncertain timestamp
+    :return: the tuple of the metrics of the variant
+    """
+
+    nodes = [node for node, timestamp_type in nodes_tuple if timestamp_type is False]
+    n_events = len(nodes)
+    uncertain_activities = sum(1 for _, activity_labels in nodes if len(activity_labels - {None}) > 1)
+    indeterminate_events = sum(1 for _, activity_labels in nodes if None in activity_labels)
+    uncertain_timestamps = sum(1 for event in trace if u_timestamp_min_key in event)
+    count_upper_bound = realization_count_upper_bound(behavior_graph)
+    exact = count_upper_bound <= exact_limit
+    count = realization_count(behavior_graph) if exact else count_upper_bound
+    return (n_events, nodes_tuple_width(nodes_tuple), behavior_graph_depth(behavior_graph), uncertain_activities / n_events if n_events else 0.0,
+            uncertain_timestamps / n_events if n_events else 0.0, indeterminate_events / n_events if n_events else 0.0, n_events - indeterminate_events, n_events,
+            count, math.log10(count), exact)
+
+
+def log_metrics(log, exact_limit=10000, u_timestamp_min_key=xes_keys.DEFAULT_U_TIMESTAMP_MIN_KEY):
+    """
+    Returns the structural uncertainty metrics of a strongly uncertain log, computed once for each variant in a single pass over the variants of the log.
+    The metrics of the variants are returned as a columnar table, with one NumPy array for each of the METRICS_COLUMNS and one row per variant; the summary
+    aggregates them over the traces, weighting each variant by its multiplicity. Fractions of uncertain events are aggregated over the events of the log.
+    Numbers of realizations are stored as ints in an object array, as they can exceed the range of floats; their logarithms are stored as floats, and their
+    mean is infinite if it exceeds the range of floats.
+    If the log is an UncertainLog, its variants and behavior graphs are reused.
+
+    :param log: the strongly uncertain event log, or an UncertainLog
+    :param exact_limit: the largest upper bound for which the number of realizations of a variant is counted exactly
+    :param u_timestamp_min_key: the xes key for the minimum value of an uncertain timestamp
+    :return: a 2-tuple containing the table, as a dictionary from column names to arrays, and the summary, as a dictionary from metric names to values
+    """
+
+    rows = [(len(traces_list),) + variant_metrics(nodes_tuple, behavior_graph, traces_list[0], exact_limit, u_timestamp_min_key) for nodes_tuple, (behavior_graph, traces_list) in log_variants(log).items()]
+    dtypes = (np.int64, np.int64, np.int64, np.int64, np.float64, np.float64, np.float64, np.int64, np.int64, object, np.float64, bool)
+    table = {column: np.array([row[k] for row in rows], dtype=dtype) for k, (column, dtype) in enumerate(zip(METRICS_COLUMNS, dtypes))}
+
+    multiplicity = table['multiplicity']
+    n_traces = int(multiplicity.sum())
+    n_events = int(multiplicity @ table['n_events'])
+    summary = {'traces': n_traces, 'variants': len(rows), 'events': n_events}
+    for column in ('width', 'depth', 'min_length', 'max_length', 'log10_realization_count'):
+        summary['mean_' + column] = float(multiplicity @ table[column]) / n_traces if n_traces else 0.0
+    try:
+        summary['mean_realization_count'] = sum(int(m) * count for m, count in zip(multiplicity, table['realization_count'])) / n_traces if n_traces else 0.0
+    except OverflowError:
+        summary['mean_realization_count'] = math.inf
+    for column in ('width', 'depth', 'max_length'):
+        summary['max_' + column] = table[column].max().item() if rows else 0
+    summary['max_realization_count'] = max(table['realization_count'], default=0)
+    summary['min_min_length'] = table['min_length'].min().item() if rows else 0
+    for column in ('uncertain_activities', 'uncertain_timestamps', 'indeterminate_events'):
+        summary[column] = float((multiplicity * table['n_events']) @ table[column]) / n_events if n_events else 0.0
+    return table, summary
@@ -1,5 +1,5 @@
-from proved.artifacts.uncertain_log.utils import realization_set
+from proved.artifacts.variant_cache.variant_cache import get_realization_count
 
 
-def trace_variability(trace):
-    return 1/len(realization_set(trace))
+def trace_variability(trace, cache=None):
+    return 1/get_realization_count(trace, cache)
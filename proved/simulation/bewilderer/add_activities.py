@@ -1,13 +1,19 @@
 from random import random, sample
 
+import numpy as np
 from pm4py.objects.log.util.xes import DEFAULT_NAME_KEY
 
+from proved.simulation.bewilderer.log_index import LogIndex, numpy_generator
 from proved.xes_keys import DEFAULT_U_NAME_KEY
 
+# Number of events whose new labels are drawn at a time by the bulk path, bounding the size of the random keys matrix
+_CHUNK_SIZE = 1 << 16
+
 
 def add_uncertain_activities_to_log(p, log=None, log_map=None, max_labels_to_add=1, label_set=None, activity_key=DEFAULT_NAME_KEY, u_activity_key=DEFAULT_U_NAME_KEY):
     """
     Adds possible activity labels to events in a trace with a certain probability, up to a maximum.
+    Without a log map, or with a LogIndex as log map, events are drawn and altered in bulk on the index arrays.
 
     :param trace: the trace
     :param p: the probability of indeterminate events
@@ -20,27 +26,19 @@ def add_uncertain_activities_to_log(p, log=None, log_map=None, max_labels_to_add
 
     if p > 0.0:
 
-        build_label_set = False
-        if label_set is None:
-            build_label_set = True
-
         if log_map is None:
             if log is None:
                 raise ValueError('Parameters log and log_map cannot both be None.')
-            else:
-                log_map = {}
-                if build_label_set:
-                    label_set = set()
-                i = 0
-                for trace in log:
-                    for j in range(len(trace)):
-                        log_map[i] = (trace, j)
-                        if build_label_set:
-                            label_set.add(trace[j][activity_key])
-                        i += 1
-
+            log_map = LogIndex(log)
+        if isinstance(log_map, LogIndex):
+            if label_set is None:
+                label_set = {event[activity_key] for trace in log_map.traces for event in trace}
+            _add_uncertain_activities_bulk(p, log_map, max_labels_to_add, label_set, activity_key, u_activity_key)
+            return
+
+        # Legacy log maps, from global event indices to (trace, position) tuples
         to_alter = max(0, round(len(log_map) * p))
-        indices_to_alter = sample(frozenset(log_map), to_alter)
+        indices_to_alter = sample(list(log_map), to_alter)
         labels_to_add = min(max_labels_to_add, len(label_set) - 1)
         for i in indices_to_alter:
             trace, j = log_map[i]
@@ -48,7 +46,56 @@ def add_uncertain_activities_to_log(p, log=None, log_map=None, max_labels_to_add
             trace[j][u_activity_key]['children'] = {activity_label: 0 for activity_label in [trace[j][activity_key]] + sample(list(label_set - {trace[j][activity_key]}), labels_to_add)}
 
 
-def add_uncertain_activities_to_log_montecarlo(log, p, max_labels=0, label_set=None, activity_key=DEFAULT_NAME_KEY, u_activity_key=DEFAULT_U_NAME_KEY):
+def _add_uncertain_activities_bulk(p, log_index, max_labels_to_add, label_set, activity_key, u_activity_key):
+    """
+    Adds possible activity labels to a fraction p of the events of an indexed log, drawing the events and their new labels with NumPy.
+    The new labels of each event are the ones with the smallest random keys, excluding its own label.
+
+    :param p: the fraction of events to alter
+    :param log_index: the LogIndex of the log
+    :param max_labels_to_add: the maximum number of labels added to each event
+    :param label_set: the set of possible activity labels
+    :param activity_key: the xes key for the activity labels
+    :param u_activity_key: the xes key for uncertain activity labels
+    :return:
+    """
+
+    rng = numpy_generator()
+    labels = sorted(label_set, key=str)
+    label_ids = {activity_label: i for i, activity_label in enumerate(labels)}
+    to_alter = max(0, round(len(log_index) * p))
+    labels_to_add = max(0, min(max_labels_to_add, len(labels) - 1))
+
+    trace_indices, positions = log_index.locate(log_index.sample(to_alter, rng))
+    traces = log_index.traces
+    events = [traces[i][j] for i, j in zip(trace_indices.tolist(), positions.tolist())]
+    own_label_ids = np.fromiter((label_ids.get(event[activity_key], -1) for event in events), dtype=np.int64, count=len(events))
+
+    added_label_ids = _draw_added_label_ids(rng, len(labels), own_label_ids, labels_to_add)
+
+    for event, event_label_ids in zip(events, added_label_ids.tolist()):
+        _set_uncertain_activity(event, [labels[label_id] for label_id in event_label_ids], activity_key, u_activity_key)
+
+
+def _draw_added_label_ids(rng, n_labels, own_label_ids, labels_to_add):
+    # For each event, the ids of the labels with the smallest random keys, excluding its own label (-1 if not among the labels)
+    added_label_ids = np.empty((len(own_label_ids), labels_to_add), dtype=np.int64)
+    if labels_to_add > 0:
+        for start in range(0, len(own_label_ids), _CHUNK_SIZE):
+            end = min(start + _CHUNK_SIZE, len(own_label_ids))
+            keys = rng.random((end - start, n_labels))
+            rows = np.nonzero(own_label_ids[start:end] >= 0)[0]
+            keys[rows, own_label_ids[start:end][rows]] = 2.0
+            added_label_ids[start:end] = np.argpartition(keys, labels_to_add - 1, axis=1)[:, :labels_to_add]
+    return added_label_ids
+
+
+def _set_uncertain_activity(event, added_labels, activity_key, u_activity_key):
+    event[u_activity_key] = dict()
+    event[u_activity_key]['children'] = {activity_label: 0 for activity_label in [event[activity_key]] + added_labels}
+
+
+def add_uncertain_activities_to_log_montecarlo(log, p, max_labels=0, label_set=None, activity_key=DEFAULT_NAME_KEY, u_activity_key=DEFAULT_U_NAME_KEY, rng=None):
     """
     Adds possible activity labels to events in an event log with a certain probability, up to a maximum.
 
@@ -58,6 +105,7 @@ def add_uncertain_activities_to_log_montecarlo(log, p, max_labels=0, label_set=N
     :param max_labels: the maximum number of uncertain activity labels (unbounded if 0)
     :param activity_key: the xes key for the activity labels
     :param u_activity_key: the xes key for uncertain activity labels
+    :param rng: a random.Random instance (the global random state if None)
     :return:
     """
 
@@ -68,10 +116,10 @@ def add_uncertain_activities_to_log_montecarlo(log, p, max_labels=0, label_set=N
                 for event in trace:
                     label_set.add(event[activity_key])
         for trace in log:
-            add_uncertain_activities_to_trace_montecarlo(trace, p, label_set, max_labels, activity_key, u_activity_key)
+            add_uncertain_activities_to_trace_montecarlo(trace, p, max_labels, label_set, activity_key, u_activity_key, rng)
 
 
-def add_uncertain_activities_to_trace_montecarlo(trace, p, max_labels=0, label_set=None, activity_key=DEFAULT_NAME_KEY, u_activity_key=DEFAULT_U_NAME_KEY):
+def add_uncertain_activities_to_trace_montecarlo(trace, p, max_labels=0, label_set=None, activity_key=DEFAULT_NAME_KEY, u_activity_key=DEFAULT_U_NAME_KEY, rng=None):
     """
     Adds possible activity labels to events in a trace with a certain probability, up to a maximum.
 
@@ -81,9 +129,12 @@ def add_uncertain_activities_to_trace_montecarlo(trace, p, max_labels=0, label_s
     :param max_labels: the maximum number of uncertain activity labels (unbounded if 0)
     :param activity_key: the xes key for the activity labels
     :param u_activity_key: the xes key for uncertain activity labels
+    :param rng: a random.Random instance (the global random state if None)
     :return:
     """
 
+    draw = random if rng is None else rng.random
+    choose = sample if rng is None else rng.sample
     if p > 0.0:
         if label_set is None:
             label_set = set()
@@ -96,11 +147,11 @@ def add_uncertain_activities_to_trace_montecarlo(trace, p, max_labels=0, label_s
                     max_labels = len(label_set) - 1
                 else:
                     max_labels = len(label_set) - len(event[u_activity_key]['children'])
-            while random() < p and to_add < max_labels:
+            while draw() < p and to_add < max_labels:
                 to_add += 1
             if to_add > 0:
                 if u_activity_key not in event:
                     event[u_activity_key] = dict()
-                    event[u_activity_key]['children'] = {activity_label: 0 for activity_label in [event[activity_key]] + sample(label_set - {event[activity_key]}, to_add)}
+                    event[u_activity_key]['children'] = {activity_label: 0 for activity_label in [event[activity_key]] + choose(sorted(label_set - {event[activity_key]}, key=str), to_add)}
                 else:
-                    event[u_activity_key]['children'].update({activity_label: 0 for activity_label in [event[activity_key]] + sample(label_set - {event[activity_key]}, to_add)})
+                    event[u_activity_key]['children'].update({activity_label: 0 for activity_label in [event[activity_key]] + choose(sorted(label_set - {event[activity_key]}, key=str), to_add)})
@@ -1,11 +1,13 @@
 from random import random, sample
 
+from proved.simulation.bewilderer.log_index import LogIndex, numpy_generator
 from proved.xes_keys import DEFAULT_U_MISSING_KEY
 
 
 def add_indeterminate_events_to_log(p, log=None, log_map=None, u_missing_key=DEFAULT_U_MISSING_KEY):
     """
     Turns events in an trace into indeterminate events with a certain probability.
+    Without a log map, or with a LogIndex as log map, events are drawn and altered in bulk on the index arrays.
 
     :param trace: the trace
     :param p: the probability of indeterminate events
@@ -18,47 +20,51 @@ def add_indeterminate_events_to_log(p, log=None, log_map=None, u_missing_key=DEF
         if log_map is None:
             if log is None:
                 raise ValueError('Parameters log and log_map cannot both be None.')
-            else:
-                log_map = {}
-                i = 0
-                for trace in log:
-                    for j in range(len(trace)):
-                        log_map[i] = (trace, j)
-                        i += 1
+            log_map = LogIndex(log)
+        if isinstance(log_map, LogIndex):
+            trace_indices, positions = log_map.locate(log_map.sample(max(0, round(len(log_map) * p)), numpy_generator()))
+            traces = log_map.traces
+            for i, j in zip(trace_indices.tolist(), positions.tolist()):
+                traces[i][j][u_missing_key] = 1
+            return
 
+        # Legacy log maps, from global event indices to (trace, position) tuples
         to_add = max(0, round(len(log_map) * p))
-        indices_to_add = sample(frozenset(log_map), to_add)
+        indices_to_add = sample(list(log_map), to_add)
         for i in indices_to_add:
             trace, j = log_map[i]
             trace[j][u_missing_key] = 1
 
 
-def add_indeterminate_events_to_log_montecarlo(log, p, u_missing_key=DEFAULT_U_MISSING_KEY):
+def add_indeterminate_events_to_log_montecarlo(log, p, u_missing_key=DEFAULT_U_MISSING_KEY, rng=None):
     """
     Turns events in an event log into indeterminate events with a certain probability.
 
     :param log: the event log
     :param p: the probability of indeterminate events
     :param u_missing_key: the xes key for indeterminate events
+    :param rng: a random.Random instance (the global random state if None)
     :return:
     """
 
     if p > 0.0:
         for trace in log:
-            add_indeterminate_events_to_trace_montecarlo(trace, p, u_missing_key)
+            add_indeterminate_events_to_trace_montecarlo(trace, p, u_missing_key, rng)
 
 
-def add_indeterminate_events_to_trace_montecarlo(trace, p, u_missing_key=DEFAULT_U_MISSING_KEY):
+def add_indeterminate_events_to_trace_montecarlo(trace, p, u_missing_key=DEFAULT_U_MISSING_KEY, rng=None):
     """
     Turns events in an trace into indeterminate events with a certain probability.
 
     :param trace: the trace
     :param p: the probability of indeterminate events
     :param u_missing_key: the xes key for indeterminate events
+    :param rng: a random.Random instance (the global random state if None)
     :return:
     """
 
+    draw = random if rng is None else rng.random
     if p > 0.0:
         for event in trace:
-            if random() < p:
+            if draw() < p:
                 event[u_missing_key] = 1
@@ -4,6 +4,7 @@ from datetime import timedelta
 
 from pm4py.objects.log.util.xes import DEFAULT_TIMESTAMP_KEY
 
+from proved.simulation.bewilderer.log_index import LogIndex, numpy_generator
 from proved.xes_keys import DEFAULT_U_TIMESTAMP_MIN_KEY, DEFAULT_U_TIMESTAMP_MAX_KEY
 
 
@@ -26,16 +27,14 @@ def add_uncertain_timestamp_to_log(p, log=None, log_map=None, timestamp_key=DEFA
         if log_map is None:
             if log is None:
                 raise ValueError('Parameters log and log_map cannot both be None.')
-            else:
-                log_map = {}
-                i = 0
-                for trace in log:
-                    for j in range(len(trace)):
-                        log_map[i] = (trace, j)
-                        i += 1
+            log_map = LogIndex(log)
+        if isinstance(log_map, LogIndex):
+            _add_uncertain_timestamp_bulk(p, log_map, timestamp_key, u_timestamp_min_key, u_timestamp_max_key)
+            return
 
+        # Legacy log maps, from global event indices to (trace, position) tuples
         to_alter = max(0, round(len(log_map) * p))
-        indices_to_alter = sample(frozenset(log_map), to_alter)
+        indices_to_alter = sample(list(log_map), to_alter)
         for i in indices_to_alter:
             trace, j = log_map[i]
             # trace[j][u_timestamp_min_key] = copy(min(trace[j][timestamp_key], trace[max(j - 1, 0)][timestamp_key])) - timedelta(milliseconds=100)
@@ -50,7 +49,41 @@ def add_uncertain_timestamp_to_log(p, log=None, log_map=None, timestamp_key=DEFA
                 trace[j][u_timestamp_max_key] = copy(trace[j][timestamp_key]) + timedelta(milliseconds=100)
 
 
-def add_uncertain_timestamp_to_log_montecarlo(log, p_left, p_right, max_overlap_left=0, max_overlap_right=0, timestamp_key=DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=DEFAULT_U_TIMESTAMP_MAX_KEY):
+def _add_uncertain_timestamp_bulk(p, log_index, timestamp_key, u_timestamp_min_key, u_timestamp_max_key):
+    """
+    Makes uncertain the timestamps of a fraction p of the events of an indexed log, drawing the events and the direction of their overlap with NumPy.
+
+    :param p: the fraction of events to alter
+    :param log_index: the LogIndex of the log
+    :param timestamp_key: the xes key for the timestamp
+    :param u_timestamp_min_key: the xes key for the minimum value of an uncertain timestamp
+    :param u_timestamp_max_key: the xes key for the maximum value of an uncertain timestamp
+    :return:
+    """
+
+    rng = numpy_generator()
+    trace_indices, positions = log_index.locate(log_index.sample(max(0, round(len(log_index) * p)), rng))
+    overlap_next = _draw_overlap_next(rng, positions, log_index.trace_lengths(trace_indices))
+    traces = log_index.traces
+    for i, j, to_next in zip(trace_indices.tolist(), positions.tolist(), overlap_next.tolist()):
+        _set_uncertain_timestamp(traces[i], j, to_next, timestamp_key, u_timestamp_min_key, u_timestamp_max_key)
+
+
+def _draw_overlap_next(rng, positions, lengths):
+    # Same rule of add_uncertain_timestamp_to_log: first events overlap the following one, last events the previous one, the others either at random
+    return (positions == 0) | ((positions != lengths - 1) & (rng.random(len(positions)) < .5))
+
+
+def _set_uncertain_timestamp(trace, j, to_next, timestamp_key, u_timestamp_min_key, u_timestamp_max_key):
+    if to_next:
+        trace[j][u_timestamp_min_key] = copy(trace[j][timestamp_key]) - timedelta(milliseconds=100)
+        trace[j][u_timestamp_max_key] = copy(max(trace[j][timestamp_key], trace[min(j + 1, len(trace) - 1)][timestamp_key])) + timedelta(milliseconds=100)
+    else:
+        trace[j][u_timestamp_min_key] = copy(min(trace[j][timestamp_key], trace[max(j - 1, 0)][timestamp_key])) - timedelta(milliseconds=100)
+        trace[j][u_timestamp_max_key] = copy(trace[j][timestamp_key]) + timedelta(milliseconds=100)
+
+
+def add_uncertain_timestamp_to_log_montecarlo(log, p_left, p_right, max_overlap_left=0, max_overlap_right=0, timestamp_key=DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=DEFAULT_U_TIMESTAMP_MAX_KEY, rng=None):
     """
     Adds possible activity labels to events in an event log with a certain probability, up to a maximum.
 
@@ -62,15 +95,16 @@ def add_uncertain_timestamp_to_log_montecarlo(log, p_left, p_right, max_overlap_
     :param timestamp_key: the xes key for the timestamp
     :param u_timestamp_min_key: the xes key for the minimum value of an uncertain timestamp
     :param u_timestamp_max_key: the xes key for the maximum value of an uncertain timestamp
+    :param rng: a random.Random instance (the global random state if None)
     :return:
     """
 
     if p_left > 0.0 or p_right > 0.0:
         for trace in log:
-            add_uncertain_timestamp_to_trace_montecarlo(trace, p_left, p_right, max_overlap_left, max_overlap_right, timestamp_key, u_timestamp_min_key, u_timestamp_max_key)
+            add_uncertain_timestamp_to_trace_montecarlo(trace, p_left, p_right, max_overlap_left, max_overlap_right, timestamp_key, u_timestamp_min_key, u_timestamp_max_key, rng)
 
 
-def add_uncertain_timestamp_to_trace_montecarlo(trace, p_left, p_right, max_overlap_left=0, max_overlap_right=0, timestamp_key=DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=DEFAULT_U_TIMESTAMP_MAX_KEY):
+def add_uncertain_timestamp_to_trace_montecarlo(trace, p_left, p_right, max_overlap_left=0, max_overlap_right=0, timestamp_key=DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=DEFAULT_U_TIMESTAMP_MAX_KEY, rng=None):
     """
     Adds possible activity labels to events in a trace with a certain probability, up to a maximum.
 
@@ -82,16 +116,18 @@ def add_uncertain_timestamp_to_trace_montecarlo(trace, p_left, p_right, max_over
     :param timestamp_key: the xes key for the timestamp
     :param u_timestamp_min_key: the xes key for the minimum value of an uncertain timestamp
     :param u_timestamp_max_key: the xes key for the maximum value of an uncertain timestamp
+    :param rng: a random.Random instance (the global random state if None)
     :return:
     """
 
+    draw = random if rng is None else rng.random
     if p_left > 0.0 or p_right > 0.0:
         for i in range(len(trace)):
             steps_left = 0
             steps_right = 0
-            while random() < p_left and steps_left < min(max_overlap_left, i):
+            while draw() < p_left and steps_left < min(max_overlap_left, i):
                 steps_left += 1
-            while random() < p_right and steps_right < min(max_overlap_right, len(trace) - i - 1):
+            while draw() < p_right and steps_right < min(max_overlap_right, len(trace) - i - 1):
                 steps_right += 1
             # (Partially) supports events that already have uncertainty on timestamps
             # This might cause problems on events for which 'u_timestamp_min_key' <= 'timestamp_key' <= 'u_timestamp_max_key'
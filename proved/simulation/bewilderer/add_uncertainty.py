@@ -1,12 +1,195 @@
+from concurrent.futures import ProcessPoolExecutor
+from random import Random, random, sample
+
+import numpy as np
 from pm4py.objects.log.util.xes import DEFAULT_NAME_KEY, DEFAULT_TIMESTAMP_KEY
 
 from proved.xes_keys import DEFAULT_U_NAME_KEY, DEFAULT_U_TIMESTAMP_MIN_KEY, DEFAULT_U_TIMESTAMP_MAX_KEY, DEFAULT_U_MISSING_KEY
-from proved.simulation.bewilderer.add_activities import add_uncertain_activities_to_log
-from proved.simulation.bewilderer.add_timestamps import add_uncertain_timestamp_to_log
-from proved.simulation.bewilderer.add_indeterminate_events import add_indeterminate_events_to_log
+from proved.simulation.bewilderer.add_activities import add_uncertain_activities_to_log, add_uncertain_activities_to_trace_montecarlo, _draw_added_label_ids, _set_uncertain_activity
+from proved.simulation.bewilderer.add_timestamps import add_uncertain_timestamp_to_log, add_uncertain_timestamp_to_trace_montecarlo, _draw_overlap_next, _set_uncertain_timestamp
+from proved.simulation.bewilderer.add_indeterminate_events import add_indeterminate_events_to_log, add_indeterminate_events_to_trace_montecarlo
+from proved.simulation.bewilderer.log_index import LogIndex, numpy_generator
+
+# Kinds of alteration, in the order in which they are applied to an event
+_ACTIVITY, _TIMESTAMP, _INDETERMINATE = 0, 1, 2
 
 
 def add_uncertainty(p_a=0.0, p_t=0.0, p_i=0.0, log=None, log_map=None, max_labels_to_add=1, label_set=None, activity_key=DEFAULT_NAME_KEY, u_activity_key=DEFAULT_U_NAME_KEY, timestamp_key=DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=DEFAULT_U_TIMESTAMP_MAX_KEY, u_missing_key=DEFAULT_U_MISSING_KEY):
-    add_uncertain_activities_to_log(p_a, log, log_map=log_map, max_labels_to_add=max_labels_to_add, label_set=label_set, activity_key=activity_key, u_activity_key=u_activity_key)
-    add_uncertain_timestamp_to_log(p_t, log, log_map=log_map, timestamp_key=timestamp_key, u_timestamp_min_key=u_timestamp_min_key, u_timestamp_max_key=u_timestamp_max_key)
-    add_indeterminate_events_to_log(p_i, log, log_map=log_map, u_missing_key=u_missing_key)
+    """
+    Adds uncertain activities, uncertain timestamps and indeterminate events to fractions p_a, p_t and p_i of the events of an event log.
+    Without a log map, or with a LogIndex as log map, the log is indexed once, the three sets of events are drawn up front and all the alterations are
+    applied in a single traversal of the events, in log order.
+
+    :param p_a: the fraction of events with uncertain activities
+    :param p_t: the fraction of events with uncertain timestamps
+    :param p_i: the fraction of indeterminate events
+    :param log: the event log, or an UncertaintyOverlay over it to record the alterations without modifying the log
+    :param log_map: a LogIndex of the log, or a legacy dictionary from global event indices to (trace, position) tuples
+    :param max_labels_to_add: the maximum number of labels added to each event with uncertain activities
+    :param label_set: the set of possible activity labels (defaults to the labels in the log)
+    :param activity_key: the xes key for the activity labels
+    :param u_activity_key: the xes key for uncertain activity labels
+    :param timestamp_key: the xes key for the timestamp
+    :param u_timestamp_min_key: the xes key for the minimum value of an uncertain timestamp
+    :param u_timestamp_max_key: the xes key for the maximum value of an uncertain timestamp
+    :param u_missing_key: the xes key for indeterminate events
+    :return:
+    """
+
+    if log_map is not None and not isinstance(log_map, LogIndex):
+        # Legacy log maps are handled by the separate functions
+        add_uncertain_activities_to_log(p_a, log, log_map=log_map, max_labels_to_add=max_labels_to_add, label_set=label_set, activity_key=activity_key, u_activity_key=u_activity_key)
+        add_uncertain_timestamp_to_log(p_t, log, log_map=log_map, timestamp_key=timestamp_key, u_timestamp_min_key=u_timestamp_min_key, u_timestamp_max_key=u_timestamp_max_key)
+        add_indeterminate_events_to_log(p_i, log, log_map=log_map, u_missing_key=u_missing_key)
+        return
+
+    if p_a <= 0.0 and p_t <= 0.0 and p_i <= 0.0:
+        return
+    if log_map is None:
+        if log is None:
+            raise ValueError('Parameters log and log_map cannot both be None.')
+        log_map = LogIndex(log)
+
+    rng = numpy_generator()
+    traces = log_map.traces
+    samples = [log_map.sample(max(0, round(len(log_map) * p)), rng) if p > 0.0 else np.empty(0, dtype=np.int64) for p in (p_a, p_t, p_i)]
+
+    # New labels of the events with uncertain activities
+    labels = []
+    added_label_ids = np.empty((0, 0), dtype=np.int64)
+    if len(samples[_ACTIVITY]) > 0:
+        if label_set is None:
+            label_set = {event[activity_key] for trace in traces for event in trace}
+        labels = sorted(label_set, key=str)
+        label_ids = {activity_label: i for i, activity_label in enumerate(labels)}
+        trace_indices, positions = log_map.locate(samples[_ACTIVITY])
+        own_label_ids = np.fromiter((label_ids.get(traces[i][j][activity_key], -1) for i, j in zip(trace_indices.tolist(), positions.tolist())), dtype=np.int64, count=len(positions))
+        added_label_ids = _draw_added_label_ids(rng, len(labels), own_label_ids, max(0, min(max_labels_to_add, len(labels) - 1)))
+
+    # Directions of the overlaps of the events with uncertain timestamps
+    trace_indices, positions = log_map.locate(samples[_TIMESTAMP])
+    overlap_next = _draw_overlap_next(rng, positions, log_map.trace_lengths(trace_indices))
+
+    # A single pass over all the altered events, sorted by global index; each alteration knows its kind and its rank within the sample of its kind
+    indices = np.concatenate(samples)
+    kinds = np.repeat(np.arange(3), [len(sample_indices) for sample_indices in samples])
+    ranks = np.concatenate([np.arange(len(sample_indices)) for sample_indices in samples])
+    order = np.argsort(indices, kind='stable')
+    trace_indices, positions = log_map.locate(indices[order])
+    added_label_ids = added_label_ids.tolist()
+    overlap_next = overlap_next.tolist()
+    for i, j, kind, rank in zip(trace_indices.tolist(), positions.tolist(), kinds[order].tolist(), ranks[order].tolist()):
+        if kind == _ACTIVITY:
+            _set_uncertain_activity(traces[i][j], [labels[label_id] for label_id in added_label_ids[rank]], activity_key, u_activity_key)
+        elif kind == _TIMESTAMP:
+            _set_uncertain_timestamp(traces[i], j, overlap_next[rank], timestamp_key, u_timestamp_min_key, u_timestamp_max_key)
+        else:
+            traces[i][j][u_missing_key] = 1
+
+
+def add_uncertainty_stream(traces, p_a=0.0, p_t=0.0, p_i=0.0, max_labels_to_add=1, label_set=None, activity_key=DEFAULT_NAME_KEY, u_activity_key=DEFAULT_U_NAME_KEY, timestamp_key=DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=DEFAULT_U_TIMESTAMP_MAX_KEY, u_missing_key=DEFAULT_U_MISSING_KEY):
+    """
+    Adds uncertain activities, uncertain timestamps and indeterminate events to the traces of an iterable, yielding each trace once it is altered, so that
+    the whole log never needs to be held in memory.
+    Since the number of events is not known in advance, each event is altered independently with probability p_a, p_t and p_i, rather than altering exact
+    fractions of the events as add_uncertainty does; the alterations applied to each event are the same.
+
+    :param traces: an iterable of traces, e.g. a generator
+    :param p_a: the probability of uncertain activities
+    :param p_t: the probability of uncertain timestamps
+    :param p_i: the probability of indeterminate events
+    :param max_labels_to_add: the maximum number of labels added to each event with uncertain activities
+    :param label_set: the set of possible activity labels, required if p_a > 0
+    :param activity_key: the xes key for the activity labels
+    :param u_activity_key: the xes key for uncertain activity labels
+    :param timestamp_key: the xes key for the timestamp
+    :param u_timestamp_min_key: the xes key for the minimum value of an uncertain timestamp
+    :param u_timestamp_max_key: the xes key for the maximum value of an uncertain timestamp
+    :param u_missing_key: the xes key for indeterminate events
+    :return: a generator of the altered traces
+    """
+
+    if p_a > 0.0 and label_set is None:
+        raise ValueError('Parameter label_set is required to add uncertain activities to a stream of traces.')
+    labels = sorted(label_set, key=str) if label_set is not None else []
+    labels_to_add = max(0, min(max_labels_to_add, len(labels) - 1))
+
+    for trace in traces:
+        for j, event in enumerate(trace):
+            if p_a > 0.0 and random() < p_a:
+                other_labels = [activity_label for activity_label in labels if activity_label != event[activity_key]]
+                _set_uncertain_activity(event, sample(other_labels, min(labels_to_add, len(other_labels))), activity_key, u_activity_key)
+            if p_t > 0.0 and random() < p_t:
+                _set_uncertain_timestamp(trace, j, j == 0 or (j != len(trace) - 1 and random() < .5), timestamp_key, u_timestamp_min_key, u_timestamp_max_key)
+            if p_i > 0.0 and random() < p_i:
+                event[u_missing_key] = 1
+        yield trace
+
+
+def _bewilder_shard(shard):
+    """
+    Applies the Monte Carlo bewilderer functions to a shard of traces, drawing from the random stream of the shard.
+    Executed by the worker processes when bewildering a log in parallel.
+
+    :param shard: a 3-tuple containing the list of traces, the seed of the random stream of the shard and the dictionary of the parameters
+    :return: the list of the altered traces
+    """
+
+    traces, seed, parameters = shard
+    rng = Random(seed)
+    for trace in traces:
+        add_uncertain_activities_to_trace_montecarlo(trace, parameters['p_a'], parameters['max_labels'], parameters['label_set'], parameters['activity_key'], parameters['u_activity_key'], rng)
+        add_uncertain_timestamp_to_trace_montecarlo(trace, parameters['p_left'], parameters['p_right'], parameters['max_overlap_left'], parameters['max_overlap_right'], parameters['timestamp_key'], parameters['u_timestamp_min_key'], parameters['u_timestamp_max_key'], rng)
+        add_indeterminate_events_to_trace_montecarlo(trace, parameters['p_i'], parameters['u_missing_key'], rng)
+    return traces
+
+
+def add_uncertainty_montecarlo_sharded(log, seed, p_a=0.0, p_left=0.0, p_right=0.0, p_i=0.0, max_labels=0, max_overlap_left=0, max_overlap_right=0, label_set=None, n_jobs=1, shard_size=1000, activity_key=DEFAULT_NAME_KEY, u_activity_key=DEFAULT_U_NAME_KEY, timestamp_key=DEFAULT_TIMESTAMP_KEY, u_timestamp_min_key=DEFAULT_U_TIMESTAMP_MIN_KEY, u_timestamp_max_key=DEFAULT_U_TIMESTAMP_MAX_KEY, u_missing_key=DEFAULT_U_MISSING_KEY):
+    """
+    Adds uncertain activities, uncertain timestamps and indeterminate events to an event log with the Monte Carlo bewilderer functions, on shards of
+    shard_size consecutive traces processed by a pool of worker processes.
+    Each shard draws from its own random stream, seeded by a child of a NumPy SeedSequence of the master seed: the altered log only depends on the seed and
+    on the shard size, and is identical for any number of worker processes.
+
+    :param log: the event log; with n_jobs different from 1, its traces are replaced by the altered copies sent back by the worker processes
+    :param seed: the master seed
+    :param p_a: the probability of uncertain activity labels
+    :param p_left: the probability of overlapping timestamps with previous events
+    :param p_right: the probability of overlapping timestamps with successive events
+    :param p_i: the probability of indeterminate events
+    :param max_labels: the maximum number of uncertain activity labels (unbounded if 0)
+    :param max_overlap_left: the maximum number of events that a timestamp can overlap
+    :param max_overlap_right: the maximum number of events that a timestamp can overlap
+    :param label_set: the set of possible activity labels (defaults to the labels in the log)
+    :param n_jobs: the number of worker processes (all the available processors if None)
+    :param shard_size: the number of traces in a shard
+    :param activity_key: the xes key for the activity labels
+    :param u_activity_key: the xes key for uncertain activity labels
+    :param timestamp_key: the xes key for the timestamp
+    :param u_timestamp_min_key: the xes key for the minimum value of an uncertain timestamp
+    :param u_timestamp_max_key: the xes key for the maximum value of an uncertain timestamp
+    :param u_missing_key: the xes key for indeterminate events
+    :return:
+    """
+
+    if shard_size < 1:
+        raise ValueError('Parameter shard_size must be positive.')
+    # The label set is computed on the whole log, so that it does not depend on the shards
+    if p_a > 0.0 and label_set is None:
+        label_set = {event[activity_key] for trace in log for event in trace}
+    parameters = {'p_a': p_a, 'p_left': p_left, 'p_right': p_right, 'p_i': p_i, 'max_labels': max_labels, 'max_overlap_left': max_overlap_left, 'max_overlap_right': max_overlap_right,
+                  'label_set': label_set, 'activity_key': activity_key, 'u_activity_key': u_activity_key, 'timestamp_key': timestamp_key, 'u_timestamp_min_key': u_timestamp_min_key,
+                  'u_timestamp_max_key': u_timestamp_max_key, 'u_missing_key': u_missing_key}
+
+    traces = list(log)
+    starts = range(0, len(traces), shard_size)
+    seeds = [int.from_bytes(child.generate_state(4).tobytes(), 'little') for child in np.random.SeedSequence(seed).spawn(len(starts))]
+    shards = [(traces[start:start + shard_size], shard_seed, parameters) for start, shard_seed in zip(starts, seeds)]
+    if n_jobs == 1:
+        for shard in shards:
+            _bewilder_shard(shard)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            for start, altered_traces in zip(starts, executor.map(_bewilder_shard, shards)):
+                for i, trace in enumerate(altered_traces):
+                    log[start + i] = trace
@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+
+
+class LogIndex(object):
+    """
+    Class representing an array-backed index of the events of an event log, as an alternative to the log_map dictionaries of the bewilderer.
+    Events are numbered in order across the whole log, and the global index of the first event of each trace is kept in a NumPy prefix-sum array,
+    so that event indices can be drawn and located in bulk instead of one dictionary entry at a time.
+    """
+
+    def __init__(self, log):
+        self.__traces = list(log)
+        lengths = np.fromiter((len(trace) for trace in self.__traces), dtype=np.int64, count=len(self.__traces))
+        self.__offsets = np.zeros(len(self.__traces) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.__offsets[1:])
+
+    def sample(self, k, rng):
+        """
+        Draws the global indices of k distinct events uniformly at random.
+
+        :param k: the number of events
+        :param rng: a NumPy random generator
+        :return: the array of the event indices
+        """
+
+        return rng.choice(len(self), size=k, replace=False)
+
+    def locate(self, indices):
+        """
+        Returns the traces and the positions in their trace of events given by their global indices.
+
+        :param indices: an array of event indices
+        :return: a 2-tuple containing the array of the trace indices and the array of the positions of the events
+        """
+
+        trace_indices = np.searchsorted(self.__offsets, indices, side='right') - 1
+        return trace_indices, indices - self.__offsets[trace_indices]
+
+    def trace_lengths(self, trace_indices):
+        return self.__offsets[trace_indices + 1] - self.__offsets[trace_indices]
+
+    def __get_traces(self):
+        return self.__traces
+
+    def __len__(self):
+        return int(self.__offsets[-1])
+
+    traces = property(__get_traces)
+
+
+def numpy_generator():
+    # A NumPy generator seeded from the random module, so that random.seed() makes the bulk functions of the bewilderer reproducible as well
+    return np.random.default_rng(random.getrandbits(64))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Random uncertain traces and logs for the tests."""
+
+
+import random
+from datetime import datetime, timedelta, timezone
+
+from pm4py.objects.log.log import EventLog, Trace, Event
+
+
+def random_uncertain_trace(rng, max_events=6, activity_labels='abc', p_timestamp=.3, p_activity=.2, p_missing=.1):
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    trace = Trace()
+    for _ in range(rng.randint(0, max_events)):
+        timestamp = start + timedelta(seconds=rng.randint(0, 5))
+        event = Event({'concept:name': rng.choice(activity_labels), 'time:timestamp': timestamp})
+        if rng.random() < p_timestamp:
+            event['u:time:timestamp_min'] = timestamp - timedelta(seconds=rng.randint(0, 2))
+            event['u:time:timestamp_max'] = timestamp + timedelta(seconds=rng.randint(0, 2))
+        if rng.random() < p_activity:
+            event['u:concept:name'] = {'value': None, 'children': {event['concept:name']: 0, rng.choice(activity_labels + 'd'): 0}}
+        if rng.random() < p_missing:
+            event['u:missing'] = 1
+        trace.append(event)
+    return trace
+
+
+def random_uncertain_log(n_traces, seed, **kwargs):
+    rng = random.Random(seed)
+    log = EventLog()
+    for _ in range(n_traces):
+        log.append(random_uncertain_trace(rng, **kwargs))
+    return log
+
+
+def random_reference_model(seed, activity_labels='abcde', n_traces=20, trace_length=4):
+    # Petri net discovered with the inductive miner from a log of certain traces
+    from pm4py.algo.discovery.inductive import algorithm as inductive_miner
+
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    log = EventLog()
+    for _ in range(n_traces):
+        log.append(Trace(Event({'concept:name': activity_label, 'time:timestamp': start + timedelta(seconds=i)}) for i, activity_label in enumerate(rng.sample(activity_labels, trace_length))))
+    return inductive_miner.apply(log)
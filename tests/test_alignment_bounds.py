@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the bounds for conformance of strongly uncertain logs."""
+
+
+import copy
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from pm4py.objects.log.log import EventLog, Trace, Event
+
+from pm4py.algo.conformance.alignments.petri_net.variants.state_equation_a_star import apply, apply_trace_net
+
+from proved.algorithms.conformance.alignments.alignment_bounds_su import alignment_approximation_su_trace, alignment_bounds_su_log, alignment_bounds_su_log_budgeted, alignment_bounds_su_log_parallel, alignment_bounds_su_trace, \
+    alignment_bounds_su_trace_budgeted, alignment_upper_bound_su_trace_bnb, alignment_upper_bound_su_trace_bruteforce, model_hash, PreparedModel
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph
+from proved.artifacts.behavior_net.behavior_net import BehaviorNet
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+from tests.random_logs import random_reference_model, random_uncertain_log
+from tests.test_realizations import _label_sequences, _realizations_bruteforce
+
+
+def _costs(bounds):
+    return bounds[0]['cost'], bounds[1]['cost'], bounds[2]
+
+
+class TestAlignmentBounds(unittest.TestCase):
+    """Bounds for conformance of traces and logs against a reference Petri net."""
+
+    def setUp(self):
+        self.petri_net, self.initial_marking, self.final_marking = random_reference_model(0)
+        self.log = random_uncertain_log(15, 4, max_events=4, activity_labels='abcde')
+
+    def test_000_log_variants(self):
+        # Traces of the same variant share the bounds of the variant, equal to the bounds of each trace
+        log = EventLog(list(self.log) + [self.log[i] for i in range(0, len(self.log), 3)])
+        bounds_list = alignment_bounds_su_log(log, self.petri_net, self.initial_marking, self.final_marking)
+        self.assertEqual(len(bounds_list), len(log))
+        for trace, bounds in zip(log, bounds_list):
+            self.assertEqual(_costs(bounds), _costs(alignment_bounds_su_trace(trace, self.petri_net, self.initial_marking, self.final_marking)))
+        for i in range(0, len(self.log), 3):
+            self.assertIs(bounds_list[len(self.log) + i // 3], bounds_list[i])
+        uncertain_log = UncertainLog(log)
+        self.assertEqual([_costs(bounds) for bounds in alignment_bounds_su_log(uncertain_log, self.petri_net, self.initial_marking, self.final_marking)], [_costs(bounds) for bounds in bounds_list])
+
+    def test_001_log_parallel(self):
+        sequential = alignment_bounds_su_log(self.log, self.petri_net, self.initial_marking, self.final_marking)
+        parallel = alignment_bounds_su_log_parallel(self.log, self.petri_net, self.initial_marking, self.final_marking, n_jobs=2, chunk_size=4)
+        self.assertEqual([_costs(bounds) for bounds in parallel], [_costs(bounds) for bounds in sequential])
+
+    def test_002_checkpoint(self):
+        handle, checkpoint_path = tempfile.mkstemp(suffix='.pickle')
+        os.close(handle)
+        try:
+            first = alignment_bounds_su_log_parallel(self.log, self.petri_net, self.initial_marking, self.final_marking, n_jobs=2, checkpoint_path=checkpoint_path)
+            resumed = alignment_bounds_su_log_parallel(self.log, self.petri_net, self.initial_marking, self.final_marking, n_jobs=2, checkpoint_path=checkpoint_path)
+            self.assertEqual([_costs(bounds) for bounds in resumed], [_costs(bounds) for bounds in first])
+
+            # Results stored for another model are not reused
+            other_model = random_reference_model(1)
+            other = alignment_bounds_su_log_parallel(self.log, *other_model, n_jobs=2, checkpoint_path=checkpoint_path)
+            self.assertEqual([_costs(bounds) for bounds in other], [_costs(alignment_bounds_su_trace(trace, *other_model)) for trace in self.log])
+        finally:
+            os.remove(checkpoint_path)
+
+    def test_003_model_hash(self):
+        key = model_hash(self.petri_net, self.initial_marking, self.final_marking)
+        self.assertEqual(model_hash(*copy.deepcopy((self.petri_net, self.initial_marking, self.final_marking))), key)
+        self.assertNotEqual(model_hash(*random_reference_model(1)), key)
+        self.assertNotEqual(model_hash(self.petri_net, self.initial_marking, self.final_marking, {'ret_tuple_as_trans_desc': True}), key)
+
+    def test_004_upper_bound_bnb(self):
+        for trace in self.log:
+            costs = [apply(Trace(Event({'concept:name': activity_label}) for activity_label in realization), self.petri_net, self.initial_marking, self.final_marking)['cost'] for realization in _label_sequences(_realizations_bruteforce(trace))]
+            behavior_graph = BehaviorGraph(trace)
+            upper_bound, n_realizations = alignment_upper_bound_su_trace_bnb(behavior_graph, self.petri_net, self.initial_marking, self.final_marking)
+            self.assertEqual(upper_bound['cost'], max(costs))
+            self.assertEqual(n_realizations, len(costs))
+            behavior_net = BehaviorNet(behavior_graph)
+            bruteforce_upper_bound, bruteforce_n_realizations = alignment_upper_bound_su_trace_bruteforce(behavior_net, behavior_net.initial_marking, behavior_net.final_marking, self.petri_net, self.initial_marking, self.final_marking)
+            self.assertEqual((bruteforce_upper_bound['cost'], bruteforce_n_realizations), (upper_bound['cost'], n_realizations))
+
+    def test_005_budgeted_unlimited(self):
+        progress = []
+        budgeted = alignment_bounds_su_log_budgeted(self.log, self.petri_net, self.initial_marking, self.final_marking, callback=lambda *args: progress.append(args))
+        for trace, bounds in zip(self.log, budgeted):
+            self.assertTrue(bounds[3])
+            self.assertEqual(_costs(bounds), _costs(alignment_bounds_su_trace(trace, self.petri_net, self.initial_marking, self.final_marking)))
+        self.assertTrue(progress)
+
+    def test_006_budgeted_limits(self):
+        # Twenty concurrent events have about 20! realizations and 2^20 down-sets: neither the search nor the count can be completed in time
+        start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        trace = Trace(Event({'concept:name': 'abcde'[i % 5], 'time:timestamp': start, 'u:time:timestamp_min': start, 'u:time:timestamp_max': start + timedelta(seconds=10)}) for i in range(20))
+        start_time = time.time()
+        lower_bound, upper_bound, n_realizations, exact = alignment_bounds_su_trace_budgeted(trace, self.petri_net, self.initial_marking, self.final_marking, max_time=.5)
+        self.assertLess(time.time() - start_time, 5)
+        self.assertFalse(exact)
+        self.assertIsNone(n_realizations)
+        self.assertLessEqual(lower_bound['cost'], upper_bound['cost'])
+
+    def test_007_budgeted_realizations(self):
+        for trace in self.log:
+            lower_bound, upper_bound, n_realizations = alignment_bounds_su_trace(trace, self.petri_net, self.initial_marking, self.final_marking)
+            budgeted = alignment_bounds_su_trace_budgeted(trace, self.petri_net, self.initial_marking, self.final_marking, max_realizations=1)
+            self.assertEqual(budgeted[2], n_realizations)
+            # The first realization reached can only underestimate the upper bound
+            self.assertLessEqual(budgeted[1]['cost'], upper_bound['cost'])
+            self.assertEqual(budgeted[0]['cost'], lower_bound['cost'])
+
+    def test_008_prepared_model(self):
+        prepared_model = PreparedModel(self.petri_net, self.initial_marking, self.final_marking)
+        arcs = {(arc.source, arc.target) for arc in self.petri_net.arcs}
+        for trace in self.log:
+            costs = [apply(Trace(Event({'concept:name': activity_label}) for activity_label in realization), self.petri_net, self.initial_marking, self.final_marking)['cost'] for realization in _label_sequences(_realizations_bruteforce(trace))]
+            behavior_net = BehaviorNet(BehaviorGraph(trace))
+            lower_bound = prepared_model.align(behavior_net, behavior_net.initial_marking, behavior_net.final_marking)
+            self.assertEqual(lower_bound['cost'], apply_trace_net(self.petri_net, self.initial_marking, self.final_marking, behavior_net, behavior_net.initial_marking, behavior_net.final_marking)['cost'])
+            # Moves on invisible transitions of the two nets can be synchronized, so the product can be cheaper than the best realization
+            self.assertLessEqual(lower_bound['cost'], min(costs))
+        # The reference Petri net is left untouched by the synchronous products built on its prepared model
+        self.assertEqual({(arc.source, arc.target) for arc in self.petri_net.arcs}, arcs)
+        for place in self.petri_net.places:
+            self.assertEqual({(arc.source, arc.target) for arc in place.in_arcs | place.out_arcs} - arcs, set())
+
+    def test_009_approximation(self):
+        for trace in self.log:
+            lower_bound, upper_bound, _ = alignment_bounds_su_trace(trace, self.petri_net, self.initial_marking, self.final_marking)
+            approximation = alignment_approximation_su_trace(trace, self.petri_net, self.initial_marking, self.final_marking, n_samples=50, seed=0)
+            self.assertEqual(approximation['n_samples'], 50)
+            self.assertLessEqual(lower_bound['cost'], approximation['min_cost'])
+            self.assertLessEqual(approximation['min_cost'], approximation['mean_cost'])
+            self.assertLessEqual(approximation['mean_cost'], approximation['max_cost'])
+            self.assertLessEqual(approximation['max_cost'], upper_bound['cost'])
+            self.assertEqual(approximation['max_alignment']['cost'], approximation['max_cost'])
+            self.assertEqual(alignment_approximation_su_trace(trace, self.petri_net, self.initial_marking, self.final_marking, n_samples=50, seed=0)['mean_cost'], approximation['mean_cost'])
+
+
+if __name__ == '__main__':
+    unittest.main()
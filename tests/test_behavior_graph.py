@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the construction of behavior graphs."""
+
+
+import unittest
+
+from networkx import DiGraph, transitive_reduction
+
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph, IncrementalBehaviorGraph, create_edges_list, create_edges_list_naive, create_nodes_tuples
+from tests.random_logs import random_uncertain_log
+
+
+def _edges_bruteforce(trace):
+    # Transitive reduction of the precedence relation between the events of a trace, read from their timestamps: an event precedes another one if its
+    # timestamp ends before the other one starts
+    nodes = {node[0]: node for node, timestamp_type in create_nodes_tuples(trace) if timestamp_type is False}
+    intervals = []
+    for event in trace:
+        if 'u:time:timestamp_min' in event:
+            intervals.append((event['u:time:timestamp_min'], event['u:time:timestamp_max']))
+        else:
+            intervals.append((event['time:timestamp'], event['time:timestamp']))
+    precedence = DiGraph()
+    precedence.add_nodes_from(nodes.values())
+    precedence.add_edges_from((nodes[i], nodes[j]) for i in nodes for j in nodes if intervals[i][1] < intervals[j][0])
+    return set(transitive_reduction(precedence).edges)
+
+
+class TestBehaviorGraph(unittest.TestCase):
+    """Edges of the behavior graphs of random uncertain traces, against the quadratic sweep and the transitive reduction of the precedence relation."""
+
+    def setUp(self):
+        self.log = random_uncertain_log(300, 2, max_events=12, p_timestamp=.5)
+
+    def test_000_create_edges_list(self):
+        for trace in self.log:
+            nodes_tuples = create_nodes_tuples(trace)
+            edges_list = create_edges_list(nodes_tuples)
+            self.assertEqual(len(edges_list), len(set(edges_list)))
+            self.assertEqual(set(edges_list), set(create_edges_list_naive(nodes_tuples)))
+            self.assertEqual(set(edges_list), _edges_bruteforce(trace))
+
+    def test_001_behavior_graph(self):
+        for trace in self.log:
+            behavior_graph = BehaviorGraph(trace)
+            self.assertEqual(set(behavior_graph.nodes), {node for node, _ in create_nodes_tuples(trace)})
+            self.assertEqual(set(behavior_graph.edges), set(BehaviorGraph(nodes_tuples=create_nodes_tuples(trace)).edges))
+            self.assertEqual(set(behavior_graph.edges), _edges_bruteforce(trace))
+
+    def test_002_incremental_behavior_graph(self):
+        for trace in self.log:
+            incremental_behavior_graph = IncrementalBehaviorGraph()
+            for i, event in enumerate(trace):
+                self.assertEqual(incremental_behavior_graph.append_event(event)[0], i)
+                nodes_tuples = create_nodes_tuples(trace[:i + 1])
+                self.assertEqual(incremental_behavior_graph.nodes_tuple, nodes_tuples)
+                self.assertEqual(set(incremental_behavior_graph.nodes), {node for node, _ in nodes_tuples})
+                self.assertEqual(set(incremental_behavior_graph.edges), set(create_edges_list(nodes_tuples)))
+
+
+if __name__ == '__main__':
+    unittest.main()
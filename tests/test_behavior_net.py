@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for behavior nets and their compiled token game."""
+
+
+import unittest
+from collections import Counter
+
+from pm4py.objects.petri_net import semantics
+
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph
+from proved.artifacts.behavior_graph.compact_behavior_graph import CompactBehaviorGraph
+from proved.artifacts.behavior_net.behavior_net import BehaviorNet
+from proved.artifacts.behavior_net.compiled_behavior_net import CompiledBehaviorNet
+from proved.artifacts.behavior_net.utils import acyclic_net_variants
+from proved.artifacts.variant_cache.variant_cache import get_behavior_net
+from tests.random_logs import random_uncertain_log
+from tests.test_realizations import _label_sequences, _realizations_bruteforce
+
+
+def _reachable_markings(net, initial_marking):
+    # All the markings reachable in a net, explored with the token game of pm4py
+    markings = [initial_marking]
+    visited = {initial_marking}
+    for marking in markings:
+        for transition in semantics.enabled_transitions(net, marking):
+            next_marking = semantics.execute(transition, net, marking)
+            if next_marking not in visited:
+                visited.add(next_marking)
+                markings.append(next_marking)
+    return markings
+
+
+def _net_language(net, marking, final_marking):
+    # Label sequences of the runs of an acyclic net from a marking to the final marking, with the token game of pm4py
+    if marking == final_marking:
+        return [()]
+    language = []
+    for transition in semantics.enabled_transitions(net, marking):
+        suffixes = _net_language(net, semantics.execute(transition, net, marking), final_marking)
+        language.extend(suffixes if transition.label is None else [(transition.label,) + suffix for suffix in suffixes])
+    return language
+
+
+def _net_structure(net):
+    return {transition.name: transition.label for transition in net.transitions}, {(str(arc.source.name), str(arc.target.name)) for arc in net.arcs}
+
+
+class TestBehaviorNet(unittest.TestCase):
+    """Behavior nets of random uncertain traces, against the token game of pm4py and the brute-force enumeration of the realizations."""
+
+    def setUp(self):
+        # The behavior net of an empty trace has a sink transition without input places, so its reachability graph is infinite
+        self.log = [trace for trace in random_uncertain_log(100, 6, max_events=5) if trace]
+
+    def test_000_compiled_behavior_net(self):
+        for trace in self.log:
+            behavior_net = BehaviorNet(BehaviorGraph(trace))
+            compiled_net = CompiledBehaviorNet(behavior_net)
+            self.assertEqual(compiled_net.decode_marking(compiled_net.initial_marking), behavior_net.initial_marking)
+            self.assertEqual(compiled_net.decode_marking(compiled_net.final_marking), behavior_net.final_marking)
+            for marking in _reachable_markings(behavior_net, behavior_net.initial_marking):
+                bitset = compiled_net.encode_marking(marking)
+                self.assertEqual(compiled_net.decode_marking(bitset), marking)
+                enabled_transitions = compiled_net.enabled_transitions(bitset)
+                self.assertEqual({compiled_net.transition(transition_id) for transition_id in enabled_transitions}, set(semantics.enabled_transitions(behavior_net, marking)))
+                for transition_id in enabled_transitions:
+                    self.assertTrue(compiled_net.is_enabled(bitset, transition_id))
+                    self.assertEqual(compiled_net.decode_marking(compiled_net.fire(bitset, transition_id)), semantics.execute(compiled_net.transition(transition_id), behavior_net, marking))
+            variants = Counter(tuple(event['concept:name'] for event in variant) for variant in acyclic_net_variants(compiled_net, behavior_net.initial_marking, behavior_net.final_marking))
+            self.assertEqual(variants, Counter(_label_sequences(_realizations_bruteforce(trace))))
+
+    def test_001_behavior_net(self):
+        for trace in self.log:
+            behavior_graph = BehaviorGraph(trace)
+            behavior_net = BehaviorNet(behavior_graph)
+            for arc in behavior_net.arcs:
+                self.assertIn(arc, arc.source.out_arcs)
+                self.assertIn(arc, arc.target.in_arcs)
+            # Runs differing only in the order of concurrent invisible transitions have the same realization, so languages are compared as sets
+            language = _net_language(behavior_net, behavior_net.initial_marking, behavior_net.final_marking)
+            self.assertEqual(set(language), set(_label_sequences(_realizations_bruteforce(trace))))
+            self.assertEqual(_net_structure(BehaviorNet(CompactBehaviorGraph.from_behavior_graph(behavior_graph))), _net_structure(behavior_net))
+
+    def test_002_get_behavior_net(self):
+        # Behavior nets are shared by the traces of the same variant
+        for trace in self.log:
+            behavior_net = get_behavior_net(trace)
+            self.assertIs(get_behavior_net(trace), behavior_net)
+            self.assertEqual(_net_structure(behavior_net), _net_structure(BehaviorNet(BehaviorGraph(trace))))
+
+
+if __name__ == '__main__':
+    unittest.main()
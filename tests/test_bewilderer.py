@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the bewilderer, adding simulated uncertainty to event logs."""
+
+
+import random
+import unittest
+from datetime import timedelta
+
+import numpy as np
+from pm4py.objects.log.log import EventLog, Trace
+
+from proved.simulation.bewilderer.add_activities import add_uncertain_activities_to_log
+from proved.simulation.bewilderer.add_indeterminate_events import add_indeterminate_events_to_log
+from proved.simulation.bewilderer.add_timestamps import add_uncertain_timestamp_to_log
+from proved.simulation.bewilderer.add_uncertainty import add_uncertainty, add_uncertainty_montecarlo_sharded, add_uncertainty_stream
+from proved.simulation.bewilderer.log_index import LogIndex
+from tests.random_logs import random_uncertain_log
+
+
+def _certain_log(n_traces, seed):
+    # Random log without uncertainty, with the events of each trace sorted by timestamp
+    log = random_uncertain_log(n_traces, seed, max_events=8, activity_labels='abcdef', p_timestamp=0, p_activity=0, p_missing=0)
+    return EventLog(Trace(sorted(trace, key=lambda event: event['time:timestamp'])) for trace in log)
+
+
+def _altered_events(log, key):
+    return [(i, j) for i, trace in enumerate(log) for j, event in enumerate(trace) if key in event]
+
+
+class TestBewilderer(unittest.TestCase):
+    """Uncertainty added to random certain logs."""
+
+    def setUp(self):
+        self.log = _certain_log(200, 7)
+        self.n_events = sum(len(trace) for trace in self.log)
+        self.label_set = {event['concept:name'] for trace in self.log for event in trace}
+
+    def assert_uncertain_activities(self, log, max_labels_to_add):
+        for i, j in _altered_events(log, 'u:concept:name'):
+            children = log[i][j]['u:concept:name']['children']
+            self.assertIn(log[i][j]['concept:name'], children)
+            self.assertLessEqual(set(children), self.label_set)
+            self.assertEqual(len(children), 1 + min(max_labels_to_add, len(self.label_set) - 1))
+
+    def assert_uncertain_timestamps(self, log):
+        # An uncertain timestamp spans the timestamp of the event, and possibly the one of the previous or of the following event
+        for i, j in _altered_events(log, 'u:time:timestamp_min'):
+            trace = log[i]
+            timestamp_min, timestamp_max = trace[j]['u:time:timestamp_min'] + timedelta(milliseconds=100), trace[j]['u:time:timestamp_max'] - timedelta(milliseconds=100)
+            self.assertLessEqual(timestamp_min, trace[j]['time:timestamp'])
+            self.assertLessEqual(trace[j]['time:timestamp'], timestamp_max)
+            self.assertIn(timestamp_min, {trace[j]['time:timestamp'], trace[max(j - 1, 0)]['time:timestamp']})
+            self.assertIn(timestamp_max, {trace[j]['time:timestamp'], trace[min(j + 1, len(trace) - 1)]['time:timestamp']})
+
+    def test_000_log_index(self):
+        log_index = LogIndex(self.log)
+        self.assertEqual(len(log_index), self.n_events)
+        events = [(i, j) for i, trace in enumerate(self.log) for j in range(len(trace))]
+        trace_indices, positions = log_index.locate(np.arange(self.n_events))
+        self.assertEqual(list(zip(trace_indices.tolist(), positions.tolist())), events)
+        self.assertEqual(log_index.trace_lengths(trace_indices).tolist(), [len(self.log[i]) for i, _ in events])
+        sample = log_index.sample(self.n_events // 2, np.random.default_rng(0))
+        self.assertEqual(len(set(sample.tolist())), self.n_events // 2)
+
+    def test_001_bulk_alterations(self):
+        for seed in range(3):
+            log = _certain_log(200, 7)
+            random.seed(seed)
+            add_uncertain_activities_to_log(.3, log, max_labels_to_add=2)
+            add_uncertain_timestamp_to_log(.2, log)
+            add_indeterminate_events_to_log(.1, log)
+            self.assertEqual(len(_altered_events(log, 'u:concept:name')), round(self.n_events * .3))
+            self.assertEqual(len(_altered_events(log, 'u:time:timestamp_min')), round(self.n_events * .2))
+            self.assertEqual(len(_altered_events(log, 'u:missing')), round(self.n_events * .1))
+            self.assert_uncertain_activities(log, 2)
+            self.assert_uncertain_timestamps(log)
+
+            # The bulk functions draw from the global random state
+            same_log = _certain_log(200, 7)
+            random.seed(seed)
+            add_uncertain_activities_to_log(.3, same_log, max_labels_to_add=2)
+            add_uncertain_timestamp_to_log(.2, same_log)
+            add_indeterminate_events_to_log(.1, same_log)
+            self.assertEqual([[dict(event) for event in trace] for trace in same_log], [[dict(event) for event in trace] for trace in log])
+
+    def test_002_add_uncertainty(self):
+        log = _certain_log(200, 7)
+        random.seed(0)
+        add_uncertainty(.3, .2, .1, log, max_labels_to_add=2)
+        self.assertEqual(len(_altered_events(log, 'u:concept:name')), round(self.n_events * .3))
+        self.assertEqual(len(_altered_events(log, 'u:time:timestamp_min')), round(self.n_events * .2))
+        self.assertEqual(len(_altered_events(log, 'u:missing')), round(self.n_events * .1))
+        self.assert_uncertain_activities(log, 2)
+        self.assert_uncertain_timestamps(log)
+
+        same_log = _certain_log(200, 7)
+        random.seed(0)
+        add_uncertainty(.3, .2, .1, same_log, log_map=LogIndex(same_log), max_labels_to_add=2)
+        self.assertEqual([[dict(event) for event in trace] for trace in same_log], [[dict(event) for event in trace] for trace in log])
+
+        # Legacy log maps are still accepted, with an explicit label set
+        legacy_log = _certain_log(200, 7)
+        log_map = dict(enumerate((trace, j) for trace in legacy_log for j in range(len(trace))))
+        add_uncertainty(.3, .2, .1, legacy_log, log_map=log_map, max_labels_to_add=2, label_set=self.label_set)
+        self.assertEqual(len(_altered_events(legacy_log, 'u:concept:name')), round(self.n_events * .3))
+        self.assertEqual(len(_altered_events(legacy_log, 'u:missing')), round(self.n_events * .1))
+        self.assert_uncertain_timestamps(legacy_log)
+
+    def test_003_add_uncertainty_stream(self):
+        random.seed(0)
+        traces = add_uncertainty_stream(iter(_certain_log(200, 7)), .3, .2, .1, max_labels_to_add=2, label_set=self.label_set)
+        log = EventLog(traces)
+        self.assertEqual(len(log), 200)
+        for key, p in (('u:concept:name', .3), ('u:time:timestamp_min', .2), ('u:missing', .1)):
+            self.assertAlmostEqual(len(_altered_events(log, key)) / self.n_events, p, delta=.05)
+        self.assert_uncertain_activities(log, 2)
+        self.assert_uncertain_timestamps(log)
+        with self.assertRaises(ValueError):
+            list(add_uncertainty_stream(iter(_certain_log(1, 7)), .3))
+
+    def test_004_add_uncertainty_montecarlo_sharded(self):
+        parameters = {'p_a': .3, 'p_left': .3, 'p_right': .3, 'p_i': .1, 'max_labels': 2, 'max_overlap_left': 1, 'max_overlap_right': 1, 'shard_size': 30}
+        sequential = _certain_log(200, 7)
+        add_uncertainty_montecarlo_sharded(sequential, 42, **parameters)
+        parallel = _certain_log(200, 7)
+        add_uncertainty_montecarlo_sharded(parallel, 42, n_jobs=2, **parameters)
+        self.assertEqual([[dict(event) for event in trace] for trace in parallel], [[dict(event) for event in trace] for trace in sequential])
+        other = _certain_log(200, 7)
+        add_uncertainty_montecarlo_sharded(other, 43, **parameters)
+        self.assertNotEqual([[dict(event) for event in trace] for trace in other], [[dict(event) for event in trace] for trace in sequential])
+
+        self.assertTrue(_altered_events(sequential, 'u:concept:name'))
+        self.assertTrue(_altered_events(sequential, 'u:missing'))
+        for trace in sequential:
+            for j, event in enumerate(trace):
+                self.assertLessEqual(event['u:time:timestamp_min'], event['time:timestamp'])
+                self.assertLessEqual(event['time:timestamp'], event['u:time:timestamp_max'])
+                self.assertGreaterEqual(event['u:time:timestamp_min'], trace[max(j - 1, 0)]['time:timestamp'])
+                self.assertLessEqual(event['u:time:timestamp_max'], trace[min(j + 1, len(trace) - 1)]['time:timestamp'])
+                if 'u:concept:name' in event:
+                    self.assertIn(event['concept:name'], event['u:concept:name']['children'])
+                    self.assertLessEqual(len(event['u:concept:name']['children']), 3)
+        with self.assertRaises(ValueError):
+            add_uncertainty_montecarlo_sharded(_certain_log(1, 7), 42, shard_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the columnar, NumPy-backed uncertain logs."""
+
+
+import random
+import unittest
+
+from proved.artifacts.behavior_graph.behavior_graph import create_edges_list, create_nodes_tuples
+from proved.artifacts.behavior_graph.utils import uncertainty_probabilities
+from proved.artifacts.uncertain_log.columnar_uncertain_log import ColumnarUncertainLog
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+from tests.random_logs import random_uncertain_log
+
+
+class TestColumnarUncertainLog(unittest.TestCase):
+    """Columnar forms of random uncertain logs, against the nodes tuples and the behavior graphs of their traces."""
+
+    def setUp(self):
+        self.log = random_uncertain_log(300, 8, max_events=5, p_timestamp=.2, p_activity=.1)
+        self.columnar_log = ColumnarUncertainLog.from_event_log(self.log)
+        self.nodes_tuples = [create_nodes_tuples(trace) for trace in self.log]
+
+    def test_000_round_trip(self):
+        self.assertEqual(len(self.columnar_log), len(self.log))
+        event_log = self.columnar_log.to_event_log()
+        self.assertEqual([create_nodes_tuples(trace) for trace in event_log], self.nodes_tuples)
+        for trace, round_trip_trace in zip(self.log, event_log):
+            self.assertEqual([event['time:timestamp'] for event in round_trip_trace], [event['time:timestamp'] for event in trace])
+        self.assertEqual(set(self.columnar_log.to_uncertain_log().behavior_graphs_map), set(self.nodes_tuples))
+
+    def test_001_sorted_endpoints(self):
+        event_indices, timestamp_types = self.columnar_log.sorted_endpoints()
+        trace_offsets = self.columnar_log.trace_offsets.tolist()
+        endpoints = list(zip(event_indices.tolist(), timestamp_types.tolist()))
+        for t, nodes_tuple in enumerate(self.nodes_tuples):
+            trace_endpoints = endpoints[2 * trace_offsets[t]:2 * trace_offsets[t + 1]]
+            self.assertEqual([(i - trace_offsets[t], timestamp_type) for i, timestamp_type in trace_endpoints], [(node[0], timestamp_type) for node, timestamp_type in nodes_tuple])
+
+    def test_002_variants(self):
+        trace_variants, first_traces, variant_lengths = self.columnar_log.variants()
+        variant_ids = dict()
+        for nodes_tuple in self.nodes_tuples:
+            variant_ids.setdefault(nodes_tuple, len(variant_ids))
+        self.assertEqual(trace_variants.tolist(), [variant_ids[nodes_tuple] for nodes_tuple in self.nodes_tuples])
+        self.assertEqual(first_traces.tolist(), [self.nodes_tuples.index(nodes_tuple) for nodes_tuple in variant_ids])
+        uncertain_log = UncertainLog(self.log)
+        self.assertEqual(variant_lengths.tolist(), [len(uncertain_log.behavior_graphs_map[nodes_tuple][1]) for nodes_tuple in variant_ids])
+
+    def test_003_behavior_graph_edges(self):
+        sources, targets = self.columnar_log.behavior_graph_edges()
+        trace_offsets = self.columnar_log.trace_offsets
+        edges = [[] for _ in self.log]
+        for source, target, t in zip(sources.tolist(), targets.tolist(), self.columnar_log.trace_of_events(sources).tolist()):
+            self.assertEqual(self.columnar_log.trace_of_events(target), t)
+            edges[t].append((source - trace_offsets[t], target - trace_offsets[t]))
+        for trace_edges, nodes_tuple in zip(edges, self.nodes_tuples):
+            self.assertEqual(trace_edges, [(node1[0], node2[0]) for node1, node2 in create_edges_list(nodes_tuple)])
+
+    def test_004_uncertainty_probabilities(self):
+        # Weights of the activity labels and probabilities of the indeterminate events are kept through the columnar form
+        rng = random.Random(9)
+        for trace in self.log:
+            for event in trace:
+                if 'u:concept:name' in event:
+                    event['u:concept:name']['children'] = {activity_label: rng.choice((0, .5, 2)) for activity_label in event['u:concept:name']['children']}
+                if 'u:missing' in event:
+                    event['u:missing'] = rng.choice((.25, 1))
+        event_log = ColumnarUncertainLog.from_event_log(self.log).to_event_log()
+        for trace, round_trip_trace in zip(self.log, event_log):
+            self.assertEqual(uncertainty_probabilities(round_trip_trace), uncertainty_probabilities(trace))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the compact, array-backed behavior graphs."""
+
+
+import unittest
+
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph, IncrementalBehaviorGraph, create_edges_list, create_nodes_tuples
+from proved.artifacts.behavior_graph.compact_behavior_graph import CompactBehaviorGraph, LabelTable
+from tests.random_logs import random_uncertain_log
+
+
+class TestCompactBehaviorGraph(unittest.TestCase):
+    """Round trips between BehaviorGraph and CompactBehaviorGraph."""
+
+    def setUp(self):
+        self.log = random_uncertain_log(200, 1)
+
+    def assert_topological(self, compact_behavior_graph):
+        for node_id in range(compact_behavior_graph.number_of_nodes()):
+            for successor_id in compact_behavior_graph.successor_ids(node_id):
+                self.assertLess(node_id, successor_id)
+
+    def test_000_round_trip(self):
+        label_table = LabelTable()
+        for trace in self.log:
+            behavior_graph = BehaviorGraph(trace)
+            compact_behavior_graph = CompactBehaviorGraph.from_behavior_graph(behavior_graph, label_table)
+            self.assertEqual(set(compact_behavior_graph.nodes), set(behavior_graph.nodes))
+            self.assertEqual(set(compact_behavior_graph.edges), set(behavior_graph.edges))
+            self.assertEqual(compact_behavior_graph.number_of_edges(), behavior_graph.number_of_edges())
+            for node in behavior_graph.nodes:
+                self.assertEqual(set(compact_behavior_graph.successors(node)), set(behavior_graph.successors(node)))
+                self.assertEqual(set(compact_behavior_graph.predecessors(node)), set(behavior_graph.predecessors(node)))
+            self.assert_topological(compact_behavior_graph)
+            round_trip = compact_behavior_graph.to_behavior_graph()
+            self.assertEqual(set(round_trip.edges), set(behavior_graph.edges))
+
+    def test_001_from_nodes_tuples(self):
+        for trace in self.log:
+            behavior_graph = BehaviorGraph(trace)
+            compact_behavior_graph = CompactBehaviorGraph.from_nodes_tuples(create_nodes_tuples(trace))
+            self.assertEqual(set(compact_behavior_graph.nodes), set(behavior_graph.nodes))
+            self.assertEqual(set(compact_behavior_graph.edges), set(behavior_graph.edges))
+
+    def test_002_unsorted_behavior_graph(self):
+        # Nodes added in reverse timestamp order are not in a topological order
+        for trace in self.log:
+            nodes_tuples = create_nodes_tuples(trace)
+            behavior_graph = BehaviorGraph()
+            behavior_graph.add_nodes_from(reversed([node for node, timestamp_type in nodes_tuples if timestamp_type is False]))
+            behavior_graph.add_edges_from(create_edges_list(nodes_tuples))
+            compact_behavior_graph = CompactBehaviorGraph.from_behavior_graph(behavior_graph)
+            self.assertEqual(set(compact_behavior_graph.edges), set(behavior_graph.edges))
+            self.assert_topological(compact_behavior_graph)
+
+    def test_003_incremental_behavior_graph(self):
+        # Nodes of an incremental behavior graph are in arrival order, which is not a topological order in general
+        for trace in self.log:
+            incremental_behavior_graph = IncrementalBehaviorGraph()
+            for event in trace:
+                incremental_behavior_graph.append_event(event)
+            compact_behavior_graph = CompactBehaviorGraph.from_behavior_graph(incremental_behavior_graph)
+            self.assertEqual(set(compact_behavior_graph.edges), set(incremental_behavior_graph.edges))
+            self.assert_topological(compact_behavior_graph)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the log-level uncertainty metrics."""
+
+
+import itertools
+import math
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from networkx import transitive_closure_dag, dag_longest_path_length
+from pm4py.objects.log.log import EventLog, Trace, Event
+
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+from proved.artifacts.uncertain_log.utils import log_variants, realization_set
+from proved.metrics.log_metrics import METRICS_COLUMNS, log_metrics
+from tests.random_logs import random_uncertain_log
+
+
+def _width_bruteforce(behavior_graph):
+    closure = transitive_closure_dag(behavior_graph)
+    nodes = list(behavior_graph.nodes)
+    return max((size for size in range(1, len(nodes) + 1) for antichain in itertools.combinations(nodes, size)
+                if all(not closure.has_edge(a, b) and not closure.has_edge(b, a) for a, b in itertools.combinations(antichain, 2))), default=0)
+
+
+class TestLogMetrics(unittest.TestCase):
+    """Metrics of the variants of random uncertain logs, against brute-force computations on their behavior graphs and realization sets."""
+
+    def setUp(self):
+        self.log = random_uncertain_log(200, 10, max_events=5)
+
+    def test_000_variants(self):
+        table, summary = log_metrics(self.log)
+        self.assertEqual(set(table), set(METRICS_COLUMNS))
+        for k, (behavior_graph, traces_list) in enumerate(log_variants(self.log).values()):
+            realizations = realization_set(traces_list[0])
+            self.assertEqual(table['multiplicity'][k], len(traces_list))
+            self.assertEqual(table['n_events'][k], len(traces_list[0]))
+            self.assertTrue(table['realization_count_exact'][k])
+            self.assertEqual(table['realization_count'][k], len(realizations))
+            self.assertAlmostEqual(table['log10_realization_count'][k], math.log10(len(realizations)))
+            self.assertEqual(table['min_length'][k], min(len(realization) for realization in realizations))
+            self.assertEqual(table['max_length'][k], max(len(realization) for realization in realizations))
+            self.assertEqual(table['width'][k], _width_bruteforce(behavior_graph))
+            self.assertEqual(table['depth'][k], dag_longest_path_length(behavior_graph) + 1 if len(behavior_graph) > 0 else 0)
+
+        self.assertEqual(summary['traces'], len(self.log))
+        self.assertEqual(summary['events'], sum(len(trace) for trace in self.log))
+        self.assertEqual(summary['variants'], len(log_variants(self.log)))
+        self.assertAlmostEqual(summary['mean_realization_count'], sum(len(realization_set(trace)) for trace in self.log) / len(self.log))
+        self.assertEqual(summary['max_realization_count'], max(len(realization_set(trace)) for trace in self.log))
+        # Uncertain timestamps are read from the first trace of each variant
+        self.assertAlmostEqual(summary['uncertain_timestamps'], sum(len(traces_list) * sum('u:time:timestamp_min' in event for event in traces_list[0])
+                                                                    for _, traces_list in log_variants(self.log).values()) / summary['events'])
+
+    def test_001_uncertain_log(self):
+        table, summary = log_metrics(self.log)
+        uncertain_log_table, uncertain_log_summary = log_metrics(UncertainLog(self.log))
+        self.assertEqual(uncertain_log_table['realization_count'].tolist(), table['realization_count'].tolist())
+        self.assertEqual(uncertain_log_summary, summary)
+
+    def test_002_wide_variant(self):
+        # Two hundred concurrent events have more realizations than the largest float
+        start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        trace = Trace(Event({'concept:name': 'a', 'time:timestamp': start, 'u:time:timestamp_min': start, 'u:time:timestamp_max': start + timedelta(seconds=1)}) for _ in range(200))
+        table, summary = log_metrics(EventLog([trace]))
+        self.assertFalse(table['realization_count_exact'][0])
+        self.assertGreater(table['realization_count'][0], math.factorial(170))
+        self.assertTrue(math.isfinite(table['log10_realization_count'][0]))
+        self.assertEqual(summary['mean_realization_count'], math.inf)
+        self.assertEqual(summary['max_width'], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the realizations of uncertain traces, computed on their behavior graphs."""
+
+
+import itertools
+import unittest
+from collections import Counter
+
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph, create_nodes_tuples
+from proved.artifacts.behavior_graph.compact_behavior_graph import CompactBehaviorGraph
+from proved.artifacts.behavior_graph.utils import behavior_graph_labels, realization_count, realization_count_upper_bound, realization_iterator, realization_to_trace, sample_realizations, top_k_realizations, uncertainty_probabilities
+from proved.artifacts.uncertain_log.utils import most_likely_realizations
+from proved.metrics.trace_metrics import trace_variability
+from tests.random_logs import random_uncertain_log
+
+
+def _realizations_bruteforce(trace):
+    # Enumerates the realizations of a trace, as sequences of (event index, activity label) pairs, straight from the attributes of its events: an event
+    # precedes another one if its timestamp ends before the other one starts
+    intervals = []
+    for event in trace:
+        if 'u:time:timestamp_min' in event:
+            intervals.append((event['u:time:timestamp_min'], event['u:time:timestamp_max']))
+        else:
+            intervals.append((event['time:timestamp'], event['time:timestamp']))
+    nodes = {node[0]: node for node, timestamp_type in create_nodes_tuples(trace) if timestamp_type is False}
+    indeterminate = [i for i in nodes if None in nodes[i][1]]
+
+    realizations = []
+    for n_skipped in range(len(indeterminate) + 1):
+        for skipped in itertools.combinations(indeterminate, n_skipped):
+            events = [i for i in nodes if i not in skipped]
+            for order in itertools.permutations(events):
+                if any(intervals[j][1] < intervals[i][0] for position, i in enumerate(order) for j in order[position + 1:]):
+                    continue
+                labels = [[(i, activity_label) for activity_label in sorted(nodes[i][1] - {None}, key=str)] for i in order]
+                realizations.extend(itertools.product(*labels))
+    return realizations
+
+
+def _label_sequences(realizations):
+    # The sequences of activity labels of realizations enumerated by _realizations_bruteforce
+    return [tuple(activity_label for _, activity_label in realization) for realization in realizations]
+
+
+def _weights(node, activity_label):
+    # Weights of the choices of sample_realizations, excluding skips and label 'a' on events with other labels
+    if activity_label is None:
+        return 0
+    return 0 if activity_label == 'a' and len(node[1] - {None}) > 1 else 1
+
+
+class TestRealizations(unittest.TestCase):
+    """Realizations of random uncertain traces, against the brute-force enumeration of their events."""
+
+    def setUp(self):
+        self.log = random_uncertain_log(150, 5, max_events=5)
+
+    def test_000_realization_count(self):
+        for trace in self.log:
+            n_realizations = len(_realizations_bruteforce(trace))
+            behavior_graph = BehaviorGraph(trace)
+            self.assertEqual(realization_count(behavior_graph), n_realizations)
+            self.assertEqual(realization_count(CompactBehaviorGraph.from_behavior_graph(behavior_graph)), n_realizations)
+            self.assertGreaterEqual(realization_count_upper_bound(behavior_graph), n_realizations)
+            self.assertAlmostEqual(trace_variability(trace), 1 / n_realizations)
+
+    def test_001_realization_iterator(self):
+        for trace in self.log:
+            behavior_graph = BehaviorGraph(trace)
+            labels = behavior_graph_labels(behavior_graph)
+            realizations = list(realization_iterator(behavior_graph))
+            self.assertEqual(Counter(tuple(labels[label_id] for label_id in realization) for realization in realizations), Counter(_label_sequences(_realizations_bruteforce(trace))))
+            self.assertEqual(Counter(realization_iterator(CompactBehaviorGraph.from_behavior_graph(behavior_graph), labels)), Counter(realizations))
+            for realization in realizations:
+                self.assertEqual(tuple(event['concept:name'] for event in realization_to_trace(realization, labels)), tuple(labels[label_id] for label_id in realization))
+
+    def test_002_sample_realizations(self):
+        for trace in self.log:
+            behavior_graph = BehaviorGraph(trace)
+            labels = behavior_graph_labels(behavior_graph)
+            realizations = Counter(_label_sequences(_realizations_bruteforce(trace)))
+            n_realizations = sum(realizations.values())
+            samples = [tuple(labels[label_id] for label_id in realization) for realization in sample_realizations(behavior_graph, 2000, seed=1)]
+            self.assertLessEqual(set(samples), set(realizations))
+            self.assertEqual(list(sample_realizations(behavior_graph, 10, seed=2)), list(sample_realizations(behavior_graph, 10, seed=2)))
+            # Realizations are drawn uniformly: the frequency of each sequence of labels is proportional to the number of realizations with those labels
+            frequencies = Counter(samples)
+            for realization, multiplicity in realizations.items():
+                self.assertAlmostEqual(frequencies[realization] / len(samples), multiplicity / n_realizations, delta=.05)
+
+            # With weights, indeterminate events are never skipped and label 'a' is never chosen unless it is the only label of an event
+            expected = {realization for realization in realizations if len(realization) == len(behavior_graph.nodes)}
+            for realization in sample_realizations(behavior_graph, 50, _weights, seed=3):
+                realization = tuple(labels[label_id] for label_id in realization)
+                self.assertIn(realization, expected)
+                self.assertLessEqual(realization.count('a'), sum(1 for node in behavior_graph.nodes if node[1] - {None} == {'a'}))
+
+    def test_003_top_k_realizations(self):
+        for trace in self.log:
+            behavior_graph = BehaviorGraph(trace)
+            labels = behavior_graph_labels(behavior_graph)
+            realizations = list(top_k_realizations(behavior_graph, 10 ** 9, uncertainty_probabilities(trace)))
+            self.assertAlmostEqual(sum(probability for _, probability in realizations), 1.0)
+            probabilities = [probability for _, probability in realizations]
+            self.assertEqual(probabilities, sorted(probabilities, reverse=True))
+            self.assertLessEqual(Counter(tuple(labels[label_id] for label_id in realization) for realization, _ in realizations), Counter(_label_sequences(_realizations_bruteforce(trace))))
+            self.assertEqual(list(top_k_realizations(behavior_graph, 3, uncertainty_probabilities(trace))), realizations[:3])
+
+    def test_004_most_likely_realizations(self):
+        for trace in self.log:
+            all_realizations = most_likely_realizations(trace, 10 ** 9)
+            self.assertEqual([probability for _, probability in most_likely_realizations(trace, 3)], [probability for _, probability in all_realizations[:3]])
+            for behavior_graph in (BehaviorGraph(trace), CompactBehaviorGraph.from_behavior_graph(BehaviorGraph(trace))):
+                realizations = most_likely_realizations(behavior_graph, 10 ** 9)
+                self.assertAlmostEqual(sum(probability for _, probability in realizations), 1.0)
+                self.assertEqual(Counter(tuple(event['concept:name'] for event in realization) for realization, _ in realizations), Counter(_label_sequences(_realizations_bruteforce(trace))))
+
+
+if __name__ == '__main__':
+    unittest.main()
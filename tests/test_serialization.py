@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the binary serialization of uncertain logs."""
+
+
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+from pm4py.objects.log.log import EventLog
+
+from proved.artifacts.behavior_graph.behavior_graph import create_nodes_tuples
+from proved.artifacts.behavior_graph.utils import uncertainty_probabilities
+from proved.artifacts.uncertain_log.serialization import MappedUncertainLog, save_uncertain_log
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+from tests.random_logs import random_uncertain_log
+
+
+class TestSerialization(unittest.TestCase):
+    """Round trips of UncertainLog objects through save_uncertain_log and MappedUncertainLog."""
+
+    def setUp(self):
+        self.log = random_uncertain_log(300, 0)
+        handle, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def assert_same_variants(self, uncertain_log, mapped_log):
+        self.assertEqual(len(mapped_log), len(uncertain_log))
+        self.assertEqual(mapped_log.variants, uncertain_log.variants)
+        for variant_id, (variant_length, nodes_tuple) in uncertain_log.variants.items():
+            behavior_graph = uncertain_log.behavior_graphs_map[nodes_tuple][0]
+            mapped_behavior_graph = mapped_log.behavior_graph(variant_id)
+            self.assertEqual(set(mapped_behavior_graph.nodes), set(behavior_graph.nodes))
+            self.assertEqual(set(mapped_behavior_graph.edges), set(behavior_graph.edges))
+        for trace, variant_id in zip(uncertain_log, mapped_log.trace_variants.tolist()):
+            self.assertEqual(mapped_log.variants[variant_id][1], create_nodes_tuples(trace))
+
+    def test_000_round_trip(self):
+        for compact in (False, True):
+            uncertain_log = UncertainLog(self.log, compact=compact)
+            save_uncertain_log(uncertain_log, self.path)
+            mapped_log = MappedUncertainLog(self.path)
+            self.assert_same_variants(uncertain_log, mapped_log)
+            self.assertEqual([create_nodes_tuples(trace) for trace in mapped_log.columnar_log.to_event_log()], [create_nodes_tuples(trace) for trace in self.log])
+
+    def test_001_to_uncertain_log(self):
+        uncertain_log = UncertainLog(self.log)
+        save_uncertain_log(uncertain_log, self.path)
+        for compact in (False, True):
+            loaded_log = MappedUncertainLog(self.path).to_uncertain_log(compact=compact)
+            self.assertEqual(loaded_log.variants, uncertain_log.variants)
+            for nodes_tuple, (behavior_graph, traces_list) in uncertain_log.behavior_graphs_map.items():
+                loaded_behavior_graph, loaded_traces_list = loaded_log.behavior_graphs_map[nodes_tuple]
+                self.assertEqual(set(loaded_behavior_graph.edges), set(behavior_graph.edges))
+                self.assertEqual([create_nodes_tuples(trace) for trace in loaded_traces_list], [create_nodes_tuples(trace) for trace in traces_list])
+
+    def test_002_without_traces(self):
+        uncertain_log = UncertainLog(self.log)
+        save_uncertain_log(uncertain_log, self.path, include_traces=False)
+        mapped_log = MappedUncertainLog(self.path)
+        self.assertIsNone(mapped_log.columnar_log)
+        self.assert_same_variants(uncertain_log, mapped_log)
+        with self.assertRaises(ValueError):
+            mapped_log.to_uncertain_log()
+
+    def test_003_pickle(self):
+        uncertain_log = UncertainLog(self.log)
+        save_uncertain_log(uncertain_log, self.path)
+        mapped_log = pickle.loads(pickle.dumps(MappedUncertainLog(self.path)))
+        self.assert_same_variants(uncertain_log, mapped_log)
+
+    def test_004_empty_log(self):
+        save_uncertain_log(UncertainLog(EventLog()), self.path)
+        mapped_log = MappedUncertainLog(self.path)
+        self.assertEqual(len(mapped_log), 0)
+        self.assertEqual(mapped_log.variants, {})
+
+    def test_005_uncertainty_probabilities(self):
+        # Weights of the activity labels and probabilities of the indeterminate events are kept in the file
+        rng = random.Random(9)
+        for trace in self.log:
+            for event in trace:
+                if 'u:concept:name' in event:
+                    event['u:concept:name']['children'] = {activity_label: rng.choice((0, .5, 2)) for activity_label in event['u:concept:name']['children']}
+                if 'u:missing' in event:
+                    event['u:missing'] = rng.choice((.25, 1))
+        save_uncertain_log(UncertainLog(self.log), self.path)
+        for trace, loaded_trace in zip(self.log, MappedUncertainLog(self.path).columnar_log.to_event_log()):
+            self.assertEqual(uncertainty_probabilities(loaded_trace), uncertainty_probabilities(trace))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the discovery of uncertain directly-follows graphs."""
+
+
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from pm4py.objects.log.log import Trace, Event
+
+from proved.algorithms.discovery.uncertain_dfg import uncertain_dfg_log, uncertain_dfg_trace
+from proved.artifacts.behavior_graph.behavior_graph import create_nodes_tuples
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+from tests.random_logs import random_uncertain_log
+from tests.test_realizations import _realizations_bruteforce
+
+
+def _uncertain_dfg_bruteforce(trace):
+    nodes = {node[0]: node for node, timestamp_type in create_nodes_tuples(trace) if timestamp_type is False}
+    realizations = _realizations_bruteforce(trace)
+    next_labels = {i: set() for i in nodes}
+    always_next = {i: None for i in nodes}
+    for r, realization in enumerate(realizations):
+        followers = {i: j for (i, _), (j, _) in zip(realization, realization[1:])}
+        for (i, _), (_, activity_label) in zip(realization, realization[1:]):
+            next_labels[i].add(activity_label)
+        for i in nodes:
+            always_next[i] = followers.get(i) if r == 0 else (always_next[i] if always_next[i] == followers.get(i) else None)
+
+    certain_dfg = Counter()
+    possible_dfg = Counter()
+    for i, node in nodes.items():
+        for activity_from in node[1] - {None}:
+            for activity_to in next_labels[i]:
+                possible_dfg[(activity_from, activity_to)] += 1
+        j = always_next[i]
+        if j is not None and len(node[1]) == 1 and len(nodes[j][1]) == 1 and None not in node[1] | nodes[j][1]:
+            certain_dfg[(next(iter(node[1])), next(iter(nodes[j][1])))] += 1
+    return certain_dfg, possible_dfg, realizations
+
+
+class TestUncertainDfg(unittest.TestCase):
+    """Uncertain directly-follows graphs of random uncertain traces, against the enumeration of their realizations."""
+
+    def setUp(self):
+        self.log = random_uncertain_log(200, 9, max_events=6, p_timestamp=.5, p_missing=.2)
+
+    def test_000_bruteforce(self):
+        for trace in self.log:
+            certain_dfg, possible_dfg = uncertain_dfg_trace(trace)
+            expected_certain_dfg, expected_possible_dfg, realizations = _uncertain_dfg_bruteforce(trace)
+            self.assertEqual(+certain_dfg, expected_certain_dfg)
+            self.assertEqual(+possible_dfg, expected_possible_dfg)
+            realization_dfgs = [Counter((activity_from, activity_to) for (_, activity_from), (_, activity_to) in zip(realization, realization[1:])) for realization in realizations]
+            for pair in set(possible_dfg) | set(certain_dfg):
+                self.assertLessEqual(certain_dfg[pair], min(realization_dfg[pair] for realization_dfg in realization_dfgs))
+                self.assertGreaterEqual(possible_dfg[pair], max(realization_dfg[pair] for realization_dfg in realization_dfgs))
+
+    def test_001_concurrent_events(self):
+        start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        trace = Trace(Event({'concept:name': activity_label, 'time:timestamp': start, 'u:time:timestamp_min': start, 'u:time:timestamp_max': start + timedelta(seconds=1)}) for activity_label in 'ab')
+        certain_dfg, possible_dfg = uncertain_dfg_trace(trace)
+        self.assertEqual(+certain_dfg, Counter())
+        self.assertEqual(+possible_dfg, Counter({('a', 'b'): 1, ('b', 'a'): 1}))
+
+    def test_002_log(self):
+        expected_certain_dfg = Counter()
+        expected_possible_dfg = Counter()
+        for trace in self.log:
+            certain_dfg, possible_dfg = uncertain_dfg_trace(trace)
+            expected_certain_dfg.update(certain_dfg)
+            expected_possible_dfg.update(possible_dfg)
+        for log in (self.log, UncertainLog(self.log)):
+            certain_dfg, possible_dfg = uncertain_dfg_log(log)
+            self.assertEqual(+certain_dfg, +expected_certain_dfg)
+            self.assertEqual(+possible_dfg, +expected_possible_dfg)
+
+
+if __name__ == '__main__':
+    unittest.main()
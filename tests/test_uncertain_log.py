@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the grouping of uncertain traces into variants."""
+
+
+import random
+import unittest
+
+from pm4py.objects.log.log import EventLog
+
+from proved.artifacts.behavior_graph.behavior_graph import BehaviorGraph, create_nodes_tuples
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+from tests.random_logs import random_uncertain_log
+
+
+class TestUncertainLog(unittest.TestCase):
+    """Variants and behavior graphs of random uncertain logs, against the behavior graphs of their traces."""
+
+    def setUp(self):
+        self.log = random_uncertain_log(300, 3, max_events=4, p_timestamp=.1, p_activity=.1)
+
+    def assert_variants(self, uncertain_log):
+        traces = dict()
+        for trace in self.log:
+            traces.setdefault(create_nodes_tuples(trace), []).append(trace)
+        self.assertEqual(set(uncertain_log.behavior_graphs_map), set(traces))
+        for nodes_tuple, (behavior_graph, traces_list) in uncertain_log.behavior_graphs_map.items():
+            self.assertEqual(len(traces_list), len(traces[nodes_tuple]))
+            self.assertEqual(set(behavior_graph.edges), set(BehaviorGraph(traces[nodes_tuple][0]).edges))
+        variant_lengths = [variant_length for _, (variant_length, _) in sorted(uncertain_log.variants.items())]
+        self.assertEqual(variant_lengths, sorted((len(traces_list) for traces_list in traces.values()), reverse=True))
+
+    def test_000_uncertain_log(self):
+        uncertain_log = UncertainLog(self.log)
+        self.assert_variants(uncertain_log)
+        self.assert_variants(UncertainLog(self.log, compact=True))
+
+    def test_001_parallel_uncertain_log(self):
+        uncertain_log = UncertainLog(self.log)
+        for chunk_size in (7, 1000):
+            parallel_uncertain_log = UncertainLog(self.log, n_jobs=2, chunk_size=chunk_size)
+            self.assertEqual(parallel_uncertain_log.variants, uncertain_log.variants)
+            for nodes_tuple, (behavior_graph, traces_list) in uncertain_log.behavior_graphs_map.items():
+                parallel_behavior_graph, parallel_traces_list = parallel_uncertain_log.behavior_graphs_map[nodes_tuple]
+                self.assertEqual(list(parallel_behavior_graph.edges), list(behavior_graph.edges))
+                self.assertEqual([id(trace) for trace in parallel_traces_list], [id(trace) for trace in traces_list])
+
+    def assert_ranking(self, uncertain_log):
+        variant_lengths = [variant_length for _, (variant_length, _) in sorted(uncertain_log.variants.items())]
+        self.assertEqual(variant_lengths, sorted(variant_lengths, reverse=True))
+        for variant_length, nodes_tuple in uncertain_log.variants.values():
+            self.assertEqual(len(uncertain_log.behavior_graphs_map[nodes_tuple][1]), variant_length)
+        self.assertEqual(len(uncertain_log.variants), len(uncertain_log.behavior_graphs_map))
+        self.assertEqual(sum(variant_lengths), len(uncertain_log))
+
+    def test_002_append_event(self):
+        # The events of the traces arrive interleaved, as in an event stream
+        rng = random.Random(0)
+        arrivals = [case_id for case_id, trace in enumerate(self.log) for _ in trace]
+        rng.shuffle(arrivals)
+        positions = [0] * len(self.log)
+        uncertain_log = UncertainLog()
+        for case_id in arrivals:
+            nodes_tuple = uncertain_log.append_event(case_id, self.log[case_id][positions[case_id]])
+            positions[case_id] += 1
+            self.assertEqual(nodes_tuple, create_nodes_tuples(self.log[case_id][:positions[case_id]]))
+            self.assertEqual(set(uncertain_log.case_behavior_graph(case_id).edges), set(BehaviorGraph(self.log[case_id][:positions[case_id]]).edges))
+            self.assert_ranking(uncertain_log)
+        batch_uncertain_log = UncertainLog(EventLog([trace for trace in self.log if trace]))
+        self.assertEqual(set(uncertain_log.behavior_graphs_map), set(batch_uncertain_log.behavior_graphs_map))
+        for nodes_tuple, (behavior_graph, traces_list) in batch_uncertain_log.behavior_graphs_map.items():
+            self.assertEqual(set(uncertain_log.behavior_graphs_map[nodes_tuple][0].edges), set(behavior_graph.edges))
+            self.assertEqual(len(uncertain_log.behavior_graphs_map[nodes_tuple][1]), len(traces_list))
+
+    def test_003_append_event_to_log(self):
+        # Cases can be appended to a log built in batch
+        uncertain_log = UncertainLog(EventLog(self.log[:100]))
+        for case_id, trace in enumerate(self.log[100:]):
+            for event in trace:
+                uncertain_log.append_event(case_id, event)
+            self.assert_ranking(uncertain_log)
+        self.assertEqual({nodes_tuple: len(traces_list) for nodes_tuple, (_, traces_list) in uncertain_log.behavior_graphs_map.items()},
+                         {nodes_tuple: len(traces_list) for nodes_tuple, (_, traces_list) in UncertainLog(EventLog(self.log[:100] + [trace for trace in self.log[100:] if trace])).behavior_graphs_map.items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
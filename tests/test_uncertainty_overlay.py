@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the uncertainty overlays over immutable event logs."""
+
+
+import copy
+import random
+import unittest
+
+from proved.artifacts.behavior_graph.behavior_graph import create_nodes_tuples
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+from proved.artifacts.uncertainty_overlay.uncertainty_overlay import UncertaintyOverlay
+from proved.simulation.bewilderer.add_activities import add_uncertain_activities_to_log_montecarlo
+from proved.simulation.bewilderer.add_indeterminate_events import add_indeterminate_events_to_log_montecarlo
+from proved.simulation.bewilderer.add_timestamps import add_uncertain_timestamp_to_log_montecarlo
+from proved.simulation.bewilderer.add_uncertainty import add_uncertainty
+from tests.random_logs import random_uncertain_log
+
+
+def _bewilder(log, seed):
+    rng = random.Random(seed)
+    add_uncertain_activities_to_log_montecarlo(log, .3, max_labels=2, rng=rng)
+    add_uncertain_timestamp_to_log_montecarlo(log, .2, .2, 2, 2, rng=rng)
+    add_indeterminate_events_to_log_montecarlo(log, .2, rng=rng)
+
+
+class TestUncertaintyOverlay(unittest.TestCase):
+    """Bewildering overlays leaves the underlying log unchanged, and gives the same results as bewildering a copy of the log."""
+
+    def setUp(self):
+        # The log already has some uncertain activities, whose children are extended in place by the bewilderer
+        self.log = random_uncertain_log(200, 6, max_events=8)
+        self.snapshot = copy.deepcopy(self.log)
+
+    def assert_same_traces(self, overlay, log):
+        self.assertEqual(len(overlay), len(log))
+        for overlay_trace, trace in zip(overlay, log):
+            self.assertEqual([dict(event) for event in overlay_trace], [dict(event) for event in trace])
+            self.assertEqual(create_nodes_tuples(overlay_trace), create_nodes_tuples(trace))
+
+    def test_000_montecarlo(self):
+        overlay = UncertaintyOverlay(self.log)
+        _bewilder(overlay, 7)
+        self.assertEqual(self.log, self.snapshot)
+
+        reference = copy.deepcopy(self.log)
+        _bewilder(reference, 7)
+        self.assert_same_traces(overlay, reference)
+        self.assertEqual(list(UncertainLog(overlay).variants.values()), list(UncertainLog(reference).variants.values()))
+
+    def test_001_add_uncertainty(self):
+        overlay = UncertaintyOverlay(self.log)
+        random.seed(8)
+        add_uncertainty(.3, .2, .1, overlay, max_labels_to_add=2)
+        self.assertEqual(self.log, self.snapshot)
+
+        reference = copy.deepcopy(self.log)
+        random.seed(8)
+        add_uncertainty(.3, .2, .1, reference, max_labels_to_add=2)
+        self.assert_same_traces(overlay, reference)
+
+    def test_002_nested_values(self):
+        overlay = UncertaintyOverlay(self.log)
+        trace_index, event_index = next((i, j) for i, trace in enumerate(self.log) for j, event in enumerate(trace) if 'u:concept:name' in event)
+        event = overlay[trace_index][event_index]
+        event['u:concept:name']['children']['z'] = 0
+        self.assertIn('z', overlay[trace_index][event_index]['u:concept:name']['children'])
+        self.assertNotIn('z', self.log[trace_index][event_index]['u:concept:name']['children'])
+        self.assertEqual(overlay.altered_events(), [(trace_index, event_index)])
+
+        del event['u:concept:name']
+        self.assertEqual(overlay.altered_events(), [])
+        self.assertEqual(event['u:concept:name'], self.snapshot[trace_index][event_index]['u:concept:name'])
+
+    def test_003_layers(self):
+        overlay = UncertaintyOverlay(self.log)
+        trace_index = next(i for i, trace in enumerate(self.log) if len(trace) > 0)
+        event = overlay[trace_index][0]
+        event['u:missing'] = 1
+        self.assertEqual(overlay.event_attributes(trace_index, 0), {'u:missing': 1})
+        self.assertIn('u:missing', event)
+        self.assertEqual(self.log, self.snapshot)
+        overlay.clear()
+        self.assertEqual(overlay.altered_events(), [])
+        self.assertEqual(dict(overlay[trace_index][0]), dict(self.log[trace_index][0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
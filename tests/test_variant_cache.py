@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the persistent variant cache."""
+
+
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from proved.artifacts.behavior_graph.behavior_graph import create_nodes_tuples
+from proved.artifacts.variant_cache.variant_cache import VariantCache, MemoryVariantCache, get_realization_count, variant_hash
+from tests.random_logs import random_uncertain_log
+
+
+class TestVariantCache(unittest.TestCase):
+    """Storage, least recently used eviction and sharing of VariantCache files."""
+
+    def setUp(self):
+        log = random_uncertain_log(100, 2, max_events=4)
+        self.nodes_tuples = list(dict.fromkeys(create_nodes_tuples(trace) for trace in log))
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_000_get_put(self):
+        with VariantCache(self.path) as cache:
+            for i, nodes_tuple in enumerate(self.nodes_tuples):
+                cache.put(nodes_tuple, 'value', i)
+            self.assertEqual(len(cache), len(self.nodes_tuples))
+            for i, nodes_tuple in enumerate(self.nodes_tuples):
+                self.assertEqual(cache.get(nodes_tuple, 'value'), i)
+            self.assertIsNone(cache.get(self.nodes_tuples[0], 'other kind'))
+        with VariantCache(self.path) as cache:
+            self.assertEqual(cache.get(self.nodes_tuples[-1], 'value'), len(self.nodes_tuples) - 1)
+
+    def test_001_variant_hash(self):
+        hashes = [variant_hash(nodes_tuple) for nodes_tuple in self.nodes_tuples]
+        self.assertEqual(len(set(hashes)), len(hashes))
+
+    def test_002_eviction(self):
+        value = 'x' * 1000
+        with VariantCache(self.path) as cache:
+            cache.put(self.nodes_tuples[0], 'value', value)
+            entry_size = cache.size
+        with VariantCache(self.path, max_size=3 * entry_size, max_pending_accesses=1) as cache:
+            for nodes_tuple in self.nodes_tuples[1:3]:
+                time.sleep(.01)
+                cache.put(nodes_tuple, 'value', value)
+            time.sleep(.01)
+            self.assertEqual(cache.get(self.nodes_tuples[0], 'value'), value)
+            time.sleep(.01)
+            cache.put(self.nodes_tuples[3], 'value', value)
+            # The first entry was read after the second one was stored, so the second one is the least recently used
+            self.assertEqual(len(cache), 3)
+            self.assertLessEqual(cache.size, 3 * entry_size)
+            self.assertIsNone(cache.get(self.nodes_tuples[1], 'value'))
+            self.assertEqual(cache.get(self.nodes_tuples[0], 'value'), value)
+
+    def test_003_pending_accesses(self):
+        value = 'x' * 1000
+        with VariantCache(self.path) as cache:
+            cache.put(self.nodes_tuples[0], 'value', value)
+            entry_size = cache.size
+        with VariantCache(self.path, max_size=2 * entry_size) as cache:
+            time.sleep(.01)
+            cache.put(self.nodes_tuples[1], 'value', value)
+            time.sleep(.01)
+            # The access time of the read is not written yet, but it is written before evicting
+            self.assertEqual(cache.get(self.nodes_tuples[0], 'value'), value)
+            time.sleep(.01)
+            cache.put(self.nodes_tuples[2], 'value', value)
+            self.assertIsNone(cache.get(self.nodes_tuples[1], 'value'))
+            self.assertEqual(cache.get(self.nodes_tuples[0], 'value'), value)
+
+    def test_004_shared_file(self):
+        value = 'x' * 1000
+        with VariantCache(self.path, max_size=5000) as cache:
+            for nodes_tuple in self.nodes_tuples[:3]:
+                cache.put(nodes_tuple, 'value', value)
+            # Another process evicts all the entries, so the size known to this cache is wrong
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            connection.execute('DELETE FROM entries')
+            connection.close()
+            for nodes_tuple in self.nodes_tuples[3:8]:
+                cache.put(nodes_tuple, 'value', value)
+            self.assertLessEqual(cache.size, 5000)
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            self.assertEqual(cache.size, connection.execute('SELECT SUM(size) FROM entries').fetchone()[0])
+            connection.close()
+
+    def test_005_realization_count(self):
+        log = random_uncertain_log(50, 3)
+        with VariantCache(self.path) as cache:
+            for trace in log:
+                self.assertEqual(get_realization_count(trace, cache), get_realization_count(trace))
+            for trace in log:
+                self.assertEqual(get_realization_count(trace, cache), get_realization_count(trace))
+
+    def test_006_memory_variant_cache(self):
+        cache = MemoryVariantCache(max_entries=2)
+        for i, nodes_tuple in enumerate(self.nodes_tuples[:3]):
+            cache.put(nodes_tuple, 'value', i)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(self.nodes_tuples[0], 'value'))
+        self.assertEqual(cache.get_or_create(self.nodes_tuples[2], 'value', lambda: -1), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
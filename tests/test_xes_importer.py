@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the streaming import of uncertain XES files."""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pm4py.objects.log.exporter.xes import exporter as xes_exporter
+from pm4py.objects.log.importer.xes import importer as xes_importer
+
+from proved.artifacts.behavior_graph.behavior_graph import create_nodes_tuples
+from proved.artifacts.uncertain_log.uncertain_log import UncertainLog
+from proved.artifacts.uncertain_log.xes_importer import import_uncertain_log, iterparse_traces
+from tests.random_logs import random_uncertain_log
+
+
+def _variant_lengths(uncertain_log):
+    return {nodes_tuple: len(traces_list) for nodes_tuple, (_, traces_list) in uncertain_log.behavior_graphs_map.items()}
+
+
+class TestXesImporter(unittest.TestCase):
+    """Random uncertain logs exported with pm4py, imported into UncertainLog objects."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log = random_uncertain_log(200, 9)
+        for i, trace in enumerate(self.log):
+            trace.attributes['concept:name'] = str(i)
+            for event in trace:
+                event['org:resource'] = 'r' + str(i % 3)
+                # The pm4py exporters write nested attributes without a value as lists
+                if 'u:concept:name' in event:
+                    event['u:concept:name']['value'] = event['concept:name']
+        self.path = os.path.join(self.directory, 'log.xes')
+        xes_exporter.apply(self.log, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_000_iterparse_traces(self):
+        imported_log = xes_importer.apply(self.path)
+        traces = list(iterparse_traces(self.path))
+        self.assertEqual(len(traces), len(imported_log))
+        for trace, imported_trace in zip(traces, imported_log):
+            self.assertEqual(trace.attributes, imported_trace.attributes)
+            self.assertEqual(create_nodes_tuples(trace), create_nodes_tuples(imported_trace))
+            self.assertEqual([event['org:resource'] for event in trace], [event['org:resource'] for event in imported_trace])
+        for trace in iterparse_traces(self.path, minimal=True):
+            for event in trace:
+                self.assertNotIn('org:resource', event)
+
+    def test_001_import_uncertain_log(self):
+        expected = _variant_lengths(UncertainLog(xes_importer.apply(self.path)))
+        uncertain_log = import_uncertain_log(self.path)
+        self.assertEqual(len(uncertain_log), len(self.log))
+        self.assertEqual(_variant_lengths(uncertain_log), expected)
+        self.assertEqual(sorted(variant_length for variant_length, _ in uncertain_log.variants.values()), sorted(expected.values()))
+
+        variants_log = import_uncertain_log(self.path, variants_only=True, minimal=True, compact=True)
+        self.assertEqual(len(variants_log), len(expected))
+        self.assertEqual(_variant_lengths(variants_log), expected)
+
+    def test_002_gzip(self):
+        gzip_path = os.path.join(self.directory, 'log.xes.gz')
+        xes_exporter.apply(self.log, gzip_path, parameters={'compress': True})
+        self.assertEqual(_variant_lengths(import_uncertain_log(gzip_path)), _variant_lengths(import_uncertain_log(self.path)))
+
+
+if __name__ == '__main__':
+    unittest.main()